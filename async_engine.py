@@ -0,0 +1,269 @@
+# async_engine.py
+"""
+Motor de envío alternativo sobre asyncio. Un solo hilo (el QThread del worker)
+ejecuta un bucle de eventos que maneja varias sesiones a la vez: cada sesión es
+un navegador Edge (un perfil / una cuenta) controlado por DevTools, con su
+propio ritmo (AdaptivePacer). Las esperas son awaitable (MutationObserver en la
+página) en lugar de WebDriverWait bloqueantes.
+
+WhatsApp Web solo permite una pestaña activa por perfil, por eso la
+concurrencia es entre sesiones (navegadores) y no entre pestañas de una misma
+cuenta. Emite las mismas señales que SenderWorker y registra cada resultado con
+el mismo código (SenderWorker._finish_recipient).
+"""
+import asyncio
+import traceback
+from functools import partial
+
+from PySide6.QtCore import Slot
+
+from model import (SenderWorker, LOGIN_DETECT_TIMEOUT, LOGIN_POLL_MS, CHAT_LOAD_TIMEOUT, SEND_BUTTON_TIMEOUT,
+                   SENT_TICK_TIMEOUT, RESULT_SENT, RESULT_UNCONFIRMED, RESULT_RENDER_ERROR, RESULT_CHAT_TIMEOUT, RESULT_INVALID,
+                   RESULT_BUTTON_TIMEOUT, RESULT_SEND_ERROR, RESULT_FATAL)
+from pacing import AdaptivePacer
+from preflight import COL_PHONE
+from transport import TransportTimeout, LOGIN_STATE_LOGGED_IN, LOGIN_STATE_QR, CHAT_STATE_INVALID, NAV_IN_PAGE, NAV_RELOAD
+from send_metrics import (STAGE_PACING, STAGE_RENDER, STAGE_URL, STAGE_PAGE_LOAD, STAGE_CHAT_READY, STAGE_POPUP,
+                          STAGE_SEND_BUTTON, STAGE_PRE_CLICK, STAGE_CLICK, STAGE_SENT)
+
+POPUP_SETTLE_SECONDS = 1 # Pausa tras cerrar el popup de número inválido (igual que el motor Selenium)
+
+
+class _Lane:
+    """Estado de una sesión (navegador) dentro del motor."""
+
+    def __init__(self, index, pacer, prefix):
+        self.index = index
+        self.pacer = pacer
+        self.prefix = prefix
+        self.transport = None
+        self.profile_dir = None
+        self.process = None
+        self.connection = None
+
+
+class AsyncSenderEngine(SenderWorker):
+    """
+    Worker que envía con 'sessions' navegadores concurrentes en un bucle asyncio.
+    'transport_factory' (opcional) crea el transporte de cada sesión sin abrir
+    Edge, p. ej. AsyncHttpTransport contra fake_whatsapp.py.
+    """
+
+    def __init__(self, *args, sessions=1, transport_factory=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sessions = max(1, int(sessions))
+        self.transport_factory = transport_factory
+        max_per_minute = self.pacer.max_per_minute
+        self._lanes = [_Lane(index, self.pacer if index == 0 else AdaptivePacer(max_per_minute),
+                             "" if self.sessions == 1 else f"[S{index + 1}] ")
+                       for index in range(self.sessions)]
+
+    def _running(self):
+        return self.is_running and self.campaign.is_running
+
+    def _log(self, lane, message):
+        self.log_message.emit(f"{lane.prefix}{message}")
+
+    @Slot()
+    def run_initialization(self):
+        """Prepara la campaña y ejecuta todas las sesiones en un bucle de eventos."""
+        try:
+            if self._prepare_campaign():
+                asyncio.run(self._run())
+        except Exception as e:
+            self.log_message.emit(f"Error fatal en el motor asíncrono: {e}")
+            self.log_detail.emit(traceback.format_exc())
+        finally:
+            self.cleanup()
+
+    @Slot()
+    def continue_sending_messages(self):
+        """El login se detecta solo en cada sesión; la confirmación de la GUI no hace falta."""
+
+    async def _run(self):
+        await asyncio.gather(*(self._run_lane(lane) for lane in self._lanes))
+
+    async def _run_lane(self, lane):
+        try:
+            await self._open_lane(lane)
+            if await self._wait_for_login(lane):
+                await self._send_loop(lane)
+        except Exception as e:
+            self._log(lane, f"Error crítico en envío masivo: {e}")
+            self.log_detail.emit(traceback.format_exc())
+        finally:
+            await self._close_lane(lane)
+
+    # --- Navegador de cada sesión ---
+
+    async def _open_lane(self, lane):
+        if self.transport_factory is not None:
+            lane.transport = self.transport_factory()
+            self._log(lane, f"Usando transporte {type(lane.transport).__name__} ({lane.transport.base_url}).")
+        else:
+            from cdp_client import launch_edge, CdpConnection
+            from async_transport import CdpTransport
+            self._log(lane, "Iniciando navegador Edge (DevTools)...")
+            lane.profile_dir = self.profile_pool.acquire()
+            self._log(lane, f"Perfil de navegador: {lane.profile_dir}")
+            lane.process, ws_url = await launch_edge(lane.profile_dir, self.browser_args)
+            lane.connection = await CdpConnection.connect(ws_url)
+            lane.transport = await CdpTransport.open_tab(lane.connection, self.base_url, self.in_page_navigation)
+        await lane.transport.open_home()
+
+    async def _wait_for_login(self, lane):
+        """Espera la lista de chats; si aparece el QR pide login y lo vigila. False si se canceló."""
+        try:
+            state = await lane.transport.wait_for_login_state(LOGIN_DETECT_TIMEOUT)
+        except TransportTimeout:
+            state = None
+        if state == LOGIN_STATE_LOGGED_IN:
+            self._log(lane, "Sesión de WhatsApp ya iniciada en este perfil. Iniciando envío sin QR...")
+            self.login_detected.emit()
+            return True
+        if state == LOGIN_STATE_QR and lane.profile_dir:
+            self.profile_pool.mark_logged_out(lane.profile_dir) # La sesión guardada ya no vale
+        self._log(lane, "Navegador abierto. Escanea QR.")
+        self.ask_login.emit()
+        while self._running():
+            await asyncio.sleep(LOGIN_POLL_MS / 1000)
+            if await lane.transport.is_logged_in():
+                self._log(lane, "Login detectado automáticamente.")
+                self.login_detected.emit()
+                return True
+        self._log(lane, "Detenido antes de confirmar login.")
+        return False
+
+    async def _close_lane(self, lane):
+        transport = lane.transport
+        if transport is not None:
+            navigation = transport.navigation_stats
+            if navigation[NAV_IN_PAGE] or navigation[NAV_RELOAD]:
+                self._log(lane, f"Chats abiertos sin recargar: {navigation[NAV_IN_PAGE]}, "
+                                f"con recarga completa: {navigation[NAV_RELOAD]}.")
+            lane.transport = None
+            try:
+                await transport.close()
+            except Exception as e:
+                self._log(lane, f"Nota: No se pudo cerrar la pestaña: {e}")
+        if lane.connection is not None:
+            try:
+                await lane.connection.send('Browser.close', timeout=5)
+            except Exception:
+                pass
+            await lane.connection.close()
+            lane.connection = None
+        if lane.process is not None:
+            try:
+                await asyncio.wait_for(asyncio.to_thread(lane.process.wait), 5)
+            except asyncio.TimeoutError:
+                lane.process.kill()
+            lane.process = None
+            self._log(lane, "Navegador cerrado.")
+        if lane.profile_dir:
+            self.profile_pool.release(lane.profile_dir)
+            lane.profile_dir = None
+
+    # --- Envío ---
+
+    async def _sleep(self, seconds):
+        """Duerme en pasos cortos para poder cancelar. Devuelve False si se canceló."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        while self._running():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return True
+            await asyncio.sleep(min(remaining, 0.25))
+        return False
+
+    async def _send_loop(self, lane):
+        self._sending_started = True
+        if lane.profile_dir:
+            self.profile_pool.mark_logged_in(lane.profile_dir)
+        self._log(lane, "Login confirmado. Iniciando envío...")
+        while True:
+            if not self._running():
+                self._log(lane, "Proceso cancelado durante envío."); break
+            # La cola compartida puede leer un bloque del archivo: fuera del bucle de eventos
+            next_item = await asyncio.to_thread(self.campaign.next_recipient)
+            if next_item is None:
+                break
+            if not await self._send_one(lane, *next_item):
+                self._log(lane, "Proceso cancelado durante envío."); break
+
+    async def _send_one(self, lane, i, recipient):
+        """
+        Envía a un destinatario con las esperas awaitable; el resultado se registra
+        con SenderWorker._finish_recipient (en un hilo, como next_recipient), igual
+        que en el motor Selenium. False si se canceló.
+        """
+        transport = lane.transport
+        log = partial(self._log, lane)
+        timer = self.metrics.start_recipient(lane.index, i)
+        target = self._describe_recipient(recipient)
+
+        try:
+            with timer.stage(STAGE_RENDER):
+                encoded_message = self.template.render_encoded(
+                    tuple(recipient.get(col_name, "") for col_name in self.template.dynamic_fields))
+        except Exception as e:
+            await asyncio.to_thread(self._finish_recipient, i, target, timer, RESULT_RENDER_ERROR, e,
+                                    lane.pacer, log)
+            return True
+
+        with timer.stage(STAGE_PACING):
+            turn = await self._sleep(lane.pacer.next_wait())
+        if not turn:
+            return False
+
+        log(f"[{i+1}/{self.total_messages}] Enviando a {target[2]}...")
+        result, error, trace = RESULT_SENT, None, None
+        try:
+            with timer.stage(STAGE_URL):
+                url = transport.build_send_url(recipient[COL_PHONE])
+                self.log_detail.emit(f"La URL de envío es: {url}")
+                url = f'{url}&text={encoded_message}'
+            with timer.stage(STAGE_PAGE_LOAD):
+                await transport.open_chat(url)
+            try:
+                with timer.stage(STAGE_CHAT_READY):
+                    chat_state = await transport.wait_for_chat_outcome(CHAT_LOAD_TIMEOUT)
+            except TransportTimeout:
+                chat_state = None
+                result = RESULT_CHAT_TIMEOUT
+            if chat_state == CHAT_STATE_INVALID:
+                result = RESULT_INVALID
+                with timer.stage(STAGE_POPUP):
+                    try:
+                        await transport.dismiss_invalid_popup()
+                        await asyncio.sleep(POPUP_SETTLE_SECONDS)
+                    except Exception:
+                        pass
+            elif chat_state is not None:
+                try:
+                    with timer.stage(STAGE_SEND_BUTTON):
+                        click_btn = await transport.wait_for_send_button(SEND_BUTTON_TIMEOUT)
+                    with timer.stage(STAGE_PRE_CLICK):
+                        await asyncio.sleep(lane.pacer.pre_click_delay())
+                    with timer.stage(STAGE_CLICK):
+                        previous = await transport.count_outgoing()
+                        await transport.click_send(click_btn)
+                    try:
+                        with timer.stage(STAGE_SENT):
+                            await transport.wait_for_sent(SENT_TICK_TIMEOUT, previous)
+                    except TransportTimeout:
+                        result = RESULT_UNCONFIRMED
+                except TransportTimeout:
+                    result = RESULT_BUTTON_TIMEOUT
+                except Exception as send_e:
+                    result, error = RESULT_SEND_ERROR, send_e
+
+        except Exception as e:
+            result, error, trace = RESULT_FATAL, e, traceback.format_exc()
+
+        # Bitácora (fsync), log de fallos e historial fuera del bucle: no frenan a las demás sesiones
+        await asyncio.to_thread(self._finish_recipient, i, target, timer, result, error, lane.pacer, log)
+        if trace:
+            self.log_detail.emit(trace)
+        return True
@@ -0,0 +1,259 @@
+# async_transport.py
+"""
+Transportes con esperas awaitable para async_engine.py. Mismos métodos y
+resultados que transport.py, pero como corrutinas:
+
+- CdpTransport: una pestaña de Edge por DevTools (cdp_client.py). Las esperas
+  usan un MutationObserver dentro de la página (una sola llamada por espera, sin
+  sondear desde Python).
+- AsyncHttpTransport: equivalente de HttpTransport para fake_whatsapp.py, con un
+  cliente HTTP sobre asyncio (para comparar motores sin navegador).
+"""
+import json
+import asyncio
+from urllib.parse import urlencode, urlsplit
+
+from cdp_client import CdpError
+from transport import (
+    HttpTransport, TransportTimeout, WHATSAPP_WEB_URL, CHAT_INPUT_XPATH, INVALID_NUMBER_XPATH,
+    SEND_BUTTON_XPATH, CHAT_LIST_XPATH, QR_CODE_XPATH, OUTGOING_MESSAGE_XPATH, SENT_TICK_XPATH, LOGIN_STATE_LOGGED_IN, LOGIN_STATE_QR,
+    CHAT_STATE_READY, CHAT_STATE_INVALID, NAV_RELOAD, STALE_ATTRIBUTE, in_page_link, BaseTransport,
+)
+
+# Tiempo para que un chat abierto en la página muestre algo antes de recargar la URL
+IN_PAGE_CONFIRM_SECONDS = 5
+
+# Promesa que se resuelve con el estado del primer XPath presente (sin nodos
+# marcados como del chat anterior) o con null al vencer el plazo.
+_WAIT_FOR_XPATHS_JS = """
+(function (xpaths, states, stale, timeoutMs) {
+  function found() {
+    for (var k = 0; k < xpaths.length; k++) {
+      var nodes = document.evaluate(xpaths[k], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+      for (var i = 0; i < nodes.snapshotLength; i++) {
+        if (!nodes.snapshotItem(i).hasAttribute(stale)) { return states[k]; }
+      }
+    }
+    return null;
+  }
+  return new Promise(function (resolve) {
+    var state = found();
+    if (state !== null) { resolve(state); return; }
+    var observer = new MutationObserver(function () {
+      var state = found();
+      if (state !== null) { observer.disconnect(); clearTimeout(timer); resolve(state); }
+    });
+    observer.observe(document, {childList: true, subtree: true, attributes: true});
+    var timer = setTimeout(function () { observer.disconnect(); resolve(null); }, timeoutMs);
+  });
+})(%s)
+"""
+
+# Marca el chat actual y pulsa un enlace 'whatsapp://send?...' dentro de la aplicación
+_OPEN_IN_PAGE_JS = """
+(function (link, xpath, stale) {
+  var nodes = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  for (var i = 0; i < nodes.snapshotLength; i++) { nodes.snapshotItem(i).setAttribute(stale, '1'); }
+  var anchor = document.createElement('a');
+  anchor.href = link;
+  anchor.style.display = 'none';
+  document.body.appendChild(anchor);
+  anchor.click();
+  anchor.remove();
+})(%s)
+"""
+
+# Cuántos nodos devuelve un XPath
+_COUNT_XPATH_JS = """
+(function (xpath) {
+  return document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength;
+})(%s)
+"""
+
+# Pulsa el primer nodo de un XPath; devuelve false si no existe
+_CLICK_XPATH_JS = """
+(function (xpath) {
+  var node = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  if (!node) { return false; }
+  node.click();
+  return true;
+})(%s)
+"""
+
+
+def _call(script, *args):
+    """Inserta los argumentos (JSON) en una función JS autoinvocada."""
+    return script % ", ".join(json.dumps(arg) for arg in args)
+
+
+class CdpTransport(BaseTransport):
+    """Una pestaña de Edge controlada por DevTools (sesión 'flatten' de Target)."""
+
+    def __init__(self, connection, target_id, session_id, base_url=WHATSAPP_WEB_URL, in_page_navigation=False):
+        super().__init__(base_url, in_page_navigation)
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+
+    @classmethod
+    async def open_tab(cls, connection, base_url=WHATSAPP_WEB_URL, in_page_navigation=False):
+        """Crea una pestaña nueva y se conecta a ella."""
+        target = await connection.send('Target.createTarget', {'url': 'about:blank'})
+        attached = await connection.send('Target.attachToTarget', {'targetId': target['targetId'], 'flatten': True})
+        transport = cls(connection, target['targetId'], attached['sessionId'], base_url, in_page_navigation)
+        await transport._send('Page.enable')
+        return transport
+
+    async def _send(self, method, params=None, timeout=30):
+        return await self.connection.send(method, params, self.session_id, timeout)
+
+    async def _evaluate(self, expression, timeout=30):
+        result = await self._send('Runtime.evaluate', {
+            'expression': expression, 'returnByValue': True, 'awaitPromise': True}, timeout)
+        if 'exceptionDetails' in result:
+            raise CdpError(result['exceptionDetails'].get('text', 'Error de JavaScript'))
+        return result.get('result', {}).get('value')
+
+    async def _wait_for(self, xpaths, states, timeout):
+        """Devuelve el estado del primer XPath que aparezca; TransportTimeout si no aparece ninguno."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TransportTimeout(f"Ningún elemento apareció en {timeout}s: {' | '.join(xpaths)}")
+            try:
+                state = await self._evaluate(
+                    _call(_WAIT_FOR_XPATHS_JS, list(xpaths), list(states), STALE_ATTRIBUTE, int(remaining * 1000)),
+                    timeout=remaining + 5)
+            except CdpError:
+                # La página navegó durante la espera (contexto destruido): reintentar
+                await asyncio.sleep(0.2)
+                continue
+            if state is not None:
+                return state
+
+    async def _navigate(self, url):
+        await self._send('Page.navigate', {'url': url})
+
+    async def open_home(self):
+        await self._navigate(self.base_url)
+
+    async def open_chat(self, url):
+        if self._use_in_page():
+            try:
+                await self._evaluate(_call(_OPEN_IN_PAGE_JS, in_page_link(url),
+                                           f"{CHAT_INPUT_XPATH} | {INVALID_NUMBER_XPATH}", STALE_ATTRIBUTE))
+                await self.wait_for_chat_outcome(IN_PAGE_CONFIRM_SECONDS)
+                self._in_page_result(True)
+                return
+            except (TransportTimeout, CdpError):
+                self._in_page_result(False)
+        await self._navigate(url)
+        self.navigation_stats[NAV_RELOAD] += 1
+
+    async def wait_for_login_state(self, timeout):
+        return await self._wait_for((CHAT_LIST_XPATH, QR_CODE_XPATH), (LOGIN_STATE_LOGGED_IN, LOGIN_STATE_QR), timeout)
+
+    async def is_logged_in(self):
+        try:
+            await self._wait_for((CHAT_LIST_XPATH,), (LOGIN_STATE_LOGGED_IN,), 0.05)
+            return True
+        except TransportTimeout:
+            return False
+
+    async def wait_for_chat_outcome(self, timeout):
+        return await self._wait_for((CHAT_INPUT_XPATH, INVALID_NUMBER_XPATH),
+                                    (CHAT_STATE_READY, CHAT_STATE_INVALID), timeout)
+
+    async def dismiss_invalid_popup(self):
+        await self._evaluate(_call(_CLICK_XPATH_JS, INVALID_NUMBER_XPATH))
+
+    async def wait_for_send_button(self, timeout):
+        return await self._wait_for((SEND_BUTTON_XPATH,), ('send',), timeout)
+
+    async def count_outgoing(self):
+        return await self._evaluate(_call(_COUNT_XPATH_JS, OUTGOING_MESSAGE_XPATH))
+
+    async def click_send(self, handle):
+        if not await self._evaluate(_call(_CLICK_XPATH_JS, SEND_BUTTON_XPATH)):
+            raise TransportTimeout("El botón enviar desapareció antes del clic.")
+
+    async def wait_for_sent(self, timeout, previous=0):
+        return await self._wait_for((SENT_TICK_XPATH.format(count=previous),), ('sent',), timeout)
+
+    async def close(self):
+        try:
+            await self.connection.send('Target.closeTarget', {'targetId': self.target_id}, timeout=5)
+        except (CdpError, asyncio.TimeoutError):
+            pass
+
+
+class AsyncHttpTransport(HttpTransport):
+    """
+    HttpTransport con peticiones asyncio (HTTP/1.1 sin keep-alive) para
+    fake_whatsapp.py. Las comprobaciones sobre el HTML son las de HttpTransport.
+    """
+
+    async def _get_async(self, url):
+        parts = urlsplit(url)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, parts.port or 80), self.request_timeout)
+        try:
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n\r\n".encode('ascii'))
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), self.request_timeout)
+        finally:
+            writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        status = head.split(b"\r\n", 1)[0].split()
+        if len(status) < 2 or status[1] != b"200":
+            raise OSError(f"HTTP {status[1].decode() if len(status) > 1 else '?'} en {url}")
+        return body.decode('utf-8')
+
+    async def open_home(self):
+        self._html = await self._get_async(self.base_url + '/')
+
+    async def open_chat(self, url):
+        self._phone, self._text = self._query_values(url)
+        if self._use_in_page():
+            try:
+                self._html = await self._get_async(f"{self.base_url}/chat-state?{urlsplit(url).query}")
+                self._in_page_result(True)
+                return
+            except OSError:
+                self._in_page_result(False)
+        self._html = await self._get_async(url)
+        self.navigation_stats[NAV_RELOAD] += 1
+
+    async def wait_for_login_state(self, timeout):
+        # No se delega en HttpTransport: llamaría a la versión corrutina de is_logged_in
+        return LOGIN_STATE_LOGGED_IN if HttpTransport.is_logged_in(self) else LOGIN_STATE_QR
+
+    async def is_logged_in(self):
+        return HttpTransport.is_logged_in(self)
+
+    async def wait_for_chat_outcome(self, timeout):
+        return HttpTransport.wait_for_chat_outcome(self, timeout)
+
+    async def dismiss_invalid_popup(self):
+        HttpTransport.dismiss_invalid_popup(self)
+
+    async def wait_for_send_button(self, timeout):
+        return HttpTransport.wait_for_send_button(self, timeout)
+
+    async def count_outgoing(self):
+        return HttpTransport.count_outgoing(self)
+
+    async def click_send(self, handle):
+        await self._get_async(f"{self.base_url}/click?" + urlencode({'phone': self._phone, 'text': self._text}))
+        self._html = ""
+
+    async def wait_for_sent(self, timeout, previous=0):
+        return True
+
+    async def close(self):
+        HttpTransport.close(self)
@@ -0,0 +1,261 @@
+# batch.py
+"""
+Modo lote de headless.py: varias campañas seguidas con los mismos navegadores.
+Al terminar cada trabajo la sesión deja su navegador abierto (WarmSession en
+model.py) y el siguiente lo reutiliza: sin volver a abrir Edge ni cargar
+WhatsApp Web entre archivos.
+
+El lote puede ser:
+- Una carpeta: cada .txt/.csv es un trabajo (en orden alfabético). Si existe
+  '<nombre>.plantilla.txt' junto al archivo, es la plantilla de ese trabajo;
+  si no, se usa la de la línea de comandos o del archivo de configuración.
+- Un manifiesto JSON: {"defaults": {...}, "jobs": [{"file": "...", ...}, ...]}
+  o solo la lista de trabajos. Cada trabajo admite las opciones de campaña de
+  headless.py (JOB_OPTIONS); las rutas relativas son respecto al manifiesto.
+
+Cada trabajo escribe sus logs en logs/lotes/<lote>/<NN>_<archivo>/ y al final se
+escribe resumen_<fecha>.csv con una fila por trabajo en la carpeta del lote. Las
+bitácoras siguen en logs/journals/, así 'resume' retoma el envío de un lote anterior.
+Un trabajo con errores (archivo o plantilla) no detiene el lote; una detención
+(Ctrl+C, SIGTERM o login sin confirmar) sí.
+"""
+import os
+import csv
+import json
+import time
+import datetime
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+DATA_EXTENSIONS = ('.txt', '.csv')
+TEMPLATE_SUFFIX = '.plantilla.txt'
+BATCH_LOGS_FOLDER = 'lotes'
+
+# Opciones de campaña que cada trabajo puede cambiar (navegador, perfiles y logs son del lote)
+JOB_OPTIONS = ('file', 'template', 'template_file', 'static_vars', 'sessions', 'max_per_minute', 'resume',
+               'known_bad', 'duplicates', 'in_page_navigation', 'metrics_file', 'engine', 'schedule')
+
+# --- Estado de cada trabajo ---
+JOB_PENDING = 'pendiente'
+JOB_DONE = 'terminado'
+JOB_STOPPED = 'detenido'
+JOB_ERROR = 'error'
+
+SUMMARY_HEADER = ('Trabajo', 'Archivo', 'Estado', 'Total', 'Enviados', 'Fallidos', 'Omitidos',
+                  'Segundos', 'Log_Errores', 'Error')
+
+
+class BatchJob:
+    """Una campaña del lote: su configuración completa y, al terminar, su resultado."""
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.dynamic_columns = []
+        self.status = JOB_PENDING
+        self.error = ""
+        self.seconds = 0.0
+        self.total = self.sent = self.failed = self.skipped = 0
+        self.log_file = ""
+        self.logs_dir = None
+
+    def summary_row(self):
+        return (self.name, self.config.get('file') or '', self.status, self.total, self.sent, self.failed,
+                self.skipped, f"{self.seconds:.1f}", self.log_file, self.error)
+
+
+def batch_logs_dir(logs_dir, source):
+    """Carpeta del lote: logs/lotes/<nombre del lote>_<fecha>."""
+    name = os.path.splitext(os.path.basename(os.path.normpath(source)))[0] or 'lote'
+    timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    return os.path.join(logs_dir, BATCH_LOGS_FOLDER, f"{name}_{timestamp}")
+
+
+def _directory_entries(folder):
+    entries = []
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        lowered = name.lower()
+        if (name.startswith('.') or not os.path.isfile(path) or lowered.endswith(TEMPLATE_SUFFIX)
+                or not lowered.endswith(DATA_EXTENSIONS)):
+            continue
+        entry = {'file': path}
+        template_path = os.path.join(folder, os.path.splitext(name)[0] + TEMPLATE_SUFFIX)
+        if os.path.isfile(template_path):
+            entry['template_file'] = template_path
+        entries.append(entry)
+    return entries
+
+
+def _manifest_entries(path):
+    """(defaults, trabajos) del manifiesto, con las rutas ya resueltas."""
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    defaults = {}
+    if isinstance(manifest, dict):
+        defaults = manifest.get('defaults') or {}
+        manifest = manifest.get('jobs')
+    if not isinstance(manifest, list) or not isinstance(defaults, dict):
+        raise ValueError("El manifiesto debe ser una lista de trabajos o {\"defaults\": {...}, \"jobs\": [...]}.")
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(entry):
+        if isinstance(entry, str):
+            entry = {'file': entry}
+        if not isinstance(entry, dict):
+            raise ValueError(f"Trabajo mal escrito en el manifiesto: {entry!r}")
+        entry = dict(entry)
+        for key in ('file', 'template_file', 'metrics_file'):
+            if entry.get(key) and not os.path.isabs(entry[key]):
+                entry[key] = os.path.join(base, entry[key])
+        return entry
+
+    return resolve(defaults), [resolve(entry) for entry in manifest]
+
+
+def _job_config(base_config, defaults, entry):
+    """Configuración del trabajo: lote < defaults del manifiesto < trabajo."""
+    from scheduling import ScheduleConfig
+    config = dict(base_config)
+    static_vars = dict(base_config.get('static_vars') or {})
+    for layer in (defaults, entry):
+        unknown = sorted(set(layer) - set(JOB_OPTIONS))
+        if unknown:
+            raise ValueError(f"Opción no válida para un trabajo: {', '.join(unknown)}")
+        static_vars.update(layer.get('static_vars') or {})
+        if layer.get('template_file') or layer.get('template'):
+            # La plantilla más cercana al trabajo manda (una en texto anula un archivo anterior)
+            config.pop('template_file', None)
+            config['template'] = layer.get('template') or ''
+        config.update({key: value for key, value in layer.items() if key not in ('static_vars', 'template')})
+        if isinstance(layer.get('schedule'), dict):
+            config['schedule'] = ScheduleConfig.from_dict(layer['schedule'])
+    config['static_vars'] = {name: str(value) for name, value in static_vars.items()}
+    if config.get('template_file') and not config.get('template'):
+        with open(config['template_file'], 'r', encoding='utf-8') as f:
+            config['template'] = f.read()
+    config['template'] = (config.get('template') or '').strip()
+    return config
+
+
+def load_jobs(source, base_config):
+    """
+    Lee el lote (carpeta o manifiesto) y devuelve la lista de BatchJob.
+    Lanza ValueError si el lote no se puede leer o está vacío; los errores de un
+    trabajo concreto quedan en su 'error' y ese trabajo se salta al enviar.
+    """
+    from headless import template_columns
+    if os.path.isdir(source):
+        defaults, entries = {}, _directory_entries(source)
+    else:
+        defaults, entries = _manifest_entries(source)
+    if not entries:
+        raise ValueError(f"El lote no tiene archivos de destinatarios: {source}")
+
+    jobs = []
+    for position, entry in enumerate(entries, start=1):
+        file_path = entry.get('file') or defaults.get('file') or ''
+        name = f"{position:02d}_{os.path.splitext(os.path.basename(file_path))[0] or 'trabajo'}"
+        job = BatchJob(name, dict(base_config, file=file_path))
+        try:
+            job.config = _job_config(base_config, defaults, entry)
+            if not job.config.get('file') or not os.path.exists(job.config['file']):
+                raise ValueError(f"Archivo de destinatarios no encontrado: {job.config.get('file') or '(sin indicar)'}")
+            if not job.config['template']:
+                raise ValueError("Falta la plantilla del mensaje.")
+            job.dynamic_columns = template_columns(job.config['template'], job.config['static_vars'])
+        except (OSError, ValueError) as e:
+            job.status, job.error = JOB_ERROR, str(e)
+        jobs.append(job)
+    return jobs
+
+
+class BatchRunner(QObject):
+    """
+    Ejecuta los trabajos uno tras otro sobre el mismo SenderModel y emite
+    'finished' al acabar el lote. 'should_continue' se consulta entre trabajos
+    (headless.py deja de seguir tras una señal o un login sin confirmar).
+    """
+    finished = Signal()
+
+    def __init__(self, model, jobs, logs_dir, should_continue=lambda: True, log=print):
+        super().__init__()
+        self.model = model
+        self.jobs = jobs
+        self.logs_dir = logs_dir
+        self.should_continue = should_continue
+        self.log = log
+        self.summary_path = ""
+        self._position = -1
+        self._started = 0.0
+
+    def start(self):
+        self.model.process_finished.connect(self._on_job_finished)
+        self.log(f"Lote de {len(self.jobs)} campaña(s). Logs en: {self.logs_dir}")
+        QTimer.singleShot(0, self._next_job)
+
+    def _current(self):
+        return self.jobs[self._position]
+
+    def _next_job(self):
+        while True:
+            self._position += 1
+            if self._position >= len(self.jobs) or not self.should_continue():
+                self._finish()
+                return
+            job = self._current()
+            if job.status == JOB_ERROR:
+                self.log(f"[{job.name}] Se omite: {job.error}")
+                continue
+            break
+
+        job.logs_dir = os.path.join(self.logs_dir, job.name)
+        self.log(f"[{job.name}] Iniciando campaña {self._position + 1}/{len(self.jobs)}: {job.config['file']}")
+        self._started = time.monotonic()
+        from headless import start_campaign
+        start_campaign(self.model, job.config, job.dynamic_columns, keep_browser=True, logs_dir=job.logs_dir)
+        if not self.model.is_running():
+            job.status, job.error = JOB_ERROR, "La campaña no pudo iniciarse."
+            QTimer.singleShot(0, self._next_job)
+
+    def _on_job_finished(self):
+        if not 0 <= self._position < len(self.jobs):
+            return
+        job = self._current()
+        job.seconds = time.monotonic() - self._started
+        campaign = self.model.last_campaign
+        if campaign is None or campaign.report is None:
+            job.status, job.error = JOB_ERROR, "No se pudo leer el archivo (ver el log de actividad)."
+        else:
+            job.status = JOB_DONE if campaign.is_running else JOB_STOPPED
+            job.total = campaign.total_messages
+            job.sent, job.failed, job.skipped = campaign.count_sent, campaign.count_failed, campaign.count_skipped
+            job.log_file = campaign.log_file_path if os.path.exists(campaign.log_file_path) else ''
+        self.log(f"[{job.name}] {job.status}: {job.sent} enviados, {job.failed} fallidos en {job.seconds:.0f}s.")
+        QTimer.singleShot(0, self._next_job)
+
+    def _finish(self):
+        self.model.process_finished.disconnect(self._on_job_finished)
+        self.model.close_browsers()
+        self._write_summary()
+        done = sum(1 for job in self.jobs if job.status == JOB_DONE)
+        self.log(f"Lote terminado: {done}/{len(self.jobs)} campaña(s) completas, "
+                 f"{sum(job.sent for job in self.jobs)} enviados, {sum(job.failed for job in self.jobs)} fallidos.")
+        for job in self.jobs:
+            if job.status != JOB_DONE:
+                self.log(f"  {job.name}: {job.status}{' - ' + job.error if job.error else ''}")
+        self.finished.emit()
+
+    def _write_summary(self):
+        timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.logs_dir, f"resumen_{timestamp}.csv")
+        try:
+            os.makedirs(self.logs_dir, exist_ok=True)
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, delimiter=';')
+                writer.writerow(SUMMARY_HEADER)
+                writer.writerows(job.summary_row() for job in self.jobs)
+            self.summary_path = path
+            self.log(f"Resumen del lote: {path}")
+        except OSError as e:
+            self.log(f"ADVERTENCIA: No se pudo escribir el resumen del lote: {e}")
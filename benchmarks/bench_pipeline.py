@@ -0,0 +1,472 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmarks de las etapas del envío (SenderWorker) con archivos sintéticos.
+
+Etapas medidas por tamaño de archivo:
+  csv_ingest        pre-vuelo + lectura por bloques de SharedCampaign
+  row_assembly      armado de valores por destinatario
+  format_quote      format_map + quote (forma anterior) y plantilla compilada
+  phone_format      formato +52 1 fila a fila (forma anterior) y vectorizado
+  log_failure       SenderWorker._log_failure (escritor por lotes)
+  load_log_file     SenderModel.load_log_file sobre un log de fallos del mismo tamaño
+                    (apertura y tiempo hasta tener el índice completo)
+  pipeline_fake     envío completo contra fake_whatsapp.py (HttpTransport, sin navegador)
+  navigation        el mismo envío abriendo cada chat con recarga completa y dentro de
+                    la página, con un arranque del SPA simulado (--bootstrap-delay).
+                    Solo mide fake_whatsapp.py: WhatsApp Web real no enruta el enlace
+                    whatsapp:// en la página (la opción es experimental y va apagada)
+  async_engine      SenderWorker (una sesión, esperas bloqueantes) contra AsyncSenderEngine
+                    con --async-sessions sesiones en un bucle asyncio, con latencia por
+                    página (--latency)
+  recipient_memory  memoria retenida por todos los destinatarios (cola programada):
+                    un dict por fila (to_dict('records')) contra RecipientBlock, y el
+                    tiempo de leer cada campo de cada fila
+  pacing_overlap    una sesión con ritmo (--pacing-rate por minuto) y cargas de chat más
+                    cortas y más largas que el intervalo: mensajes por minuto logrados
+
+Uso:
+  python benchmarks/bench_pipeline.py --sizes 1000,10000,100000 --output bench.json
+  python benchmarks/bench_pipeline.py --sizes 1000000 --stages csv_ingest,format_quote
+La salida es JSON para poder comparar ejecuciones.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import datetime
+from contextlib import contextmanager
+from urllib.parse import quote
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+TEMPLATE = ("Hola buenas tardes {nombre}, te está atendiendo {minombre} de la {miempresa}, "
+            "el motivo de este mensaje es para recordarle de la materia {nombre_materia}, "
+            "pues con esta inscripción, ya la estaría cursando {numveces} veces.")
+STATIC_VARS = {'minombre': 'Juan Pérez', 'miempresa': 'Universidad Ejemplo'}
+DYNAMIC_COLUMNS = ['nombre', 'nombre_materia', 'numveces']
+SUBJECTS = ['Cálculo I', 'Álgebra Lineal', 'Programación Básica', 'TICS', 'Cómputo en la nube']
+NAMES = ['Ana García', 'Luis Martínez', 'Sofía Hernández', 'José Luis', 'Estrella']
+
+ALL_STAGES = ['csv_ingest', 'row_assembly', 'format_quote', 'phone_format',
+              'log_failure', 'load_log_file', 'pipeline_fake', 'navigation', 'async_engine', 'pacing_overlap',
+              'recipient_memory']
+
+
+def make_recipient_file(path, rows, seed=0, invalid_ratio=0.02):
+    """Archivo numero;nombre;nombre_materia;numveces con algunos números inválidos."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(rows):
+            if rng.random() < invalid_ratio:
+                numero = f"55x{i:07d}"
+            elif rng.random() < 0.1:
+                numero = f"521{i:010d}"
+            else:
+                numero = f"55{i:08d}"
+            f.write(f"{numero};{rng.choice(NAMES)};{rng.choice(SUBJECTS)};{rng.randint(2, 4)}\n")
+
+
+def make_failure_log(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['Numero', 'Nombre', 'Razon_Fallo', 'Detalle_Error'])
+        for i in range(rows):
+            writer.writerow([f"55{i:08d}", NAMES[i % len(NAMES)], "Timeout Carga Chat",
+                             "No se pudo cargar la ventana de chat en 20s."])
+
+
+def make_worker(ctx, path, worker_class=None, **kwargs):
+    """
+    Worker con su campaña, logs y perfiles de Edge en la carpeta temporal: un
+    benchmark no debe tocar ./logs, el catálogo, el historial ni ./perfiles del usuario.
+    """
+    from model import SenderWorker
+    from campaign import SharedCampaign
+    from profiles import ProfilePool
+    worker_class = worker_class or SenderWorker
+    campaign = kwargs.pop('campaign', None) or SharedCampaign(path, ['numero'] + DYNAMIC_COLUMNS, 1, ctx['logs_dir'])
+    return worker_class(path, STATIC_VARS, TEMPLATE, DYNAMIC_COLUMNS, campaign=campaign,
+                        profile_pool=ProfilePool(os.path.join(ctx['tmp'], "perfiles")), **kwargs)
+
+
+@contextmanager
+def patched(module, **values):
+    """Cambia atributos de un módulo durante una etapa y los restaura al salir."""
+    previous = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(module, name, value)
+
+
+def dispose(*objects):
+    """
+    Borra ya los QObject de una etapa (workers, modelos y sus temporizadores), así
+    no se acumulan entre etapas ni llegan vivos al cierre de la aplicación Qt.
+    """
+    from PySide6.QtCore import QCoreApplication, QEvent
+    for obj in objects:
+        obj.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def load_records(path, logs_dir):
+    """Todos los destinatarios normalizados (para las etapas por fila)."""
+    from campaign import SharedCampaign
+    campaign = SharedCampaign(path, ['numero'] + DYNAMIC_COLUMNS, 1, logs_dir)
+    campaign.prepare(lambda message: None)
+    records = []
+    while True:
+        item = campaign.next_recipient()
+        if item is None:
+            break
+        records.append(item[1])
+    campaign.finish_session(0)
+    return records
+
+
+def bench_csv_ingest(ctx):
+    from campaign import SharedCampaign
+    def run():
+        campaign = SharedCampaign(ctx['file'], ['numero'] + DYNAMIC_COLUMNS, 1, ctx['logs_dir'])
+        campaign.prepare(lambda message: None)
+        count = 0
+        while campaign.next_recipient() is not None:
+            count += 1
+        campaign.finish_session(0)
+        return count
+    seconds, count = timed(run)
+    return [{'variant': 'streaming', 'seconds': seconds, 'rows_out': count}]
+
+
+def bench_row_assembly(ctx):
+    records = ctx['records']
+    def legacy():
+        for recipient in records:
+            current_vars = STATIC_VARS.copy()
+            for col_name in DYNAMIC_COLUMNS:
+                value = recipient.get(col_name)
+                current_vars[col_name] = str(value).strip() if value is not None else ""
+    def current():
+        for recipient in records:
+            tuple(recipient.get(col_name, "") for col_name in DYNAMIC_COLUMNS)
+    return [{'variant': 'dict_copy', 'seconds': timed(legacy)[0]},
+            {'variant': 'values_tuple', 'seconds': timed(current)[0]}]
+
+
+def bench_format_quote(ctx):
+    from template_engine import CompiledTemplate
+    records = ctx['records']
+    def legacy():
+        for recipient in records:
+            current_vars = STATIC_VARS.copy()
+            current_vars.update((col_name, recipient[col_name]) for col_name in DYNAMIC_COLUMNS)
+            quote(TEMPLATE.format_map(current_vars))
+    template = CompiledTemplate(TEMPLATE, STATIC_VARS, DYNAMIC_COLUMNS)
+    def compiled():
+        for recipient in records:
+            template.render_encoded(tuple(recipient.get(col_name, "") for col_name in template.dynamic_fields))
+    results = [{'variant': 'format_map_quote', 'seconds': timed(legacy)[0]},
+               {'variant': 'compiled_template', 'seconds': timed(compiled)[0]}]
+    results[-1]['cache_hits'] = template.cache_info().hits
+    return results
+
+
+def bench_phone_format(ctx):
+    import pandas
+    from preflight import normalize_chunk
+    numbers = [recipient['numero'] for recipient in ctx['records']]
+    def legacy():
+        for numero in numbers:
+            if len(numero) == 10:
+                quote(f"+52 1 {numero[0:2]} {numero[2:6]} {numero[6:10]}")
+            else:
+                quote(numero)
+    df = pandas.DataFrame({'numero': numbers})
+    return [{'variant': 'per_row', 'seconds': timed(legacy)[0]},
+            {'variant': 'vectorized', 'seconds': timed(lambda: normalize_chunk(df, []))[0]}]
+
+
+def bench_log_failure(ctx):
+    from campaign import SharedCampaign
+    rows = ctx['rows']
+    campaign = SharedCampaign(ctx['file'], ['numero'] + DYNAMIC_COLUMNS, 1, ctx['logs_dir'])
+    campaign._create_log_file(lambda message: None)
+    worker = make_worker(ctx, ctx['file'], campaign=campaign)
+    def run():
+        for i in range(rows):
+            worker._log_failure(f"55{i:08d}", "Ana", "Número sin WA (Popup)", "El número no tiene WhatsApp o es inválido.")
+        campaign.flush_failures()
+    seconds, _ = timed(run)
+    campaign.finish_session(0)
+    return [{'variant': 'buffered_background', 'seconds': seconds}]
+
+
+def bench_load_log_file(ctx):
+    from model import SenderModel
+    log_path = os.path.join(ctx['tmp'], f"log_errores_bench_{ctx['rows']}.csv")
+    make_failure_log(log_path, ctx['rows'])
+    model = SenderModel(logs_dir=ctx['logs_dir'], profiles_dir=os.path.join(ctx['tmp'], "perfiles"))
+    received = []
+    model.log_data_ready.connect(received.append)
+    seconds, _ = timed(lambda: model.load_log_file(log_path))
+    results = [{'variant': 'load_log_file', 'seconds': seconds}]
+    if received:
+        # La tabla se indexa en segundo plano: medir también hasta tener todas las filas
+        from PySide6.QtCore import QEventLoop
+        table, loop = received[0], QEventLoop()
+        table.indexing_finished.connect(loop.quit)
+        start = time.perf_counter()
+        loop.exec() # indexing_finished llega por el bucle de eventos, no puede haberse perdido
+        results.append({'variant': 'index_ready', 'seconds': seconds + time.perf_counter() - start})
+        table.close()
+        dispose(table)
+    model.close_browsers()
+    dispose(model)
+    return results
+
+
+def bench_pipeline_fake(ctx):
+    import model as model_module
+    from fake_whatsapp import FakeWhatsAppServer
+    from transport import HttpTransport
+    rows = min(ctx['rows'], ctx['e2e_max'])
+    path = os.path.join(ctx['tmp'], f"e2e_{rows}.txt")
+    make_recipient_file(path, rows, seed=1)
+    # Sin la pausa tras cerrar popups
+    with patched(model_module, sleep=lambda seconds: None), FakeWhatsAppServer(invalid_rate=0.05, seed=1) as server:
+        worker = make_worker(ctx, path, transport=HttpTransport(server.url), max_per_minute=0)
+        worker.pacer.pre_click_pause = (0, 0)
+        seconds, _ = timed(worker.run_initialization)
+        sent = worker.campaign.count_sent
+        dispose(worker)
+    return [{'variant': 'http_transport', 'seconds': seconds, 'rows_in': rows, 'sent': sent}]
+
+
+def bench_navigation(ctx):
+    import model as model_module
+    from fake_whatsapp import FakeWhatsAppServer
+    from transport import HttpTransport, NAV_IN_PAGE
+    rows = min(ctx['rows'], ctx['nav_max'])
+    path = os.path.join(ctx['tmp'], f"nav_{rows}.txt")
+    make_recipient_file(path, rows, seed=1)
+    results = []
+    with patched(model_module, sleep=lambda seconds: None):
+        for variant, in_page in (('full_reload', False), ('in_page', True)):
+            with FakeWhatsAppServer(invalid_rate=0.05, seed=1, bootstrap_delay=ctx['bootstrap_delay']) as server:
+                transport = HttpTransport(server.url, in_page_navigation=in_page)
+                worker = make_worker(ctx, path, transport=transport, max_per_minute=0)
+                worker.pacer.pre_click_pause = (0, 0)
+                in_page_chats = [] # cleanup() cierra el transporte: leer el contador antes
+                worker.finished.connect(lambda: in_page_chats.append(transport.navigation_stats[NAV_IN_PAGE]))
+                seconds, _ = timed(worker.run_initialization)
+                chats = server.stats['chats']
+                dispose(worker)
+            results.append({'variant': variant, 'seconds': seconds, 'rows_in': rows, 'chats': chats,
+                            'in_page_chats': in_page_chats[0] if in_page_chats else 0,
+                            'seconds_per_chat': seconds / chats if chats else None})
+    return results
+
+
+def bench_async_engine(ctx):
+    import model as model_module
+    import async_engine
+    from async_engine import AsyncSenderEngine
+    from async_transport import AsyncHttpTransport
+    from fake_whatsapp import FakeWhatsAppServer
+    from transport import HttpTransport
+    rows = min(ctx['rows'], ctx['nav_max'])
+    path = os.path.join(ctx['tmp'], f"async_{rows}.txt")
+    make_recipient_file(path, rows, seed=1)
+    results = []
+    with patched(model_module, sleep=lambda seconds: None), patched(async_engine, POPUP_SETTLE_SECONDS=0):
+        variants = (('selenium_style', 0), (f"async_{ctx['async_sessions']}_sesiones", ctx['async_sessions']))
+        for variant, sessions in variants:
+            with FakeWhatsAppServer(invalid_rate=0.05, seed=1, latency=ctx['latency']) as server:
+                if sessions:
+                    worker = make_worker(ctx, path, AsyncSenderEngine, max_per_minute=0, sessions=sessions,
+                                         transport_factory=lambda: AsyncHttpTransport(server.url))
+                    pacers = [lane.pacer for lane in worker._lanes]
+                else:
+                    worker = make_worker(ctx, path, transport=HttpTransport(server.url), max_per_minute=0)
+                    pacers = [worker.pacer]
+                for pacer in pacers:
+                    pacer.pre_click_pause = (0, 0)
+                seconds, _ = timed(worker.run_initialization)
+                chats = server.stats['chats']
+                sent = worker.campaign.count_sent
+                dispose(worker)
+            results.append({'variant': variant, 'seconds': seconds, 'rows_in': rows, 'chats': chats, 'sent': sent,
+                            'seconds_per_chat': seconds / chats if chats else None})
+    return results
+
+
+def bench_pacing_overlap(ctx):
+    import model as model_module
+    from fake_whatsapp import FakeWhatsAppServer
+    from transport import HttpTransport
+    from send_metrics import STAGE_PAGE_LOAD
+    rows = min(ctx['rows'], ctx['pacing_max'])
+    path = os.path.join(ctx['tmp'], f"pacing_{rows}.txt")
+    make_recipient_file(path, rows, seed=1, invalid_ratio=0)
+    rate = ctx['pacing_rate']
+    interval = 60.0 / rate
+    results = []
+    with patched(model_module, sleep=lambda seconds: None):
+        for latency in (interval * 0.4, interval * 1.6):
+            with FakeWhatsAppServer(seed=1, latency=latency) as server:
+                worker = make_worker(ctx, path, transport=HttpTransport(server.url), max_per_minute=rate)
+                worker.pacer.pre_click_pause = (0, 0)
+                worker.pacer.jitter = 0
+                seconds, _ = timed(worker.run_initialization)
+                clicks = server.stats['clicks']
+                chat_load_mean = worker.metrics.stage_histograms[STAGE_PAGE_LOAD].mean()
+                dispose(worker)
+            results.append({'variant': f"carga_{latency / interval:.1f}x_intervalo", 'seconds': seconds, 'rows_in': rows,
+                            'clicks': clicks, 'ceiling_per_minute': rate,
+                            'clicks_per_minute': clicks * 60 / seconds if seconds else None,
+                            'chat_load_mean': chat_load_mean})
+    return results
+
+
+def bench_recipient_memory(ctx):
+    import gc
+    import tracemalloc
+    import pandas
+    from preflight import normalize_chunk
+    from campaign import INTERNAL_COLUMNS, RECIPIENT_CHUNK_SIZE
+    from recipients import RecipientBlock
+    columns = ['numero'] + DYNAMIC_COLUMNS
+
+    def chunks():
+        reader = pandas.read_csv(ctx['file'], sep=';', header=None, names=columns, dtype=str,
+                                 encoding='utf-8', chunksize=RECIPIENT_CHUNK_SIZE)
+        start = 0
+        for df in reader:
+            yield normalize_chunk(df.fillna(""), DYNAMIC_COLUMNS, start).drop(columns=INTERNAL_COLUMNS)
+            start += len(df)
+
+    def as_dicts():
+        return [row for df in chunks() for row in df.to_dict('records')]
+
+    def as_blocks():
+        return [block.row(position) for block in map(RecipientBlock.from_frame, chunks())
+                for position in range(len(block))]
+
+    results = []
+    for variant, build in (('dict_records', as_dicts), ('recipient_block', as_blocks)):
+        # Memoria que sigue ocupada cuando ya solo quedan las filas (como en la cola programada)
+        gc.collect()
+        tracemalloc.start()
+        seconds, rows = timed(build)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        read_seconds = timed(lambda: [tuple(row.get(name, "") for name in columns) for row in rows])[0]
+        results.append({'variant': variant, 'seconds': seconds, 'bytes': size,
+                        'bytes_per_row': size / len(rows) if rows else None, 'read_seconds': read_seconds})
+        del rows
+    return results
+
+
+STAGE_FUNCTIONS = {
+    'csv_ingest': bench_csv_ingest,
+    'row_assembly': bench_row_assembly,
+    'format_quote': bench_format_quote,
+    'phone_format': bench_phone_format,
+    'log_failure': bench_log_failure,
+    'load_log_file': bench_load_log_file,
+    'pipeline_fake': bench_pipeline_fake,
+    'navigation': bench_navigation,
+    'async_engine': bench_async_engine,
+    'pacing_overlap': bench_pacing_overlap,
+    'recipient_memory': bench_recipient_memory,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de las etapas del envío.")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="Filas de los archivos sintéticos, separadas por comas (hasta 1000000).")
+    parser.add_argument('--stages', default=','.join(ALL_STAGES), help="Etapas a medir.")
+    parser.add_argument('--e2e-max', type=int, default=2000, help="Máximo de filas para pipeline_fake.")
+    parser.add_argument('--nav-max', type=int, default=200, help="Máximo de filas para navigation.")
+    parser.add_argument('--bootstrap-delay', type=float, default=0.05,
+                        help="Segundos de arranque del SPA por carga completa en navigation.")
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="Segundos de latencia por página del servidor falso en async_engine.")
+    parser.add_argument('--async-sessions', type=int, default=4, help="Sesiones del motor asyncio en async_engine.")
+    parser.add_argument('--pacing-max', type=int, default=40, help="Máximo de filas para pacing_overlap.")
+    parser.add_argument('--pacing-rate', type=int, default=120, help="Mensajes por minuto en pacing_overlap.")
+    parser.add_argument('--output', default='', help="Archivo JSON de salida (por defecto, stdout).")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGE_FUNCTIONS]
+    if unknown:
+        parser.error(f"Etapas desconocidas: {', '.join(unknown)}")
+
+    # Una sola aplicación Qt para todo el proceso (señales y QStandardItemModel)
+    from PySide6.QtGui import QGuiApplication
+    app = QGuiApplication.instance() or QGuiApplication([])
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="aurasend_bench_") as tmp:
+        logs_dir = os.path.join(tmp, "logs")
+        os.makedirs(logs_dir)
+        for rows in sizes:
+            path = os.path.join(tmp, f"destinatarios_{rows}.txt")
+            make_recipient_file(path, rows)
+            ctx = {'rows': rows, 'file': path, 'tmp': tmp, 'logs_dir': logs_dir, 'e2e_max': args.e2e_max,
+                   'nav_max': args.nav_max, 'bootstrap_delay': args.bootstrap_delay,
+                   'latency': args.latency, 'async_sessions': args.async_sessions,
+                   'pacing_max': args.pacing_max, 'pacing_rate': args.pacing_rate}
+            if any(stage in stages for stage in ('row_assembly', 'format_quote', 'phone_format')):
+                ctx['records'] = load_records(path, logs_dir)
+            for stage in stages:
+                for result in STAGE_FUNCTIONS[stage](ctx):
+                    rows_in = result.setdefault('rows_in', rows)
+                    result['rows_per_sec'] = rows_in / result['seconds'] if result['seconds'] else None
+                    results.append({'stage': stage, 'rows': rows, **result})
+                    print(f"{stage:>14} {result['variant']:>20} {rows:>8} filas: {result['seconds']:.4f} s",
+                          file=sys.stderr)
+
+    report = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
+    # PySide6 6.12 pierde una referencia a True en cada Signal.emit(): tras unos
+    # cientos de señales el cierre normal del intérprete aborta (código 134) aunque
+    # el informe ya esté escrito. Se sale sin esa fase para que CI vea el código 0.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(0)
@@ -0,0 +1,99 @@
+# benchmarks/check_import_time.py
+"""
+Comprueba el coste de importar los módulos de la aplicación con `python -X importtime`.
+
+Para cada módulo revisa que no cargue dependencias pesadas que deben importarse
+solo al usarse (pandas, Selenium, QtGui/QtWidgets...) y, opcionalmente, que el
+tiempo acumulado no pase de un presupuesto. Sale con código 1 si algo falla,
+así se puede usar en CI o antes de empaquetar con Inno Setup.
+
+Uso:
+  python benchmarks/check_import_time.py
+  python benchmarks/check_import_time.py --budget-ms 400 --top 15
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ('pandas', 'selenium', 'webdriver_manager')
+
+# Módulo -> paquetes que NO debe importar al cargarse
+TARGETS = {
+    'model': HEAVY + ('PySide6.QtGui', 'PySide6.QtWidgets'),
+    'headless': HEAVY + ('PySide6.QtGui', 'PySide6.QtWidgets', 'PySide6.QtCore'),
+    'campaign': HEAVY + ('PySide6',),
+    'transport': HEAVY + ('PySide6',),
+    'controller': HEAVY,
+}
+
+
+def measure(module):
+    """Ejecuta 'import module' en un intérprete nuevo. Devuelve {módulo: (propio_us, acumulado_us)}."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+        env={**os.environ, 'QT_QPA_PLATFORM': os.environ.get('QT_QPA_PLATFORM', 'offscreen')},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar '{module}':\n{result.stderr.strip()[-2000:]}")
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue # Cabecera
+        name = parts[2].strip()
+        timings[name] = (int(parts[0]), int(parts[1]))
+    return timings
+
+
+def forbidden_loaded(timings, forbidden):
+    loaded = []
+    for name in timings:
+        if any(name == package or name.startswith(package + '.') for package in forbidden):
+            loaded.append(name)
+    # Solo el paquete raíz de cada prohibido, para no listar cientos de submódulos
+    return sorted({name.split('.')[0] if name.split('.')[0] in forbidden else name for name in loaded})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comprueba el tiempo de importación de los módulos.")
+    parser.add_argument('--modules', default=','.join(TARGETS), help="Módulos a comprobar.")
+    parser.add_argument('--budget-ms', type=float, default=0,
+                        help="Tiempo acumulado máximo por módulo en ms (0 = sin límite).")
+    parser.add_argument('--top', type=int, default=5, help="Importaciones más lentas a mostrar.")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module in [m.strip() for m in args.modules.split(',') if m.strip()]:
+        try:
+            timings = measure(module)
+        except RuntimeError as e:
+            failures.append(str(e)); continue
+        total_ms = timings.get(module, (0, 0))[1] / 1000
+        print(f"{module}: {total_ms:.1f} ms")
+        slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        for name, (self_us, _) in slowest:
+            print(f"    {self_us / 1000:8.1f} ms  {name}")
+
+        loaded = forbidden_loaded(timings, TARGETS.get(module, HEAVY))
+        if loaded:
+            failures.append(f"{module} importa al cargarse: {', '.join(loaded)}")
+        if args.budget_ms and total_ms > args.budget_ms:
+            failures.append(f"{module} tarda {total_ms:.1f} ms (presupuesto {args.budget_ms:.0f} ms)")
+
+    if failures:
+        print("\nFALLÓ:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    print("\nOK: ningún módulo carga dependencias pesadas al importarse.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
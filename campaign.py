@@ -0,0 +1,422 @@
+# campaign.py
+import os
+import time
+import datetime
+import threading
+from collections import Counter
+
+from journal import CampaignJournal, STATUS_SENT, STATUS_FAILED, STATUS_UNCONFIRMED
+from failure_log import FailureLogWriter
+from preflight import normalize_chunk, normalize_number, run_preflight, COL_VALID, COL_TEN_DIGITS, COL_INDEX, COL_KEY
+from number_reputation import POLICY_SKIP, POLICY_DEFER, POLICY_OFF
+from dedup import DEDUP_FIRST
+from recipients import RecipientBlock
+
+# Filas leídas por bloque; la memoria usada no depende del tamaño del archivo
+RECIPIENT_CHUNK_SIZE = 5000
+# Con programación: cada cuánto se revisa la cola mientras nadie puede salir
+SCHEDULE_POLL_SECONDS = 1
+# Columnas de la validación que no necesita el envío (no se guardan con los destinatarios)
+INTERNAL_COLUMNS = [COL_VALID, COL_TEN_DIGITS, COL_KEY]
+
+
+class SharedCampaign:
+    """
+    Estado compartido de una campaña entre una o varias sesiones (SenderWorker).
+    Valida el archivo con un pre-vuelo vectorizado, lo lee por bloques (streaming), reparte los
+    destinatarios mediante una cola común y centraliza contadores y el log de fallos.
+    Con 'schedule' (ScheduleConfig) la cola es un RecipientScheduler: las filas
+    enviables se cargan en memoria al empezar y salen por prioridad, fecha y
+    ventana de envío en lugar de en el orden del archivo.
+    Todos los métodos públicos son seguros entre hilos.
+    """
+
+    def __init__(self, file_path, expected_columns, num_sessions=1, logs_dir=None, resume=False,
+                 reputation=None, reputation_policy=POLICY_SKIP, dedup_policy=DEDUP_FIRST, schedule=None,
+                 journal_dir=None):
+        self.file_path = file_path
+        self.expected_columns = expected_columns
+        self.dynamic_columns = [col_name for col_name in expected_columns if col_name != 'numero']
+        self.num_sessions = max(1, int(num_sessions))
+        self.logs_dir = logs_dir or os.path.join(os.getcwd(), "logs")
+        os.makedirs(self.logs_dir, exist_ok=True)
+        # Las bitácoras van en una carpeta estable (modo lote: la común, no la del trabajo) para poder reanudar
+        self.journal_dir = journal_dir or self.logs_dir
+
+        self.log_file_path = ""
+        self.total_messages = 0 # Filas del archivo según el pre-vuelo
+        self.report = None
+        self.count_sent = 0
+        self.count_failed = 0
+        self.count_skipped = 0 # Ya enviados en una ejecución anterior (modo reanudar)
+        self.failure_reasons = Counter() # Fallos por Razon_Fallo (para el catálogo de logs)
+        self.started_at = None
+        self.resume = resume
+        self.journal = None
+        # --- Historial de números sin WhatsApp (NumberReputation) ---
+        self.reputation = reputation
+        self.reputation_policy = reputation_policy
+        self.count_known_bad = 0 # Omitidos (o enviados al final) por el historial
+        self._known_bad = {}
+        self._deferred = [] # RecipientBlock por bloque leído
+        # --- Duplicados dentro del archivo (DuplicateIndex del pre-vuelo) ---
+        self.dedup_policy = dedup_policy
+        self.count_deduplicated = 0 # Envíos quitados por repetir destinatario
+        # --- Programación (prioridad, "no antes de" y ventanas de envío) ---
+        self.schedule = schedule if schedule is not None and schedule.active else None
+        self._scheduler = None
+        self._announced_release = None
+        self.is_running = True
+        self.sending_started = False
+
+        self._lock = threading.Lock()
+        self._failure_log = None
+        self._prepared = False
+        self._prepare_error = None
+        self._log = print
+        self._reader = None
+        self._chunk = [] # RecipientBlock en curso (columnas compactas, filas como vistas)
+        self._chunk_pos = 0
+        self._chunk_number = 0
+        self._next_index = 0
+        self._processed = 0
+        self._finished_sessions = set()
+
+    def prepare(self, log):
+        """
+        Crea el log de errores, ejecuta el pre-vuelo (validación vectorizada de todo
+        el archivo) y abre el lector por bloques para el envío (solo la primera
+        sesión que llega lo hace; las demás reutilizan el resultado).
+        'log' es una función que recibe un str (normalmente log_message.emit).
+        Lanza la excepción original si la lectura falló.
+        """
+        with self._lock:
+            if self._prepare_error is not None:
+                raise self._prepare_error
+            if self._prepared:
+                return
+            self._log = log
+            self.started_at = datetime.datetime.now()
+            try:
+                self._create_log_file(log)
+                self._open_journal(log)
+                self._load_reputation(log)
+                log("Leyendo archivo de datos...")
+                self._run_preflight(log)
+                self._reader = self._open_reader()
+                self._prepared = True
+            except Exception as e:
+                self._prepare_error = e
+                raise
+
+    def _run_preflight(self, log):
+        """Valida y resume el archivo completo antes de abrir el navegador."""
+        self.report = run_preflight(self._clean_chunks(), self.dynamic_columns, self.dedup_policy,
+                                    reopen=self._clean_chunks)
+        if self.report.rows == 0 or self.report.empty_numbers == self.report.rows:
+            raise ValueError(f"Archivo vacío o 'numero' vacío. Formato: {';'.join(self.expected_columns)};")
+        for line in self.report.lines():
+            log(line)
+        self.total_messages = self.report.rows
+
+    def _create_log_file(self, log):
+        """Crea el archivo de log (con cabecera) y su escritor por lotes en segundo plano."""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.log_file_path = os.path.join(self.logs_dir, f"log_errores_{timestamp}.csv")
+        try:
+            on_batch = self._record_reputation if self.reputation is not None else None
+            self._failure_log = FailureLogWriter(self.log_file_path, background=True, on_error=log,
+                                                 on_batch=on_batch)
+            log(f"Archivo de log iniciado en: {self.log_file_path}")
+        except Exception as e:
+            log(f"ADVERTENCIA: No se pudo crear archivo log: {e}")
+
+    def _open_journal(self, log):
+        """Abre la bitácora de la campaña; en modo reanudar carga los envíos previos."""
+        self.journal = CampaignJournal(CampaignJournal.path_for(self.file_path, self.journal_dir))
+        delivered = self.journal.open(self.resume)
+        if self.resume:
+            log(f"Reanudando campaña: {delivered} destinatarios ya enviados se omitirán.")
+
+    def _load_reputation(self, log):
+        """Carga en memoria los números con fallos definitivos en campañas anteriores."""
+        if self.reputation is None or self.reputation_policy == POLICY_OFF:
+            return
+        try:
+            self._known_bad = self.reputation.active_numbers()
+        except Exception as e:
+            log(f"ADVERTENCIA: No se pudo leer el historial de números: {e}")
+            return
+        if self._known_bad:
+            action = "se omitirán" if self.reputation_policy == POLICY_SKIP else "se enviarán al final"
+            log(f"Historial: {len(self._known_bad)} números sin WhatsApp conocidos ({action} si aparecen).")
+
+    def _open_reader(self):
+        """Abre el archivo de datos como iterador de DataFrames de RECIPIENT_CHUNK_SIZE filas."""
+        import pandas # Carga diferida: solo hace falta al empezar una campaña
+        return pandas.read_csv(
+            self.file_path, sep=';', header=None, names=self.expected_columns,
+            dtype=str, skip_blank_lines=True, encoding='utf-8',
+            chunksize=RECIPIENT_CHUNK_SIZE
+        )
+
+    def _clean_chunk(self, df):
+        """Quita las filas totalmente vacías y rellena los campos faltantes con ''."""
+        return df.dropna(subset=self.expected_columns, how='all').fillna("")
+
+    def _clean_chunks(self):
+        """Recorre el archivo completo en bloques limpios (pre-vuelo y su confirmación de duplicados)."""
+        reader = self._open_reader()
+        try:
+            for df in reader:
+                yield self._clean_chunk(df)
+        finally:
+            reader.close()
+
+    def _read_valid_chunk(self):
+        """
+        Lee y normaliza el siguiente bloque con filas enviables (llamar con el lock tomado).
+        Las filas con número inválido se registran en bloque como fallidas sin pasar
+        por el bucle de envío y las duplicadas que sobran se descartan. Devuelve el
+        DataFrame (sin las columnas de validación) o None cuando ya no quedan bloques.
+        """
+        while self._reader is not None:
+            try:
+                df = next(self._reader)
+            except StopIteration:
+                self._close_reader()
+                break
+            except Exception as e:
+                self._log(f"Error al leer bloque {self._chunk_number + 1} del archivo: {e}. Se detiene la lectura.")
+                self._close_reader()
+                break
+            self._chunk_number += 1
+            df = normalize_chunk(self._clean_chunk(df), self.dynamic_columns, self._next_index)
+            self._next_index += len(df)
+            invalid = df[~df[COL_VALID]]
+            if not invalid.empty:
+                self._record_invalid(invalid)
+            valid = df[df[COL_VALID]]
+            if self.report.removed and not valid.empty:
+                duplicated = self.report.dedup.drop_mask(valid[COL_INDEX])
+                if duplicated.any():
+                    self.count_deduplicated += int(duplicated.sum())
+                    self._processed += int(duplicated.sum())
+                    valid = valid[~duplicated]
+            if self._known_bad and not valid.empty:
+                known = valid[COL_KEY].isin(self._known_bad.keys())
+                if known.any():
+                    self._hold_known_bad(valid[known])
+                    valid = valid[~known]
+            if valid.empty:
+                continue
+            return valid.drop(columns=INTERNAL_COLUMNS)
+        return None
+
+    def _load_next_chunk(self):
+        """Carga en la cola el siguiente bloque enviable. Devuelve False cuando ya no quedan."""
+        valid = self._read_valid_chunk()
+        if valid is not None:
+            self._chunk = RecipientBlock.from_frame(valid)
+            self._chunk_pos = 0
+            return True
+        if self._deferred:
+            # Archivo terminado: ahora los números con historial (política 'al final')
+            self._chunk, self._deferred = RecipientBlock.concat(self._deferred), []
+            self._log(f"Enviando al final {len(self._chunk)} números con historial sin WhatsApp...")
+            self._chunk_pos = 0
+            return True
+        self._chunk = []
+        self._chunk_pos = 0
+        return False
+
+    def _load_scheduled(self):
+        """Lee todo el archivo filtrado a la cola programada (llamar con el lock tomado)."""
+        from scheduling import RecipientScheduler, COL_SCHEDULE_ERROR
+        self._scheduler = RecipientScheduler(self.schedule)
+        while True:
+            valid = self._read_valid_chunk()
+            if valid is None:
+                break
+            rejected = self._scheduler.add_chunk(valid)
+            if not rejected.empty:
+                self._record_invalid(rejected, rejected[COL_SCHEDULE_ERROR])
+        self._scheduler.finish()
+        self._log(f"Programación: {len(self._scheduler)} destinatarios en cola ({self.schedule.describe()}).")
+
+    def _hold_known_bad(self, known):
+        """Aparta las filas con historial: las registra como fallidas o las deja para el final."""
+        self.count_known_bad += len(known)
+        if self.reputation_policy == POLICY_DEFER:
+            known = known.drop(columns=INTERNAL_COLUMNS)
+            if self._scheduler is not None:
+                from scheduling import TIER_DEFERRED, COL_SCHEDULE_ERROR
+                rejected = self._scheduler.add_chunk(known, TIER_DEFERRED) # Detrás de todos los demás
+                if not rejected.empty:
+                    self._record_invalid(rejected, rejected[COL_SCHEDULE_ERROR])
+            else:
+                self._deferred.append(RecipientBlock.from_frame(known))
+            return
+        nombres = known['nombre'] if 'nombre' in known.columns else [""] * len(known)
+        rows = [[numero, nombre, "Número sin WA (historial)",
+                 f"Falló como '{self._known_bad.get(key, '')}' en una campaña anterior; no se abrió el chat."]
+                for numero, nombre, key in zip(known['numero'], nombres, known[COL_KEY])]
+        if self._failure_log is not None:
+            try:
+                self._failure_log.log_many(rows)
+            except Exception as e:
+                self._log(f"ADVERTENCIA: No se pudo escribir en log: {e}")
+        self.count_failed += len(rows)
+        self.failure_reasons["Número sin WA (historial)"] += len(rows)
+        self._processed += len(rows)
+
+    def _record_invalid(self, invalid, reasons=None):
+        """Registra de una vez las filas descartadas de un bloque (por defecto, por número inválido)."""
+        nombres = invalid['nombre'] if 'nombre' in invalid.columns else [""] * len(invalid)
+        reasons = list(reasons) if reasons is not None else ["Número inválido"] * len(invalid)
+        rows = [[numero, nombre, reason, f"Línea {index + 1} del archivo"]
+                for numero, nombre, reason, index in zip(invalid['numero'], nombres, reasons, invalid[COL_INDEX])]
+        if self._failure_log is not None:
+            try:
+                self._failure_log.log_many(rows)
+            except Exception as e:
+                self._log(f"ADVERTENCIA: No se pudo escribir en log: {e}")
+        self.count_failed += len(rows)
+        self.failure_reasons.update(reasons)
+        self._processed += len(rows)
+
+    def _close_reader(self):
+        if self._reader is not None:
+            try:
+                self._reader.close()
+            except Exception:
+                pass
+            self._reader = None
+
+    def next_recipient(self):
+        """
+        Devuelve el siguiente (indice, destinatario) de la cola común,
+        o None si ya no quedan destinatarios o la campaña se detuvo.
+        """
+        if self.schedule is not None:
+            return self._next_scheduled()
+        with self._lock:
+            self.sending_started = True
+            if not self.is_running:
+                return None
+            while True:
+                if self._chunk_pos >= len(self._chunk) and not self._load_next_chunk():
+                    return None
+                recipient = self._chunk.row(self._chunk_pos)
+                self._chunk_pos += 1
+                i = recipient[COL_INDEX]
+                if self.journal and self.journal.was_delivered(i, recipient['numero']):
+                    self.count_skipped += 1
+                    self._processed += 1
+                    continue
+                break
+            return i, recipient
+
+    def _next_scheduled(self):
+        """next_recipient con programación: mientras nadie pueda salir, espera sin tomar el lock."""
+        while True:
+            with self._lock:
+                self.sending_started = True
+                if not self.is_running:
+                    return None
+                if self._scheduler is None:
+                    if self._reader is None:
+                        return None # Campaña ya cerrada
+                    self._load_scheduled()
+                recipient = self._scheduler.pop()
+                if recipient is not None:
+                    i = recipient[COL_INDEX]
+                    if self.journal and self.journal.was_delivered(i, recipient['numero']):
+                        self.count_skipped += 1
+                        self._processed += 1
+                        continue
+                    return i, recipient
+                wait = self._scheduler.wait_seconds()
+                if wait is None:
+                    return None
+                release = self._scheduler.next_release()
+                if release != self._announced_release:
+                    self._announced_release = release
+                    self._log(f"En espera: siguiente envío programado para el {release:%Y-%m-%d %H:%M} "
+                              f"({len(self._scheduler)} pendientes).")
+            time.sleep(min(wait, SCHEDULE_POLL_SECONDS))
+
+    def record_result(self, success, index=None, numero=None, unconfirmed=False):
+        """
+        Registra el resultado de un destinatario (también en la bitácora si se
+        indica su índice y número) y devuelve el progreso global (0-100).
+        'unconfirmed': se pulsó enviar sin ver la palomita; cuenta como fallo pero
+        la bitácora lo marca aparte para no reenviarlo al reanudar.
+        """
+        if self.journal and index is not None:
+            status = STATUS_UNCONFIRMED if unconfirmed else STATUS_SENT if success else STATUS_FAILED
+            self.journal.record(index, numero, status)
+        if success and self._known_bad and numero is not None and normalize_number(numero) in self._known_bad:
+            self._forget_known_bad(numero) # Ya tiene WhatsApp (política 'al final')
+        with self._lock:
+            if success:
+                self.count_sent += 1
+            else:
+                self.count_failed += 1
+            self._processed += 1
+            if not self.total_messages:
+                return 100
+            return int((self._processed / self.total_messages) * 100)
+
+    def log_failure(self, row):
+        """
+        Encola una fila para el CSV de fallos compartido (se escribe por lotes). El
+        historial de números se actualiza con cada lote desde el hilo del escritor.
+        """
+        if self._failure_log is None:
+            raise ValueError("El log de fallos no está disponible.")
+        with self._lock:
+            self.failure_reasons[row[2]] += 1
+        self._failure_log.log(row)
+
+    def _record_reputation(self, rows):
+        """Hilo del log de fallos: anota en el historial los fallos definitivos del lote."""
+        try:
+            self.reputation.record_failures((row[0], row[2]) for row in rows)
+        except Exception as e:
+            self._log(f"ADVERTENCIA: No se pudo actualizar el historial de números: {e}")
+
+    def _forget_known_bad(self, numero):
+        try:
+            self.reputation.clear(numero)
+        except Exception as e:
+            self._log(f"ADVERTENCIA: No se pudo actualizar el historial de números: {e}")
+
+    def flush_failures(self):
+        """Fuerza la escritura de los fallos pendientes."""
+        if self._failure_log is not None:
+            self._failure_log.flush()
+
+    def stop(self):
+        """Detiene el reparto de destinatarios para todas las sesiones."""
+        self.is_running = False
+
+    def finish_session(self, session_id):
+        """
+        Marca una sesión como terminada (idempotente).
+        Devuelve True solo para la llamada que cierra la última sesión.
+        """
+        with self._lock:
+            if session_id in self._finished_sessions:
+                return False
+            self._finished_sessions.add(session_id)
+            if len(self._finished_sessions) < self.num_sessions:
+                return False
+            self._close_reader()
+            self._chunk = []
+            self._scheduler = None
+            if self.journal:
+                self.journal.close()
+            if self._failure_log is not None:
+                self._failure_log.close()
+            return True
@@ -0,0 +1,195 @@
+# cdp_client.py
+"""
+Cliente mínimo del protocolo DevTools (CDP) sobre asyncio, sin dependencias:
+un websocket propio (RFC 6455, solo lo que usa el navegador local) y el
+arranque de Edge con --remote-debugging-port. Lo usa async_engine.py para
+manejar varios navegadores desde un solo bucle de eventos.
+"""
+import os
+import json
+import base64
+import shutil
+import struct
+import asyncio
+import subprocess
+from urllib.parse import urlsplit
+
+# Rutas habituales de Edge si no está en el PATH
+EDGE_CANDIDATES = (
+    r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
+    r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
+    "/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge",
+    "/usr/bin/microsoft-edge",
+)
+DEVTOOLS_PORT_FILE = "DevToolsActivePort" # Lo escribe el navegador en --user-data-dir
+BROWSER_START_TIMEOUT = 30
+
+_OPCODE_CONTINUATION = 0x0
+_OPCODE_TEXT = 0x1
+_OPCODE_CLOSE = 0x8
+_OPCODE_PING = 0x9
+_OPCODE_PONG = 0xA
+
+
+class CdpError(Exception):
+    """Error devuelto por el navegador o conexión DevTools cerrada."""
+
+
+def find_edge():
+    """Ruta del ejecutable de Edge, o None si no se encuentra."""
+    for name in ("msedge", "microsoft-edge", "microsoft-edge-stable"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return next((path for path in EDGE_CANDIDATES if os.path.exists(path)), None)
+
+
+async def launch_edge(profile_dir, browser_args=(), executable=None, timeout=BROWSER_START_TIMEOUT):
+    """
+    Abre Edge con el perfil indicado y un puerto DevTools libre (el navegador lo
+    anota en DevToolsActivePort). Devuelve (proceso, url del websocket del navegador).
+    """
+    executable = executable or find_edge()
+    if not executable:
+        raise FileNotFoundError("No se encontró Microsoft Edge (msedge).")
+    port_file = os.path.join(profile_dir, DEVTOOLS_PORT_FILE)
+    try:
+        os.remove(port_file) # Uno viejo apuntaría a un puerto cerrado
+    except OSError:
+        pass
+    command = [executable, "--remote-debugging-port=0", f"--user-data-dir={profile_dir}",
+               "--profile-directory=Default", "--no-first-run", "--no-default-browser-check",
+               *browser_args, "about:blank"]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if process.poll() is not None:
+            raise CdpError(f"Edge terminó al iniciar (código {process.returncode}).")
+        try:
+            with open(port_file, 'r', encoding='utf-8') as f:
+                port, path = f.read().split()[:2]
+            return process, f"ws://127.0.0.1:{port}{path}"
+        except (OSError, ValueError):
+            await asyncio.sleep(0.1)
+    process.kill()
+    raise CdpError(f"Edge no abrió el puerto DevTools en {timeout}s.")
+
+
+class CdpConnection:
+    """
+    Conexión DevTools con un navegador. send() admite session_id (Target.attachToTarget
+    con flatten) para hablar con varias pestañas por el mismo websocket.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 0
+        self._pending = {}
+        self._closed = False
+        self._listen_task = asyncio.get_running_loop().create_task(self._listen())
+
+    @classmethod
+    async def connect(cls, ws_url, timeout=10):
+        parts = urlsplit(ws_url)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, parts.port or 80), timeout)
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        request = (f"GET {parts.path or '/'} HTTP/1.1\r\nHost: {parts.hostname}:{parts.port}\r\n"
+                   "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                   f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n")
+        writer.write(request.encode('ascii'))
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        status = head.split(b"\r\n", 1)[0]
+        if b" 101 " not in status + b" ":
+            writer.close()
+            raise CdpError(f"El navegador rechazó el websocket: {status.decode('latin-1')}")
+        return cls(reader, writer)
+
+    async def send(self, method, params=None, session_id=None, timeout=30):
+        """Envía un comando y espera su resultado (dict). Lanza CdpError si falla."""
+        if self._closed:
+            raise CdpError("Conexión DevTools cerrada.")
+        self._next_id += 1
+        message = {'id': self._next_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+        try:
+            self._write_frame(_OPCODE_TEXT, json.dumps(message).encode('utf-8'))
+            await self._writer.drain()
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(message['id'], None)
+        if 'error' in response:
+            raise CdpError(f"{method}: {response['error'].get('message', response['error'])}")
+        return response.get('result', {})
+
+    def _write_frame(self, opcode, payload):
+        # Los frames del cliente van enmascarados (RFC 6455, 5.3)
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([0x80 | length])
+        elif length < 1 << 16:
+            header += bytes([0x80 | 126]) + struct.pack('>H', length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack('>Q', length)
+        mask = os.urandom(4)
+        masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+        self._writer.write(header + mask + masked)
+
+    async def _read_frame(self):
+        first, second = await self._reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', await self._reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', await self._reader.readexactly(8))[0]
+        mask = await self._reader.readexactly(4) if second & 0x80 else None
+        payload = await self._reader.readexactly(length)
+        if mask:
+            payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+        return bool(first & 0x80), first & 0x0F, payload
+
+    async def _listen(self):
+        """Lee los mensajes del navegador y resuelve las respuestas pendientes (los eventos se ignoran)."""
+        buffer = b""
+        try:
+            while True:
+                fin, opcode, payload = await self._read_frame()
+                if opcode == _OPCODE_PING:
+                    self._write_frame(_OPCODE_PONG, payload)
+                    continue
+                if opcode == _OPCODE_CLOSE:
+                    break
+                if opcode not in (_OPCODE_TEXT, _OPCODE_CONTINUATION):
+                    continue
+                buffer += payload
+                if not fin:
+                    continue
+                message, buffer = json.loads(buffer.decode('utf-8')), b""
+                future = self._pending.get(message.get('id'))
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            self._closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CdpError("Conexión DevTools cerrada."))
+
+    async def close(self):
+        if not self._closed:
+            try:
+                self._write_frame(_OPCODE_CLOSE, b"")
+                await self._writer.drain()
+            except (ConnectionError, OSError):
+                pass
+        self._closed = True
+        self._listen_task.cancel()
+        self._writer.close()
@@ -1,13 +1,12 @@
 # controller.py
-import re
 import os
 from PySide6.QtCore import QObject, Slot
 from PySide6.QtWidgets import QFileDialog, QMessageBox
-from PySide6.QtGui import QStandardItemModel 
 
 # Importar Modelo y Vista
 from model import SenderModel
 from view import MainView
+from template_engine import extract_placeholders, dynamic_columns_for
 
 class AppController(QObject):
     """
@@ -28,20 +27,23 @@ class AppController(QObject):
         # --- Nuevas conexiones para el Visor de Logs ---
         self._view.refresh_logs_list_clicked.connect(self.handle_refresh_logs_list)
         self._view.log_file_selected.connect(self.handle_log_file_selected)
+        self._view.log_reason_filter_changed.connect(self.handle_refresh_logs_list)
         # --- Fin de Nuevas conexiones ---
 
 
         # Conectar señales del Modelo a slots del Controlador o Vista
-        self._model.status_update.connect(self._view.update_log) # Log directo a la vista
+        self._model.log_batch.connect(self.handle_log_batch) # Log en vivo por lotes
         self._model.status_update.connect(self._view.set_status_label) # Estado general
         self._model.progress_update.connect(self._view.set_progress)
         self._model.ask_login_confirmation.connect(self.handle_ask_login)
+        self._model.login_completed.connect(self.handle_login_completed)
         self._model.process_finished.connect(self.handle_process_finished)
         self._model.file_loaded.connect(self._view.set_file_label)
 
         # --- Conexiones del Modelo para el Visor de Logs ---
         self._model.log_available.connect(self.handle_log_available)
         self._model.available_logs_list.connect(self._view.update_log_files_list)
+        self._model.log_history_summary.connect(self._view.update_log_history_summary)
         self._model.log_data_ready.connect(self._view.set_log_table_model)
         self._model.log_data_ready.connect(self.handle_log_data_loaded) # Para cambiar de pestaña
         # --- Fin de Conexiones ---
@@ -67,10 +69,7 @@ class AppController(QObject):
     def handle_template_change(self, template):
         # Calcular columnas dinámicas y actualizar etiqueta en la vista
         static_var_names = list(self._view.get_static_vars().keys())
-        placeholders = re.findall(r'\{(\w+)\}', template)
-        dynamic_columns = sorted(list(set(
-            var for var in placeholders if var != 'numero' and var not in static_var_names
-        )))
+        dynamic_columns = dynamic_columns_for(template, static_var_names)
         format_str = "numero;" + ";".join(dynamic_columns) + ";"
         self._view.set_expected_format_label(format_str)
 
@@ -80,6 +79,11 @@ class AppController(QObject):
         file_path = self._model.get_file_path() # Obtener del modelo donde se validó
         template = self._view.get_template_text().strip()
         static_vars = self._view.get_static_vars()
+        num_sessions = self._view.get_session_count()
+        max_per_minute = self._view.get_max_per_minute()
+        resume = self._view.get_resume()
+        known_bad_policy = self._view.get_known_bad_policy()
+        dedup_policy = self._view.get_dedup_policy()
 
         # 2. Validaciones básicas (archivo, plantilla)
         if not file_path or not os.path.exists(file_path):
@@ -89,8 +93,8 @@ class AppController(QObject):
         
         # 3. Validar consistencia de plantilla y variables
         static_var_names = list(static_vars.keys())
-        placeholders = re.findall(r'\{(\w+)\}', template)
-        dynamic_columns = sorted(list(set(var for var in placeholders if var != 'numero' and var not in static_var_names)))
+        placeholders = extract_placeholders(template)
+        dynamic_columns = dynamic_columns_for(template, static_var_names)
         all_available_vars = set(static_var_names + dynamic_columns + ['numero'])
         missing_vars = [p for p in placeholders if p not in all_available_vars]
         if missing_vars:
@@ -108,7 +112,13 @@ class AppController(QObject):
         self._view.set_status_label("Iniciando...")
         self._view.set_progress(0)
         self.clear_log() # Limpiar log en vivo
-        self._model.start_process(static_vars, template, dynamic_columns)
+        self._model.start_process(static_vars, template, dynamic_columns, num_sessions, max_per_minute, resume,
+                                  known_bad_policy=known_bad_policy, dedup_policy=dedup_policy)
+
+    @Slot(list)
+    def handle_log_batch(self, lines):
+        self._view.append_log_lines(lines)
+        self._view.set_status_label(lines[-1])
 
     @Slot()
     def clear_log(self):
@@ -124,9 +134,15 @@ class AppController(QObject):
     @Slot()
     def handle_ask_login(self):
         # El modelo pide confirmación, actualizamos la vista
-        self._view.set_status_label("ℹ️ Escanea QR. Cuando carguen chats, haz clic abajo:")
+        self._view.set_status_label("ℹ️ Escanea QR (en cada navegador). Cuando carguen chats, haz clic abajo:")
         self._view.show_confirm_button(True)
 
+    @Slot()
+    def handle_login_completed(self):
+        # Todas las sesiones detectaron su login solas: ya no hace falta confirmar
+        self._view.show_confirm_button(False)
+        self._view.set_status_label("✅ Sesión detectada. Iniciando envío...")
+
     @Slot()
     def handle_confirm_login(self):
         # Usuario confirmó en la vista, le decimos al modelo que continúe
@@ -151,7 +167,7 @@ class AppController(QObject):
     def handle_refresh_logs_list(self):
         """Pide al modelo que busque los archivos de log."""
         self._view.update_log("Buscando archivos de log...")
-        self._model.fetch_available_logs()
+        self._model.fetch_available_logs(self._view.get_log_reason_filter())
 
     @Slot(str)
     def handle_log_file_selected(self, file_path: str):
@@ -180,14 +196,20 @@ class AppController(QObject):
         self._model.load_log_file(file_path)
         # (La señal 'log_data_ready' se encargará de mostrarlo y cambiar de pestaña)
 
-    @Slot(QStandardItemModel)
+    @Slot(object)
     def handle_log_data_loaded(self, model_data):
         """
         Se activa DESPUÉS de que 'set_log_table_model' haya sido llamado.
-        Cambia automáticamente a la pestaña de logs.
+        La tabla se indexa en segundo plano; al terminar se informa y se cambia de pestaña.
         """
-        if model_data and model_data.rowCount() > 0:
-            self._view.update_log("Log cargado en el visor.")
+        if model_data is None:
+            return
+        model_data.indexing_finished.connect(self.handle_log_indexed)
+
+    @Slot(int)
+    def handle_log_indexed(self, total_rows):
+        if total_rows > 0:
+            self._view.update_log(f"Log cargado en el visor ({total_rows} filas).")
             self._view.switch_to_logs_tab() # Llama a la nueva función de la vista
         else:
             self._view.update_log("El archivo de log seleccionado está vacío.")
\ No newline at end of file
@@ -0,0 +1,140 @@
+# dedup.py
+"""
+Deduplicación de destinatarios dentro de una campaña. Durante el pre-vuelo se
+guarda por fila válida un hash de 64 bits del número normalizado (y de los campos,
+para la política 'todas') junto a su índice: 16-24 bytes por fila en arreglos de
+numpy en lugar de un set de cadenas. Al terminar, un hash repetido solo marca
+candidatas: las filas de grupos con más de un miembro se confirman comparando
+los valores reales (COL_KEY y los campos) en una segunda lectura, así una colisión
+de hash nunca quita a un destinatario distinto. Solo se conserva el arreglo de
+filas a quitar (tantos elementos como envíos eliminados).
+"""
+from preflight import COL_KEY, COL_INDEX
+
+DEDUP_FIRST = "primero" # Se envía la primera aparición de cada número
+DEDUP_LAST = "ultimo" # Se envía la última (sus datos sustituyen a los anteriores)
+DEDUP_ALL = "todas" # Se envían todas las variantes; solo se quitan filas idénticas
+DEDUP_POLICIES = (DEDUP_FIRST, DEDUP_LAST, DEDUP_ALL)
+
+
+def _hashes(df, columns):
+    from pandas.util import hash_pandas_object
+    return hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def _hash_groups(hashes, indices):
+    """(orden, primera, última): filas ordenadas por hash y posición, y si abren o cierran su grupo."""
+    import numpy
+    order = numpy.lexsort((indices, hashes)) # Por hash y, dentro de cada hash, por posición
+    sorted_hashes = hashes[order]
+    boundary = sorted_hashes[1:] != sorted_hashes[:-1]
+    return order, numpy.concatenate(([True], boundary)), numpy.concatenate((boundary, [True]))
+
+
+def _in_sorted(values, indices):
+    """Máscara de los 'indices' que están en el arreglo ordenado 'values'."""
+    import numpy
+    indices = numpy.asarray(indices, dtype='int64')
+    if values is None or not len(values):
+        return numpy.zeros(len(indices), dtype=bool)
+    positions = numpy.searchsorted(values, indices)
+    positions[positions >= len(values)] = len(values) - 1
+    return values[positions] == indices
+
+
+class DuplicateIndex:
+    """
+    Se alimenta con bloques ya normalizados (add_chunk) y, tras finish(), indica
+    qué índices de fila sobran según la política. Si 'needs_confirmation', las
+    candidatas se confirman pasando otra vez los bloques (confirm_chunk y
+    confirm_finish); sin esa pasada se quitan las filas con el mismo hash.
+    'duplicates' cuenta las filas que repiten un número ya listado; 'removed' las
+    que se dejarán de enviar.
+    """
+
+    def __init__(self, policy=DEDUP_FIRST, dynamic_columns=()):
+        if policy not in DEDUP_POLICIES:
+            raise ValueError(f"Política de duplicados desconocida: {policy}")
+        self.policy = policy
+        self.dynamic_columns = [col_name for col_name in dynamic_columns]
+        self.duplicates = 0
+        self.removed = 0
+        self._number_hashes = []
+        self._row_hashes = []
+        self._indices = []
+        self._drop = None
+        self._number_candidates = None # Filas que comparten hash de número con otra
+        self._candidates = None # Filas que comparten el hash de la política con otra
+        self._confirmed = []
+
+    @property
+    def needs_confirmation(self):
+        return self._candidates is not None and len(self._candidates) > 0
+
+    def _columns(self, df):
+        """Columnas que deben coincidir para fusionar dos filas según la política."""
+        if self.policy != DEDUP_ALL:
+            return [COL_KEY]
+        return [COL_KEY] + [col_name for col_name in self.dynamic_columns if col_name in df.columns]
+
+    def add_chunk(self, valid):
+        """Registra las filas válidas de un bloque normalizado."""
+        if valid.empty:
+            return
+        self._number_hashes.append(_hashes(valid, [COL_KEY]))
+        if self.policy == DEDUP_ALL:
+            self._row_hashes.append(_hashes(valid, self._columns(valid)))
+        self._indices.append(valid[COL_INDEX].to_numpy(dtype='int64'))
+
+    def finish(self):
+        """Calcula duplicados y filas a quitar por hash; libera los hashes."""
+        import numpy
+        if not self._indices:
+            self._drop = numpy.empty(0, dtype='int64')
+            return
+        indices = numpy.concatenate(self._indices)
+        number_hashes = numpy.concatenate(self._number_hashes)
+        self.duplicates = len(number_hashes) - len(numpy.unique(number_hashes))
+
+        order, first, last = _hash_groups(number_hashes, indices)
+        self._number_candidates = numpy.sort(indices[order][~(first & last)])
+        if self.policy == DEDUP_ALL:
+            order, first, last = _hash_groups(numpy.concatenate(self._row_hashes), indices)
+            self._candidates = numpy.sort(indices[order][~(first & last)])
+        else:
+            self._candidates = self._number_candidates
+        keep = last if self.policy == DEDUP_LAST else first # Última o primera aparición de cada grupo
+        self._drop = numpy.sort(indices[order][~keep])
+        self.removed = len(self._drop)
+        self._number_hashes, self._row_hashes, self._indices = [], [], []
+
+    def confirm_chunk(self, valid):
+        """Guarda los valores reales de las filas candidatas de un bloque normalizado."""
+        if not self.needs_confirmation or valid.empty:
+            return
+        index = valid[COL_INDEX].to_numpy(dtype='int64')
+        candidates = _in_sorted(self._number_candidates, index) | _in_sorted(self._candidates, index)
+        if candidates.any():
+            self._confirmed.append(valid.loc[candidates, [COL_INDEX] + self._columns(valid)])
+
+    def confirm_finish(self):
+        """Rehace duplicados y filas a quitar comparando valores, no hashes."""
+        import numpy
+        import pandas
+        if not self.needs_confirmation:
+            return
+        rows = pandas.concat(self._confirmed, ignore_index=True).sort_values(COL_INDEX)
+        index = rows[COL_INDEX].to_numpy(dtype='int64')
+        numbers = rows[_in_sorted(self._number_candidates, index)]
+        self.duplicates = int(numbers.duplicated(COL_KEY).sum())
+        merged = rows[_in_sorted(self._candidates, index)]
+        keep = 'last' if self.policy == DEDUP_LAST else 'first'
+        drop = merged.duplicated([col_name for col_name in merged.columns if col_name != COL_INDEX], keep=keep)
+        self._drop = numpy.sort(merged.loc[drop, COL_INDEX].to_numpy(dtype='int64'))
+        self.removed = len(self._drop)
+        self._number_candidates = self._candidates = None
+        self._confirmed = []
+
+    def drop_mask(self, indices):
+        """Máscara (numpy bool) de las filas de 'indices' que no se envían."""
+        return _in_sorted(self._drop, indices)
@@ -0,0 +1,136 @@
+# failure_log.py
+import csv
+import time
+import queue
+import threading
+
+FAILURE_LOG_HEADER = ['Numero', 'Nombre', 'Razon_Fallo', 'Detalle_Error']
+
+# Marca interna para detener el hilo de escritura
+_STOP = object()
+
+
+class FailureLogWriter:
+    """
+    Escritor de larga vida para el CSV de fallos. Acumula filas en memoria y las
+    escribe por lotes cuando hay 'batch_size' filas o pasaron 'flush_interval'
+    segundos desde la última escritura. Con background=True la escritura se hace
+    en un hilo propio, así la latencia del disco nunca frena el bucle de envío.
+    'on_error' recibe un str si falla una escritura en segundo plano. 'on_batch'
+    recibe cada lote ya escrito, en el mismo hilo (p. ej. el historial de números).
+    """
+
+    def __init__(self, path, batch_size=200, flush_interval=1.0, background=False, on_error=None, on_batch=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.background = background
+        self.on_error = on_error
+        self.on_batch = on_batch
+        self._lock = threading.Lock()
+        self._rows = []
+        self._last_flush = time.monotonic()
+        self._closed = False
+
+        # Usamos 'w' (write) para crear/sobrescribir el archivo con la cabecera
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file, delimiter=';')
+        self._writer.writerow(FAILURE_LOG_HEADER)
+        self._file.flush()
+
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name="FailureLogWriter", daemon=True)
+            self._thread.start()
+
+    def log(self, row):
+        """Añade una fila. En modo síncrono puede lanzar la excepción de escritura."""
+        if self._closed:
+            raise ValueError("El log de fallos ya está cerrado.")
+        if self._queue is not None:
+            self._queue.put(row)
+            return
+        with self._lock:
+            self._rows.append(row)
+            if self._should_flush():
+                self._write_pending()
+
+    def log_many(self, rows):
+        """Añade varias filas de una vez."""
+        if self._closed:
+            raise ValueError("El log de fallos ya está cerrado.")
+        if self._queue is not None:
+            for row in rows:
+                self._queue.put(row)
+            return
+        with self._lock:
+            self._rows.extend(rows)
+            if self._should_flush():
+                self._write_pending()
+
+    def _should_flush(self):
+        return (len(self._rows) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def _write_pending(self):
+        rows, self._rows = self._rows, []
+        if rows:
+            self._writer.writerows(rows)
+        self._file.flush()
+        self._last_flush = time.monotonic()
+        if rows and self.on_batch is not None:
+            self.on_batch(rows)
+
+    def _run(self):
+        """Bucle del hilo de escritura: junta filas de la cola y las escribe por lotes."""
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            try:
+                with self._lock:
+                    if isinstance(item, threading.Event) or item is _STOP:
+                        self._write_pending()
+                    elif item is not None:
+                        self._rows.append(item)
+                        if self._should_flush():
+                            self._write_pending()
+                    elif self._rows:
+                        self._write_pending()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(f"ADVERTENCIA: No se pudo escribir en log: {e}")
+            if item is _STOP:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+
+    def flush(self):
+        """Escribe todo lo pendiente (en segundo plano, espera a que el hilo lo haga)."""
+        if self._closed:
+            return
+        if self._queue is not None:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait(timeout=10)
+            return
+        with self._lock:
+            self._write_pending()
+
+    def close(self):
+        """Vacía el buffer y cierra el archivo (idempotente)."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+        with self._lock:
+            try:
+                self._write_pending()
+            finally:
+                self._file.close()
+
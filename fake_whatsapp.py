@@ -0,0 +1,254 @@
+# fake_whatsapp.py
+"""
+Servidor HTTP local que imita las páginas de WhatsApp Web que usa el envío
+(mismas marcas data-tab, popup-controls-ok y data-icon='send'), con latencia
+y tasas de fallo configurables. Sirve para medir el pipeline sin red.
+
+Para probar la navegación en la página (in_page_navigation, experimental), las
+páginas abren un chat sin recargar cuando se pulsa un enlace 'whatsapp://send?...':
+solo piden el fragmento /chat-state y no pagan 'bootstrap_delay', el arranque del
+SPA que sí cuesta cada carga completa (/ y /send). WhatsApp Web real no enruta ese
+enlace dentro de la página, así que esas cifras no valen para el sitio real.
+
+Uso:  python fake_whatsapp.py --port 8765 --latency 0.3 --bootstrap-delay 1.5 --invalid-rate 0.1
+Luego apuntar el transporte a http://127.0.0.1:8765 (HttpTransport o SeleniumTransport).
+"""
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# Script común del SPA: muestra un estado de chat y enruta los enlaces
+# 'whatsapp://send?...' sin recargar (pide /chat-state y cambia la URL con pushState).
+APP_SCRIPT = """<script>
+function showChat(body) {{
+  var app = document.getElementById('app');
+  app.innerHTML = body;
+  var btn = document.getElementById('send-btn');
+  if (btn) btn.addEventListener('click', function () {{
+    var msg = document.createElement('div');
+    msg.className = 'message-out';
+    msg.innerHTML = '<span data-icon="msg-time"></span>';
+    document.getElementById('messages').appendChild(msg);
+    fetch('/click' + window.location.search).then(function () {{
+      msg.firstChild.setAttribute('data-icon', 'msg-check');
+    }});
+  }});
+  var ok = document.getElementById('popup-ok');
+  if (ok) ok.addEventListener('click', function () {{ ok.remove(); }});
+}}
+document.addEventListener('click', function (event) {{
+  var link = event.target.closest ? event.target.closest('a') : null;
+  var href = link ? link.getAttribute('href') || '' : '';
+  if (href.indexOf('whatsapp://send?') !== 0) return;
+  event.preventDefault();
+  var query = href.substring(href.indexOf('?'));
+  history.pushState(null, '', '/send' + query);
+  document.getElementById('app').innerHTML = '';
+  fetch('/chat-state' + query).then(function (r) {{ return r.text(); }}).then(function (body) {{
+    setTimeout(function () {{ showChat(body); }}, {render_delay_ms});
+  }});
+}}, true);
+</script>"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>WhatsApp (local)</title></head>
+<body><div id="pane-side" aria-label="Lista de chats"><div role="listitem">Chat local</div></div>
+<div id="app"></div>
+{script}</body></html>
+"""
+
+# El contenido del chat se inserta con JS tras 'render_delay' ms para imitar el
+# renderizado del SPA; el <template> deja las marcas visibles en el HTML crudo.
+CHAT_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>WhatsApp (local)</title></head>
+<body><div id="app"></div>
+<template id="state">{body}</template>
+{script}
+<script>
+setTimeout(function () {{
+  showChat(document.getElementById('state').innerHTML);
+}}, {render_delay_ms});
+</script></body></html>
+"""
+
+CHAT_READY_BODY = """<div id="main">
+<div contenteditable="true" data-tab="10" role="textbox">{text}</div>
+<button id="send-btn" aria-label="Enviar"><span data-icon="send"></span></button>
+<div id="messages"></div>
+</div>"""
+
+INVALID_NUMBER_BODY = """<div role="dialog">
+<div>El número de teléfono compartido a través de la dirección URL es inválido.</div>
+<div id="popup-ok" role="button" data-testid="popup-controls-ok">OK</div>
+</div>"""
+
+# Ni chat ni popup: el cliente acabará en timeout
+STALLED_BODY = """<div class="loading">Cargando...</div>"""
+
+
+class FakeWhatsAppServer:
+    """
+    Servidor falso de WhatsApp Web en un hilo de fondo.
+    - latency: segundos de espera antes de responder cada página o fragmento.
+    - bootstrap_delay: segundos extra de cada carga completa (arranque del SPA).
+    - render_delay: segundos que tarda el JS de la página en mostrar el chat.
+    - invalid_rate: probabilidad de responder con el popup de número inválido.
+    - stall_rate: probabilidad de responder una página que nunca termina de cargar.
+    Los números listados en 'invalid_numbers' siempre dan popup.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, render_delay=0.0,
+                 invalid_rate=0.0, stall_rate=0.0, invalid_numbers=None, seed=None, bootstrap_delay=0.0):
+        self.latency = latency
+        self.bootstrap_delay = bootstrap_delay
+        self.render_delay = render_delay
+        self.invalid_rate = invalid_rate
+        self.stall_rate = stall_rate
+        self.invalid_numbers = set(invalid_numbers or [])
+        self._random = random.Random(seed)
+        self._stats_lock = threading.Lock()
+        # 'in_page': chats abiertos con /chat-state (sin recargar)
+        self.stats = {'home': 0, 'chats': 0, 'in_page': 0, 'invalid': 0, 'stalled': 0, 'clicks': 0}
+        self.sent = [] # (phone, text) de cada clic en enviar
+
+        server = self
+        class Handler(_FakeWhatsAppHandler):
+            fake = server
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def choose_state(self, phone):
+        """Decide qué página servir para un número: 'ready', 'invalid' o 'stalled'."""
+        digits = ''.join(ch for ch in phone if ch.isdigit())
+        if digits in self.invalid_numbers:
+            return 'invalid'
+        with self._stats_lock:
+            roll = self._random.random()
+        if roll < self.invalid_rate:
+            return 'invalid'
+        if roll < self.invalid_rate + self.stall_rate:
+            return 'stalled'
+        return 'ready'
+
+    def chat_body(self, phone, text):
+        """Contenido del chat para un número (cuenta el chat y su estado)."""
+        state = self.choose_state(phone)
+        self._count('chats')
+        if state == 'invalid':
+            self._count('invalid')
+            return INVALID_NUMBER_BODY
+        if state == 'stalled':
+            self._count('stalled')
+            return STALLED_BODY
+        return CHAT_READY_BODY.format(text=html.escape(text))
+
+    @property
+    def script(self):
+        return APP_SCRIPT.format(render_delay_ms=int(self.render_delay * 1000))
+
+
+class _FakeWhatsAppHandler(BaseHTTPRequestHandler):
+    fake = None # FakeWhatsAppServer, asignado por subclase
+
+    def log_message(self, format, *args):
+        pass # Silencioso: el servidor se usa en benchmarks
+
+    def _reply(self, status, body, content_type='text/html; charset=utf-8'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        fake = self.fake
+        phone = query.get('phone', [''])[0]
+        text = query.get('text', [''])[0]
+        if parts.path in ('/', ''):
+            if fake.latency or fake.bootstrap_delay: time.sleep(fake.latency + fake.bootstrap_delay)
+            fake._count('home')
+            self._reply(200, HOME_PAGE.format(script=fake.script))
+        elif parts.path == '/send':
+            if fake.latency or fake.bootstrap_delay: time.sleep(fake.latency + fake.bootstrap_delay)
+            body = fake.chat_body(phone, text)
+            self._reply(200, CHAT_PAGE.format(body=body, script=fake.script,
+                                              render_delay_ms=int(fake.render_delay * 1000)))
+        elif parts.path == '/chat-state':
+            if fake.latency: time.sleep(fake.latency)
+            fake._count('in_page')
+            self._reply(200, fake.chat_body(phone, text))
+        elif parts.path == '/click':
+            fake._count('clicks')
+            with fake._stats_lock:
+                fake.sent.append((phone, text))
+            self._reply(200, '{"ok": true}', 'application/json')
+        elif parts.path == '/stats':
+            with fake._stats_lock:
+                body = json.dumps(fake.stats)
+            self._reply(200, body, 'application/json')
+        else:
+            self._reply(404, 'Not found', 'text/plain; charset=utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WhatsApp Web falso para pruebas de carga locales.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Segundos de latencia por página.")
+    parser.add_argument('--bootstrap-delay', type=float, default=0.0,
+                        help="Segundos extra de cada carga completa de página (arranque del SPA).")
+    parser.add_argument('--render-delay', type=float, default=0.0, help="Segundos hasta que aparece el chat.")
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help="Probabilidad de popup de número inválido.")
+    parser.add_argument('--stall-rate', type=float, default=0.0, help="Probabilidad de página que no carga.")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeWhatsAppServer(args.host, args.port, args.latency, args.render_delay,
+                                args.invalid_rate, args.stall_rate, seed=args.seed,
+                                bootstrap_delay=args.bootstrap_delay)
+    print(f"WhatsApp Web falso escuchando en {server.url} (Ctrl+C para salir)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# headless.py
+"""
+Punto de entrada sin interfaz gráfica (servidores, systemd, tareas programadas).
+Ejecuta una campaña con SenderModel usando solo QtCore (sin widgets) y escribe
+el log en la salida estándar.
+
+Uso:
+  python headless.py --file destinatarios.txt --template-file plantilla.txt \\
+      --var minombre="Juan Pérez" --var miempresa="Universidad Ejemplo" --sessions 2
+  python headless.py --config campaña.json
+  python headless.py --batch campañas_del_dia/ --template-file plantilla.txt --var minombre="Juan Pérez"
+
+El archivo de configuración (JSON) admite las mismas opciones:
+  {"file": "...", "template": "..." o "template_file": "...", "static_vars": {...},
+   "sessions": 1, "max_per_minute": 10, "resume": false, "known_bad": "omitir", "duplicates": "primero",
+   "in_page_navigation": false, "metrics_file": "metricas.jsonl", "metrics_port": 9464, "engine": "selenium",
+   "schedule": {"priority_column": "prioridad", "priority_order": "asc", "not_before_column": "enviar_desde",
+                "timezone_column": "zona", "timezone": "America/Mexico_City",
+                "windows": ["lun-vie 09:00-18:00", "sab 10:00-14:00"]},
+   "logs_dir": "...",
+   "profiles_dir": "...", "browser_args": ["--headless=new"], "login_timeout": 300}
+Los argumentos de la línea de comandos tienen prioridad sobre el archivo.
+Las columnas de programación que no aparecen en la plantilla se añaden al final
+de cada fila del archivo (prioridad;enviar_desde;zona en el ejemplo anterior).
+
+El QR no se puede escanear sin pantalla: inicia sesión una vez con la interfaz
+(o sin --headless-browser) y las siguientes ejecuciones reutilizan el perfil guardado.
+
+Con --batch (carpeta o manifiesto JSON, ver batch.py) se envían varias campañas
+seguidas con el mismo navegador abierto y al final se escribe un resumen del lote.
+"""
+import os
+import sys
+import json
+import signal
+import argparse
+import datetime
+
+EXIT_OK = 0
+EXIT_CONFIG_ERROR = 1
+EXIT_LOGIN_TIMEOUT = 3
+EXIT_INTERRUPTED = 130
+
+DEFAULT_LOGIN_TIMEOUT = 300 # Segundos esperando el login antes de abandonar
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="AuraSend sin interfaz: envía una campaña desde la terminal.")
+    parser.add_argument('--config', help="Archivo JSON con la configuración de la campaña.")
+    parser.add_argument('--file', help="Archivo de destinatarios (numero;col1;col2...).")
+    parser.add_argument('--batch', help="Carpeta o manifiesto JSON con varias campañas para enviar seguidas "
+                                        "con el mismo navegador.")
+    parser.add_argument('--template', help="Plantilla del mensaje.")
+    parser.add_argument('--template-file', help="Archivo de texto (UTF-8) con la plantilla del mensaje.")
+    parser.add_argument('--var', action='append', default=None, metavar='NOMBRE=VALOR',
+                        help="Variable estática (se puede repetir).")
+    parser.add_argument('--sessions', type=int, help="Sesiones de navegador en paralelo (por defecto 1).")
+    parser.add_argument('--max-per-minute', type=int, help="Máximo de mensajes por minuto y sesión (0 = sin límite).")
+    parser.add_argument('--resume', action='store_true', default=None, help="Reanudar omitiendo los ya enviados.")
+    parser.add_argument('--known-bad', choices=('omitir', 'al_final', 'ignorar'),
+                        help="Números sin WhatsApp en campañas anteriores: omitir (por defecto), al_final o ignorar.")
+    parser.add_argument('--duplicates', choices=('primero', 'ultimo', 'todas'),
+                        help="Números repetidos en el archivo: enviar la primera fila (por defecto), "
+                             "la última o cada variante distinta.")
+    parser.add_argument('--in-page-navigation', action='store_true', default=None,
+                        help="Experimental: abrir los chats sin recargar con un enlace whatsapp:// "
+                             "(solo lo enruta fake_whatsapp.py; en WhatsApp Web real se recarga igual).")
+    parser.add_argument('--metrics-file', help="Archivo JSONL con los tiempos por etapa de cada destinatario.")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Puerto local para exponer las métricas en formato Prometheus (/metrics).")
+    parser.add_argument('--engine', choices=('selenium', 'async'),
+                        help="Motor de envío: selenium (un hilo por sesión, por defecto) o async "
+                             "(todas las sesiones en un bucle asyncio por DevTools).")
+    parser.add_argument('--priority-column', help="Columna con la prioridad de cada destinatario (número).")
+    parser.add_argument('--priority-order', choices=('asc', 'desc'),
+                        help="asc: 1 antes que 2 (por defecto); desc: 2 antes que 1.")
+    parser.add_argument('--not-before-column',
+                        help="Columna con la fecha y hora mínima de envío (AAAA-MM-DD HH:MM o DD/MM/AAAA HH:MM).")
+    parser.add_argument('--timezone-column', help="Columna con la zona horaria de cada destinatario.")
+    parser.add_argument('--timezone', help="Zona horaria por defecto (p. ej. America/Mexico_City o UTC-6).")
+    parser.add_argument('--window', action='append', default=None, metavar='DÍAS HH:MM-HH:MM',
+                        help="Ventana de envío, p. ej. 'lun-vie 09:00-18:00' (se puede repetir).")
+    parser.add_argument('--logs-dir', help="Carpeta de logs (por defecto ./logs).")
+    parser.add_argument('--profiles-dir', help="Carpeta de perfiles de Edge (por defecto ./perfiles).")
+    parser.add_argument('--headless-browser', action='store_true', default=None,
+                        help="Abrir Edge sin ventana (requiere un perfil con sesión ya iniciada).")
+    parser.add_argument('--login-timeout', type=int,
+                        help=f"Segundos de espera del login antes de abandonar (por defecto {DEFAULT_LOGIN_TIMEOUT}).")
+    return parser
+
+
+def load_config(args):
+    """Combina el archivo de configuración con los argumentos. Lanza ValueError si falta algo."""
+    config = {}
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError("El archivo de configuración debe ser un objeto JSON.")
+
+    overrides = {
+        'file': args.file,
+        'batch': args.batch,
+        'template': args.template,
+        'template_file': args.template_file,
+        'sessions': args.sessions,
+        'max_per_minute': args.max_per_minute,
+        'resume': args.resume,
+        'known_bad': args.known_bad,
+        'duplicates': args.duplicates,
+        'in_page_navigation': args.in_page_navigation,
+        'metrics_file': args.metrics_file,
+        'metrics_port': args.metrics_port,
+        'engine': args.engine,
+        'logs_dir': args.logs_dir,
+        'profiles_dir': args.profiles_dir,
+        'login_timeout': args.login_timeout,
+    }
+    config.update({key: value for key, value in overrides.items() if value is not None})
+
+    schedule_overrides = {
+        'priority_column': args.priority_column,
+        'priority_order': args.priority_order,
+        'not_before_column': args.not_before_column,
+        'timezone_column': args.timezone_column,
+        'timezone': args.timezone,
+        'windows': args.window,
+    }
+    schedule = dict(config.get('schedule') or {})
+    schedule.update({key: value for key, value in schedule_overrides.items() if value is not None})
+    from scheduling import ScheduleConfig # Solo biblioteca estándar al importarse
+    config['schedule'] = ScheduleConfig.from_dict(schedule) if schedule else None
+
+    static_vars = dict(config.get('static_vars') or {})
+    for item in args.var or []:
+        name, sep, value = item.partition('=')
+        if not sep or not name.strip():
+            raise ValueError(f"Variable estática mal escrita: '{item}' (usa NOMBRE=VALOR).")
+        static_vars[name.strip()] = value
+    config['static_vars'] = {name: str(value) for name, value in static_vars.items()}
+
+    if args.template is None and config.get('template_file'):
+        with open(config['template_file'], 'r', encoding='utf-8') as f:
+            config['template'] = f.read()
+    config['template'] = (config.get('template') or '').strip()
+
+    browser_args = list(config.get('browser_args') or [])
+    if (args.headless_browser or config.get('headless_browser')) and '--headless=new' not in browser_args:
+        browser_args.append('--headless=new')
+    config['browser_args'] = browser_args
+
+    if config.get('batch'):
+        if not os.path.exists(config['batch']):
+            raise ValueError(f"Lote no encontrado: {config['batch']}")
+        return config # Archivo y plantilla pueden venir de cada trabajo (batch.py los valida)
+    if not config.get('file') or not os.path.exists(config['file']):
+        raise ValueError(f"Archivo de destinatarios no encontrado: {config.get('file') or '(sin indicar)'}")
+    if not config['template']:
+        raise ValueError("Falta la plantilla del mensaje (--template o --template-file).")
+    return config
+
+
+def template_columns(template, static_vars):
+    """Columnas dinámicas de la plantilla; misma validación que el controlador de la GUI."""
+    from template_engine import extract_placeholders, dynamic_columns_for
+    static_var_names = list(static_vars.keys())
+    dynamic_columns = dynamic_columns_for(template, static_var_names)
+    all_available_vars = set(static_var_names + dynamic_columns + ['numero'])
+    missing_vars = [p for p in extract_placeholders(template) if p not in all_available_vars]
+    if missing_vars:
+        raise ValueError(f"Variable(s) no definida(s): {', '.join(missing_vars)}")
+    try:
+        template.format_map({k: f"[{k}]" for k in all_available_vars})
+    except Exception as e:
+        raise ValueError(f"Revisa llaves de la plantilla: {e}")
+    return dynamic_columns
+
+
+def start_campaign(model, config, dynamic_columns, keep_browser=False, logs_dir=None):
+    """Carga el archivo de 'config' y arranca la campaña con sus opciones."""
+    from pacing import DEFAULT_MAX_PER_MINUTE
+    model.set_file_path(config['file'])
+    model.start_process(config['static_vars'], config['template'], dynamic_columns,
+                        config.get('sessions') or 1, config.get('max_per_minute', DEFAULT_MAX_PER_MINUTE),
+                        bool(config.get('resume')), config['browser_args'],
+                        config.get('known_bad') or 'omitir', config.get('duplicates') or 'primero',
+                        bool(config.get('in_page_navigation')), config.get('metrics_file'),
+                        config.get('engine') or 'selenium', config.get('schedule'), keep_browser, logs_dir)
+
+
+class HeadlessRunner:
+    """
+    Conecta las señales de SenderModel a la salida estándar y termina el bucle al
+    acabar (en modo lote, al terminar el lote: exit_on_finish=False).
+    """
+
+    def __init__(self, app, model, login_timeout=DEFAULT_LOGIN_TIMEOUT, stream=None, exit_on_finish=True):
+        from PySide6.QtCore import QTimer
+        self.app = app
+        self.model = model
+        self.stream = stream or sys.stdout
+        self.exit_code = EXIT_OK
+        self._last_progress = -1
+
+        model.log_batch.connect(self.print_lines)
+        model.progress_update.connect(self.on_progress)
+        model.ask_login_confirmation.connect(self.on_ask_login)
+        model.login_completed.connect(self.on_login_completed)
+        if exit_on_finish:
+            model.process_finished.connect(self.on_finished)
+
+        # Sin botón de confirmar: los workers vigilan el login y siguen solos
+        self._login_timer = QTimer()
+        self._login_timer.setSingleShot(True)
+        self._login_timer.setInterval(max(1, int(login_timeout)) * 1000)
+        self._login_timer.timeout.connect(self.on_login_timeout)
+
+        # Qt no devuelve el control a Python mientras espera eventos; este temporizador
+        # permite atender SIGINT/SIGTERM con el bucle en marcha.
+        self._signal_timer = QTimer()
+        self._signal_timer.timeout.connect(lambda: None)
+        self._signal_timer.start(500)
+        signal.signal(signal.SIGINT, self.on_signal)
+        if hasattr(signal, 'SIGTERM'):
+            signal.signal(signal.SIGTERM, self.on_signal)
+
+    def print_line(self, message):
+        timestamp = datetime.datetime.now().strftime('%H:%M:%S')
+        print(f"{timestamp} {message}", file=self.stream, flush=True)
+
+    def print_lines(self, lines):
+        for message in lines:
+            self.print_line(message)
+
+    def on_progress(self, value):
+        # Solo cada 10% (con varias sesiones los valores pueden llegar desordenados)
+        if value > self._last_progress and (value // 10 > self._last_progress // 10 or value == 100):
+            self.print_line(f"Progreso: {value}%")
+        self._last_progress = max(self._last_progress, value)
+
+    def on_ask_login(self):
+        self.print_line("Esperando inicio de sesión en WhatsApp Web (escanea el QR en el navegador)...")
+        self._login_timer.start()
+
+    def on_login_completed(self):
+        self._login_timer.stop()
+
+    def on_login_timeout(self):
+        if self.model._waiting_sessions():
+            self.print_line("No se detectó el inicio de sesión a tiempo. Deteniendo...")
+            self.exit_code = EXIT_LOGIN_TIMEOUT
+            self.model.stop_process()
+
+    def on_signal(self, signum, frame):
+        self.print_line(f"Señal {signum} recibida. Deteniendo...")
+        self.exit_code = EXIT_INTERRUPTED
+        if self.model.is_running():
+            self.model.stop_process()
+        else:
+            self.app.exit(self.exit_code)
+
+    def on_finished(self):
+        self._login_timer.stop()
+        self._signal_timer.stop()
+        self.app.exit(self.exit_code)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        config = load_config(args)
+        if config.get('batch'):
+            from batch import load_jobs
+            jobs = load_jobs(config['batch'], config)
+        else:
+            dynamic_columns = template_columns(config['template'], config['static_vars'])
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+
+    # Solo QtCore: bucle de eventos para hilos y señales, sin widgets ni pantalla
+    from PySide6.QtCore import QCoreApplication
+    from model import SenderModel
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    model = SenderModel(logs_dir=config.get('logs_dir'), profiles_dir=config.get('profiles_dir'))
+    runner = HeadlessRunner(app, model, config.get('login_timeout') or DEFAULT_LOGIN_TIMEOUT,
+                            exit_on_finish=not config.get('batch'))
+
+    if config.get('metrics_port'):
+        try:
+            print(f"Métricas en {model.serve_metrics(int(config['metrics_port']))}", flush=True)
+        except OSError as e:
+            print(f"ADVERTENCIA: No se pudo abrir el puerto de métricas: {e}", file=sys.stderr)
+    if config.get('batch'):
+        from batch import BatchRunner, batch_logs_dir
+        batch = BatchRunner(model, jobs, batch_logs_dir(model.logs_dir, config['batch']),
+                            should_continue=lambda: runner.exit_code == EXIT_OK, log=runner.print_line)
+        batch.finished.connect(runner.on_finished)
+        batch.start()
+    else:
+        start_campaign(model, config, dynamic_columns)
+    app.exec()
+    model.close_browsers() # Modo lote, o si se interrumpió entre dos trabajos
+    return runner.exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# journal.py
+import os
+import time
+import hashlib
+import datetime
+import threading
+
+JOURNAL_HEADER = "# AuraSend journal v1"
+STATUS_SENT = "enviado"
+STATUS_FAILED = "fallido"
+STATUS_UNCONFIRMED = "sin_confirmar" # Se pulsó enviar sin ver la palomita: no se reenvía al reanudar
+
+
+class CampaignJournal:
+    """
+    Bitácora de solo-anexado con el resultado de cada destinatario de una campaña,
+    identificado por (índice de fila, número). Las escrituras se agrupan y se
+    hace fsync cada 'batch_size' registros o cada 'flush_interval' segundos,
+    así una caída pierde como mucho el último lote.
+    Formato por línea: indice;numero;estado;fecha
+    """
+
+    def __init__(self, path, batch_size=50, flush_interval=2.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._delivered = set()
+
+    @staticmethod
+    def path_for(data_file_path, logs_dir):
+        """Ruta de la bitácora asociada a un archivo de destinatarios."""
+        abs_path = os.path.abspath(data_file_path)
+        digest = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()[:10]
+        base = os.path.splitext(os.path.basename(abs_path))[0]
+        journals_dir = os.path.join(logs_dir, "journals")
+        os.makedirs(journals_dir, exist_ok=True)
+        return os.path.join(journals_dir, f"{base}_{digest}.journal")
+
+    def open(self, resume):
+        """
+        Abre la bitácora. Con resume=True carga los envíos ya hechos y sigue
+        anexando; si no, empieza una bitácora nueva. Devuelve cuántos envíos se cargaron.
+        """
+        with self._lock:
+            self._delivered = set()
+            if resume and os.path.exists(self.path):
+                self._load()
+                self._file = open(self.path, 'a', encoding='utf-8')
+            else:
+                self._file = open(self.path, 'w', encoding='utf-8')
+                self._file.write(f"{JOURNAL_HEADER}\n")
+                self._sync()
+            return len(self._delivered)
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line.startswith('#') or not line.endswith('\n'):
+                    continue # Cabecera o última línea cortada por una caída
+                parts = line.rstrip('\n').split(';')
+                if len(parts) < 3 or not parts[0].isdigit():
+                    continue
+                key = (int(parts[0]), parts[1])
+                if parts[2] in (STATUS_SENT, STATUS_UNCONFIRMED):
+                    self._delivered.add(key)
+
+    def was_delivered(self, index, numero):
+        """True si la fila (index, numero) ya se envió en una ejecución anterior. O(1)."""
+        return (index, numero) in self._delivered
+
+    def record(self, index, numero, status):
+        with self._lock:
+            if self._file is None:
+                return
+            timestamp = datetime.datetime.now().isoformat(timespec='seconds')
+            self._file.write(f"{index};{numero};{status};{timestamp}\n")
+            self._pending += 1
+            if (self._pending >= self.batch_size
+                    or time.monotonic() - self._last_sync >= self.flush_interval):
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._sync()
+            finally:
+                self._file.close()
+                self._file = None
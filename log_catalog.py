@@ -0,0 +1,161 @@
+# log_catalog.py
+"""
+Catálogo local (SQLite) de las ejecuciones y sus logs de fallos. Cada campaña
+registra al terminar su archivo de log, fechas, contadores y los fallos por
+Razon_Fallo, así el visor lista, filtra y resume el historial con una consulta
+en lugar de recorrer la carpeta de logs. Los logs anteriores al catálogo se
+importan una sola vez, cuando se crea la base.
+"""
+import os
+import csv
+import glob
+import sqlite3
+import datetime
+from collections import Counter
+from contextlib import contextmanager
+
+CATALOG_FILE_NAME = "catalogo_logs.sqlite"
+LOG_NAME_PATTERN = "log_errores_*.csv"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_path TEXT UNIQUE,
+    data_file TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    total INTEGER DEFAULT 0,
+    sent INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0,
+    skipped INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS run_reasons (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    reason TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (run_id, reason)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_reasons_reason ON run_reasons(reason);
+"""
+
+
+def timestamp_from_log_name(path):
+    """Fecha ISO a partir de 'log_errores_YYYYmmdd-HHMMSS.csv' (o de la fecha del archivo)."""
+    stem = os.path.splitext(os.path.basename(path))[0].rsplit('_', 1)[-1]
+    try:
+        return datetime.datetime.strptime(stem, "%Y%m%d-%H%M%S").isoformat(timespec='seconds')
+    except ValueError:
+        return datetime.datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds')
+
+
+def count_reasons(path):
+    """Fallos por Razon_Fallo de un CSV de log existente."""
+    reasons = Counter()
+    with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        reader = csv.reader(f, delimiter=';')
+        next(reader, None) # Cabecera
+        for row in reader:
+            if len(row) > 2 and row[2].strip():
+                reasons[row[2]] += 1
+    return reasons
+
+
+class LogCatalog:
+    """
+    Acceso al catálogo. Abre una conexión por operación, así se puede usar desde
+    el hilo de la interfaz y desde los workers sin compartir conexiones.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.is_new = not os.path.exists(db_path)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_logs_dir(cls, logs_dir):
+        return cls(os.path.join(logs_dir, CATALOG_FILE_NAME))
+
+    @contextmanager
+    def _connect(self):
+        """Conexión de una operación: confirma al salir (o deshace si hubo error) y se cierra."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA foreign_keys = ON")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_run(self, log_path, data_file, started_at, finished_at, total, sent, failed, skipped, reasons):
+        """Registra (o actualiza) una ejecución con sus fallos por razón. log_path puede ser None."""
+        if log_path is not None:
+            log_path = os.path.abspath(log_path)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (log_path, data_file, started_at, finished_at, total, sent, failed, skipped) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(log_path) DO UPDATE SET data_file=excluded.data_file, started_at=excluded.started_at, "
+                "finished_at=excluded.finished_at, total=excluded.total, sent=excluded.sent, "
+                "failed=excluded.failed, skipped=excluded.skipped",
+                (log_path, data_file, started_at, finished_at, total, sent, failed, skipped))
+            run_id = cursor.lastrowid
+            if log_path is not None:
+                run_id = conn.execute("SELECT id FROM runs WHERE log_path = ?", (log_path,)).fetchone()[0]
+            conn.execute("DELETE FROM run_reasons WHERE run_id = ?", (run_id,))
+            conn.executemany("INSERT INTO run_reasons (run_id, reason, count) VALUES (?, ?, ?)",
+                             [(run_id, reason, count) for reason, count in reasons.items() if count])
+            return run_id
+
+    def import_existing(self, logs_dir):
+        """Importa los logs de la carpeta que aún no están en el catálogo. Devuelve cuántos."""
+        with self._connect() as conn:
+            known = {row[0] for row in conn.execute("SELECT log_path FROM runs WHERE log_path IS NOT NULL")}
+        imported = 0
+        for path in glob.glob(os.path.join(logs_dir, LOG_NAME_PATTERN)):
+            path = os.path.abspath(path)
+            if path in known:
+                continue
+            try:
+                reasons = count_reasons(path)
+            except OSError:
+                continue
+            started_at = timestamp_from_log_name(path)
+            failed = sum(reasons.values())
+            self.record_run(path, None, started_at, started_at, failed, 0, failed, 0, reasons)
+            imported += 1
+        return imported
+
+    def list_runs(self, reason=None, limit=None):
+        """
+        Ejecuciones con log de fallos, de la más nueva a la más vieja. Con 'reason'
+        solo las que tienen fallos de esa razón. Devuelve dicts.
+        """
+        query = ("SELECT r.id, r.log_path, r.data_file, r.started_at, r.finished_at, "
+                 "r.total, r.sent, r.failed, r.skipped FROM runs r WHERE r.log_path IS NOT NULL")
+        params = []
+        if reason:
+            query += " AND EXISTS (SELECT 1 FROM run_reasons rr WHERE rr.run_id = r.id AND rr.reason = ?)"
+            params.append(reason)
+        query += " ORDER BY r.started_at DESC, r.id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        columns = ('id', 'log_path', 'data_file', 'started_at', 'finished_at', 'total', 'sent', 'failed', 'skipped')
+        with self._connect() as conn:
+            return [dict(zip(columns, row)) for row in conn.execute(query, params)]
+
+    def reason_totals(self):
+        """Fallos acumulados por Razon_Fallo en todo el historial (de mayor a menor)."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT reason, SUM(count) FROM run_reasons GROUP BY reason ORDER BY SUM(count) DESC").fetchall()
+
+    def forget_missing(self):
+        """Quita del catálogo los logs que ya no existen en disco. Devuelve cuántos."""
+        with self._connect() as conn:
+            missing = [(row[0],) for row in conn.execute("SELECT log_path FROM runs WHERE log_path IS NOT NULL")
+                       if not os.path.exists(row[0])]
+            conn.executemany("UPDATE runs SET log_path = NULL WHERE log_path = ?", missing)
+        return len(missing)
@@ -0,0 +1,127 @@
+# log_channel.py
+"""
+Canal de log en vivo entre los workers y la interfaz. Los workers dejan sus
+líneas en un buffer (sin cruzar de hilo una señal por línea) y un QTimer en el
+hilo de la interfaz las entrega en lotes cada FLUSH_INTERVAL_MS. El buffer es un
+anillo de MAX_PENDING_LINES: si la interfaz se atrasa, se descartan las más
+viejas en pantalla. Todas las líneas (también las de detalle, que no se muestran)
+se guardan en un archivo de actividad si hay uno abierto; ese archivo lo escribe
+un hilo propio, así el disco no frena ni a los workers ni a la interfaz.
+"""
+import queue
+import datetime
+import threading
+from collections import deque
+
+from PySide6.QtCore import QObject, Signal, QTimer
+
+FLUSH_INTERVAL_MS = 150
+MAX_PENDING_LINES = 2000 # Máximo de líneas por lote (y de historial en pantalla)
+
+# Marca interna para detener el hilo del archivo de actividad
+_STOP = object()
+
+
+class _ActivityFile:
+    """Archivo de actividad escrito desde su propio hilo: write() solo encola la línea."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="ActivityLogWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, line):
+        self._queue.put(line)
+
+    def _run(self):
+        """Junta todo lo que haya en la cola y lo escribe de una vez."""
+        while True:
+            lines = [self._queue.get()]
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = lines[-1] is _STOP
+            try:
+                self._file.write(''.join(line for line in lines if line is not _STOP))
+                self._file.flush()
+            except OSError:
+                pass # El log en pantalla no debe caer por el archivo de actividad
+            if stop:
+                return
+
+    def close(self):
+        """Escribe lo pendiente y cierra el archivo."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+
+
+class LogChannel(QObject):
+    """
+    post() se puede llamar desde cualquier hilo. batch_ready(list) se emite en el
+    hilo dueño del canal (la interfaz) con las líneas visibles acumuladas.
+    """
+    batch_ready = Signal(list)
+
+    def __init__(self, flush_interval_ms=FLUSH_INTERVAL_MS, max_lines=MAX_PENDING_LINES, parent=None):
+        super().__init__(parent)
+        self.max_lines = max_lines
+        self._lock = threading.Lock()
+        self._pending = deque(maxlen=max_lines)
+        self._dropped = 0
+        self._file = None
+        self.file_path = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(flush_interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        """Detiene el temporizador tras entregar lo pendiente."""
+        self._timer.stop()
+        self.flush()
+
+    def open_file(self, path):
+        """Abre (o cambia) el archivo de actividad donde se guardan todas las líneas."""
+        self.close_file()
+        activity_file = _ActivityFile(path)
+        with self._lock:
+            self._file = activity_file
+        self.file_path = path
+
+    def close_file(self):
+        """Entrega lo pendiente en pantalla y cierra el archivo tras escribir sus últimas líneas."""
+        self.flush()
+        with self._lock:
+            activity_file, self._file = self._file, None
+        if activity_file is not None:
+            activity_file.close()
+
+    def post(self, message, detail=False):
+        """Encola una línea. Las de detalle (URLs, trazas) solo van al archivo."""
+        with self._lock:
+            if self._file is not None:
+                timestamp = datetime.datetime.now().strftime('%H:%M:%S')
+                self._file.write(f"{timestamp} {message}\n")
+            if detail:
+                return
+            if len(self._pending) == self.max_lines:
+                self._dropped += 1
+            self._pending.append(message)
+
+    def flush(self):
+        """Entrega las líneas pendientes en un solo lote (el archivo lo escribe su propio hilo)."""
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            lines.insert(0, f"... {dropped} líneas omitidas en pantalla (ver archivo de actividad).")
+        if lines:
+            self.batch_ready.emit(lines)
@@ -0,0 +1,248 @@
+# log_table.py
+"""
+Modelo de tabla para el visor de logs de fallos. El CSV se abre con mmap y un
+hilo aparte construye el índice de desplazamientos (inicio de cada fila, sin
+cortar los campos entre comillas que tienen saltos de línea), así
+abrir un log es inmediato sin importar su tamaño. La tabla va mostrando filas
+por bloques (canFetchMore/fetchMore) y solo interpreta las filas visibles, con
+una caché pequeña. Ordenar por columna también se calcula fuera del hilo de la
+interfaz.
+"""
+import csv
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal, Slot
+
+FETCH_BATCH_ROWS = 500 # Filas que se añaden a la vista en cada fetchMore
+INDEX_PUBLISH_ROWS = 5000 # Cada cuántas filas indexadas se avisa a la vista
+ROW_CACHE_SIZE = 2000 # Filas ya interpretadas que se conservan
+
+
+def parse_line(raw):
+    """Convierte una fila del CSV (bytes, puede tener saltos dentro de comillas) en la lista de campos."""
+    text = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+    return next(csv.reader([text], delimiter=';'), [])
+
+
+def row_end(mm, start):
+    """
+    Posición del '\n' que cierra la fila que empieza en 'start' (o el final del
+    archivo). Un '\n' dentro de un campo entre comillas (csv.writer las pone si el
+    campo tiene saltos de línea) no corta la fila: las comillas escapadas van
+    dobles, así que un número impar de comillas significa que el campo sigue abierto.
+    """
+    quotes = 0
+    position = start
+    while True:
+        end = mm.find(b'\n', position)
+        if end < 0:
+            return len(mm)
+        quotes += mm[position:end].count(b'"')
+        if quotes % 2 == 0:
+            return end
+        position = end + 1
+
+
+class FailureLogTableModel(QAbstractTableModel):
+    """
+    Tabla de solo lectura sobre un log de fallos (Numero;Nombre;Razon_Fallo;Detalle_Error).
+    Las filas vacías se omiten. indexing_finished(int) avisa el total de filas
+    (se emite en el hilo de la interfaz, así se puede conectar justo después de crearla).
+    """
+    rows_indexed = Signal(int) # Filas indexadas hasta ahora (desde el hilo del índice)
+    indexing_finished = Signal(int)
+    _sort_ready = Signal(object, int, object) # (orden, columna, Qt.SortOrder) desde el hilo de ordenación
+
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        self._mm = None
+        self._headers = []
+        self._data_start = 0
+        self._lock = threading.Lock()
+        self._offsets = array('q')
+        self._indexed = 0 # Filas publicadas por el hilo del índice
+        self._loaded = 0 # Filas ya expuestas a la vista
+        self._finished = False
+        self._reported = False
+        self._closed = False
+        self._order = None # Permutación de filas si la tabla está ordenada
+        self._pending_sort = None
+        self._cache = OrderedDict()
+        self._sort_thread = None
+
+        size = self._file.seek(0, 2)
+        if size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            end = row_end(self._mm, 0)
+            self._headers = parse_line(self._mm[:end])
+            self._data_start = min(end + 1, size)
+
+        self.rows_indexed.connect(self._on_rows_indexed)
+        self._sort_ready.connect(self._apply_sort)
+        self._thread = threading.Thread(target=self._build_index, name="LogIndexer", daemon=True)
+        self._thread.start()
+
+    # --- Índice (hilo aparte) ---
+
+    def _build_index(self):
+        mm = self._mm
+        size = len(mm) if mm is not None else 0
+        position = self._data_start
+        chunk = array('q')
+        total = 0
+        while position < size and not self._closed:
+            end = row_end(mm, position)
+            if mm[position:end].strip(b'\r\t ;'):
+                chunk.append(position)
+            position = end + 1
+            if len(chunk) >= INDEX_PUBLISH_ROWS:
+                total = self._publish(chunk)
+                chunk = array('q')
+        if chunk or not total:
+            total = self._publish(chunk)
+        with self._lock:
+            self._finished = True
+        if not self._closed:
+            self.rows_indexed.emit(total)
+
+    def _publish(self, chunk):
+        with self._lock:
+            self._offsets.extend(chunk)
+            total = len(self._offsets)
+        if not self._closed:
+            self.rows_indexed.emit(total)
+        return total
+
+    @Slot(int)
+    def _on_rows_indexed(self, total):
+        self._indexed = max(self._indexed, total)
+        if self._loaded < FETCH_BATCH_ROWS and self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex()) # Primer bloque sin esperar al scroll
+        if not self._finished or total < len(self._offsets):
+            return
+        if not self._reported:
+            self._reported = True
+            self.indexing_finished.emit(self._indexed)
+        if self._pending_sort is not None:
+            column, order = self._pending_sort
+            self._pending_sort = None
+            self.sort(column, order)
+
+    def is_indexing(self):
+        return not self._finished
+
+    def total_rows(self):
+        return self._indexed
+
+    # --- Acceso a filas ---
+
+    def _row(self, row):
+        """Campos de la fila visible 'row' (interpretados bajo demanda, con caché)."""
+        if self._order is not None:
+            row = self._order[row]
+        cached = self._cache.get(row)
+        if cached is not None:
+            self._cache.move_to_end(row)
+            return cached
+        with self._lock:
+            start = self._offsets[row]
+        fields = parse_line(self._mm[start:row_end(self._mm, start)])
+        self._cache[row] = fields
+        if len(self._cache) > ROW_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return fields
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._headers[section] if section < len(self._headers) else None
+        return section + 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        if self._closed or index.row() >= self._loaded:
+            return None
+        fields = self._row(index.row())
+        return fields[index.column()] if index.column() < len(fields) else ""
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < self._indexed
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH_ROWS, self._indexed - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Ordena en un hilo aparte (todas las filas); se aplica al terminar el índice."""
+        if self._closed or column < 0 or column >= len(self._headers):
+            return
+        if not self._finished:
+            self._pending_sort = (column, order)
+            return
+        self._sort_thread = threading.Thread(target=self._compute_sort, args=(column, order),
+                                             name="LogSorter", daemon=True)
+        self._sort_thread.start()
+
+    def _compute_sort(self, column, order):
+        mm = self._mm
+        with self._lock:
+            offsets = array('q', self._offsets)
+        keys = []
+        for start in offsets:
+            if self._closed:
+                return
+            fields = parse_line(mm[start:row_end(mm, start)])
+            keys.append(fields[column] if column < len(fields) else "")
+        permutation = sorted(range(len(keys)), key=keys.__getitem__,
+                             reverse=order == Qt.SortOrder.DescendingOrder)
+        if not self._closed:
+            self._sort_ready.emit(array('q', permutation), column, order)
+
+    @Slot(object, int, object)
+    def _apply_sort(self, permutation, column, order):
+        if self._closed:
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._order = permutation
+        self._cache.clear()
+        self.layoutChanged.emit()
+
+    def close(self):
+        """Libera el mmap y el archivo (al reemplazar la tabla en el visor)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._thread.join(timeout=2)
+        if self._sort_thread is not None:
+            self._sort_thread.join(timeout=2)
+        self.beginResetModel()
+        self._loaded = 0
+        self._cache.clear()
+        self.endResetModel()
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass
+        self._file.close()
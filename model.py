@@ -1,57 +1,162 @@
 # model.py
 import os
-import pandas
-import re
 from time import sleep
-from urllib.parse import quote
-import random
 import traceback
 import datetime
-import csv
 import glob
 import sys
+from functools import partial
+
+from PySide6.QtCore import QObject, Signal, Slot, QThread, QMetaObject, Qt, QTimer
+
+# Selenium, pandas y el visor de logs se importan al usarse (al abrir Edge, al leer
+# el archivo y al cargar un log) para que la ventana y headless.py arranquen rápido.
+from campaign import SharedCampaign
+from log_channel import LogChannel
+from log_catalog import LogCatalog
+from number_reputation import NumberReputation, POLICY_SKIP, POLICY_DEFER
+from dedup import DEDUP_FIRST
+from preflight import COL_PHONE
+from template_engine import CompiledTemplate
+from profiles import ProfilePool
+from transport import (TransportTimeout, WHATSAPP_WEB_URL, LOGIN_STATE_LOGGED_IN, LOGIN_STATE_QR, CHAT_STATE_INVALID,
+                       NAV_IN_PAGE, NAV_RELOAD)
+from pacing import (AdaptivePacer, DEFAULT_MAX_PER_MINUTE, OUTCOME_OK, OUTCOME_POPUP, OUTCOME_TIMEOUT, OUTCOME_ERROR,
+                    OUTCOME_UNCONFIRMED)
+from send_metrics import (SendMetrics, MetricsServer, STAGE_PACING, STAGE_RENDER, STAGE_URL, STAGE_PAGE_LOAD,
+                          STAGE_CHAT_READY, STAGE_POPUP, STAGE_SEND_BUTTON, STAGE_PRE_CLICK, STAGE_CLICK, STAGE_SENT)
+
+# Tiempo máximo para decidir si el perfil ya tiene sesión (lista de chats) o muestra el QR
+LOGIN_DETECT_TIMEOUT = 30
+# Intervalo para vigilar si el usuario ya escaneó el QR
+LOGIN_POLL_MS = 2000
+# Tiempo máximo para que el chat muestre el cuadro de texto o el popup de número inválido
+CHAT_LOAD_TIMEOUT = 20
+
+# Motores de envío: un hilo con Selenium por sesión, o todas las sesiones en un
+# bucle asyncio por DevTools (async_engine.py)
+ENGINE_SELENIUM = 'selenium'
+ENGINE_ASYNC = 'async'
+ENGINES = (ENGINE_SELENIUM, ENGINE_ASYNC)
+
+SEND_BUTTON_TIMEOUT = 40
+SENT_TICK_TIMEOUT = 15
+
+# --- Resultado de cada destinatario (ambos motores lo registran con _finish_recipient) ---
+RESULT_SENT = 'enviado'
+RESULT_UNCONFIRMED = 'sin_confirmacion' # Clic hecho, palomita no vista
+RESULT_RENDER_ERROR = 'error_plantilla'
+RESULT_CHAT_TIMEOUT = 'timeout_chat'
+RESULT_INVALID = 'sin_wa'
+RESULT_BUTTON_TIMEOUT = 'timeout_boton'
+RESULT_SEND_ERROR = 'error_envio'
+RESULT_FATAL = 'fallo_grave'
+
+# resultado -> (outcome para métricas y pacer, ¿ajusta el pacer?, Razon_Fallo, mensaje del log, detalle del CSV).
+# Mensaje y detalle admiten {numero}, {nombre} (número y nombre) y {error}; sin detalle se guarda el error.
+RECIPIENT_RESULTS = {
+    RESULT_SENT: (OUTCOME_OK, True, None, "✓ Mensaje enviado a: {nombre}", None),
+    RESULT_UNCONFIRMED: (OUTCOME_UNCONFIRMED, True, "Sin confirmación",
+                         "Advertencia: Sin confirmación de envío (palomita) para {nombre}.",
+                         f"Se pulsó enviar pero no apareció la palomita en {SENT_TICK_TIMEOUT}s; "
+                         "revisa el chat antes de reenviar."),
+    RESULT_RENDER_ERROR: (OUTCOME_ERROR, False, "Error de formato de mensaje",
+                          "Error formateo msg para {nombre}: {error}. Saltando...", None),
+    RESULT_CHAT_TIMEOUT: (OUTCOME_TIMEOUT, True, "Timeout Carga Chat",
+                          f"Error: No cargó chat para {{numero}} en {CHAT_LOAD_TIMEOUT}s.",
+                          f"No se pudo cargar la ventana de chat en {CHAT_LOAD_TIMEOUT}s."),
+    RESULT_INVALID: (OUTCOME_POPUP, True, "Número sin WA (Popup)", "Error: Número {numero} inválido/sin WA (popup).",
+                     "El número no tiene WhatsApp o es inválido."),
+    RESULT_BUTTON_TIMEOUT: (OUTCOME_TIMEOUT, True, "Timeout Botón Enviar",
+                            "Error: Botón enviar no encontrado/clicable para {nombre}.",
+                            f"No se encontró el botón de enviar en {SEND_BUTTON_TIMEOUT}s."),
+    RESULT_SEND_ERROR: (OUTCOME_ERROR, True, "Error Inesperado (Envío)", "Error inesperado al enviar a {nombre}: {error}",
+                        None),
+    RESULT_FATAL: (OUTCOME_ERROR, True, "Fallo Grave (Procesando)", "Fallo grave procesando {nombre}: {error}", None),
+}
+
+
+class WarmSession:
+    """Navegador abierto (y con sesión) que una campaña deja a la siguiente (modo lote)."""
+
+    def __init__(self, transport, driver=None, profile_dir=None):
+        self.transport = transport
+        self.driver = driver
+        self.profile_dir = profile_dir
 
-from PySide6.QtCore import QObject, Signal, Slot, QThread, QMetaObject, Qt
-from PySide6.QtGui import QStandardItemModel, QStandardItem
-
-from selenium import webdriver
-from selenium.common import NoSuchElementException, TimeoutException
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
 
 class SenderWorker(QObject):
     """
     Clase que realiza el trabajo pesado de Selenium en un hilo separado.
     Emite señales para comunicar el progreso y estado.
+    Varias instancias pueden compartir una misma SharedCampaign (una por sesión
+    de navegador); cada una toma destinatarios de la cola común.
     """
     finished = Signal()
     progress = Signal(int)
     log_message = Signal(str)
     ask_login = Signal() # Señal para pedir al usuario que confirme el login en la GUI
+    login_detected = Signal() # La sesión se detectó sola (perfil guardado o QR ya escaneado)
+    log_detail = Signal(str) # Detalle (URLs, trazas): solo va al archivo de actividad
     
     # Emitirá la ruta del log y el número de fallos CUANDO termine
     log_file_created = Signal(str, int)
+    browser_kept = Signal(object) # WarmSession que queda abierta al terminar (keep_browser)
 
-    def __init__(self, file_path, static_vars, template_message, dynamic_file_columns):
+    def __init__(self, file_path, static_vars, template_message, dynamic_file_columns, campaign=None, session_id=0,
+                 transport=None, base_url=WHATSAPP_WEB_URL, max_per_minute=DEFAULT_MAX_PER_MINUTE,
+                 profile_pool=None, browser_args=(), catalog=None, in_page_navigation=False, metrics=None,
+                 warm_session=None, keep_browser=False):
         super().__init__()
         self.file_path = file_path
         self.static_vars = static_vars
         self.template_message = template_message
         self.dynamic_file_columns = dynamic_file_columns
         self.expected_columns = ['numero'] + self.dynamic_file_columns
+        # Plantilla compilada una vez (estáticas ya resueltas y codificadas)
+        self.template = CompiledTemplate(template_message, static_vars, dynamic_file_columns)
+        self._name_column = next((col_name for col_name in dynamic_file_columns if col_name.lower() == 'nombre'), None)
         self.is_running = True
         self.driver = None
-        self.recipients = []
-        self.total_messages = 0
-
-        # --- Para Logs ---
-        self.log_file_path = ""
-        self.logs_dir = os.path.join(os.getcwd(), "logs")
-        os.makedirs(self.logs_dir, exist_ok=True)
-        # --- Fin de Logs ---
+        self.session_id = session_id
+        self._sending_started = False
+        self._login_timer = None
+
+        # --- Transporte (Selenium por defecto; uno inyectado evita abrir Edge) ---
+        self.transport = transport
+        self.base_url = base_url
+        self.in_page_navigation = in_page_navigation # Experimental: abrir chats sin recargar (ver transport.py)
+        self.keep_browser = keep_browser # Dejar el navegador abierto al terminar (modo lote)
+
+        # --- Ritmo de envío de esta sesión (una cuenta = un token bucket) ---
+        self.pacer = AdaptivePacer(max_per_minute)
+        # --- Tiempos por etapa de cada destinatario (compartidos entre sesiones) ---
+        self.metrics = metrics or SendMetrics()
+
+        # --- Estado compartido (cola de destinatarios, contadores y log) ---
+        self.campaign = campaign or SharedCampaign(file_path, self.expected_columns)
+        self.logs_dir = self.campaign.logs_dir
+
+        # --- Perfil persistente de Edge (evita escanear el QR en cada campaña) ---
+        self.profile_pool = profile_pool or ProfilePool()
+        self.profile_dir = None
+        self.browser_args = list(browser_args) # Argumentos extra de Edge (p. ej. --headless=new)
+        self.catalog = catalog # LogCatalog donde se registra la ejecución al terminar
+
+        # --- Navegador de la campaña anterior (modo lote): sin arranque ni QR ---
+        self._warm = warm_session is not None
+        if warm_session is not None:
+            self.transport = warm_session.transport
+            self.driver = warm_session.driver
+            self.profile_dir = warm_session.profile_dir
+
+    @property
+    def log_file_path(self):
+        return self.campaign.log_file_path
+
+    @property
+    def total_messages(self):
+        return self.campaign.total_messages
 
     def _log_failure(self, numero, nombre, razon, detalle):
         """
@@ -63,10 +168,7 @@ class SenderWorker(QObject):
             self.log_message.emit("Error: log_file_path no está definido.")
             return
         try:
-            # Usamos 'a' (append) para añadir al archivo existente
-            with open(self.log_file_path, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f, delimiter=';')
-                writer.writerow([numero, nombre, razon, detalle_str])
+            self.campaign.log_failure([numero, nombre, razon, detalle_str])
         except Exception as e:
             self.log_message.emit(f"ADVERTENCIA: No se pudo escribir en log: {e}")
 
@@ -96,47 +198,30 @@ class SenderWorker(QObject):
 
     @Slot()
     def run_initialization(self):
-        """Inicia el proceso: lee archivo, crea log, abre navegador y emite ask_login."""
+        """
+        Inicia el proceso: lee archivo, crea log y abre navegador. Si el perfil ya tiene
+        sesión empieza a enviar directamente; si no, emite ask_login.
+        """
         try:
-            # --- Crear archivo de log para esta sesión ---
-            timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-            self.log_file_path = os.path.join(self.logs_dir, f"log_errores_{timestamp}.csv")
-            try:
-                # Usamos 'w' (write) para crear/sobrescribir el archivo con la cabecera
-                with open(self.log_file_path, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f, delimiter=';')
-                    writer.writerow(['Numero', 'Nombre', 'Razon_Fallo', 'Detalle_Error'])
-                self.log_message.emit(f"Archivo de log iniciado en: {self.log_file_path}")
-            except Exception as e:
-                self.log_message.emit(f"ADVERTENCIA: No se pudo crear archivo log: {e}")
-            # --- Fin de log ---
+            if not self._prepare_campaign():
+                self.cleanup(); return
+
+            if self._warm and self._reuse_warm_browser():
+                self._detect_login_or_ask(); return
+
+            if self.transport is not None:
+                self.log_message.emit(f"Usando transporte {type(self.transport).__name__} ({self.transport.base_url}).")
+                self.transport.open_home()
+                self._detect_login_or_ask(); return
 
-            self.log_message.emit("Leyendo archivo de datos...")
-            try:
-                df = pandas.read_csv(
-                    self.file_path, sep=';', header=None, names=self.expected_columns,
-                    dtype=str, skip_blank_lines=True, encoding='utf-8'
-                )
-                df.dropna(subset=self.expected_columns, how='all', inplace=True)
-                df.fillna("", inplace=True)
-                if df.empty or df['numero'].eq('').all():
-                        raise ValueError(f"Archivo vacío o 'numero' vacío. Formato: {';'.join(self.expected_columns)};")
-
-                self.recipients = df.to_dict('records')
-            except Exception as e:
-                self.log_message.emit(f"Error crítico al leer archivo: {e}")
-                self.log_message.emit(traceback.format_exc())
-                self.finished.emit(); return
-
-            self.total_messages = len(self.recipients)
-            if self.total_messages == 0:
-                self.log_message.emit("No se encontraron destinatarios válidos."); self.finished.emit(); return
-            self.log_message.emit(f"Se enviarán {self.total_messages} mensajes.")
-    
             # --- Inicio del navegador ---
             self.log_message.emit("Iniciando navegador Edge (Modo Manual)...")
             # --- SOLUCIÓN MANUAL ---
             try:
+                from selenium import webdriver
+                from selenium.webdriver.edge.service import Service
+                from selenium_transport import SeleniumTransport
+
                 driver_path = self.resource_path("msedgedriver.exe")
                 
                 if not os.path.exists(driver_path):
@@ -148,177 +233,322 @@ class SenderWorker(QObject):
                 service = Service(driver_path)
                 self.log_message.emit(f"EdgeDriver manual cargado desde: {driver_path}")
                 
+                # Cada sesión usa su propio perfil persistente (una cuenta por perfil)
+                self.profile_dir = self.profile_pool.acquire()
+                self.log_message.emit(f"Perfil de navegador: {self.profile_dir}")
                 options = webdriver.EdgeOptions()
+                options.add_argument(f"--user-data-dir={self.profile_dir}")
+                options.add_argument("--profile-directory=Default")
+                options.add_argument("--no-first-run")
+                options.add_argument("--no-default-browser-check")
+                for argument in self.browser_args:
+                    options.add_argument(argument)
                 self.driver = webdriver.Edge(service=service, options=options)
-                self.driver.get('https://web.whatsapp.com')
-                self.driver.get('https://web.whatsapp.com')
+                self.transport = SeleniumTransport(self.driver, self.base_url, self.in_page_navigation)
+                self.transport.open_home()
 
             except Exception as e:
                 self.log_message.emit(f"Error al iniciar Edge con driver manual: {e}")
-                self.log_message.emit(traceback.format_exc())
-                self.finished.emit(); return
+                self.log_detail.emit(traceback.format_exc())
+                self.cleanup(); return
 
-            self.log_message.emit("Navegador abierto. Escanea QR.")
-            self.ask_login.emit() # Indica a la GUI que pida confirmación
+            self._detect_login_or_ask()
 
         except Exception as e:
             self.log_message.emit(f"Error fatal en inicialización: {e}")
-            self.log_message.emit(traceback.format_exc())
-            if self.driver:
-                try: self.driver.quit()
-                except: pass
-            self.finished.emit()
+            self.log_detail.emit(traceback.format_exc())
+            self.cleanup()
+
+    def _reuse_warm_browser(self):
+        """Comprueba el navegador heredado. False (y lo descarta) si ya no responde."""
+        try:
+            self.transport.navigation_stats.clear() # Las cifras del resumen son de esta campaña
+            if not self.transport.is_logged_in():
+                self.transport.open_home()
+            self.log_message.emit("Reutilizando el navegador de la campaña anterior.")
+            return True
+        except Exception as e:
+            self.log_message.emit(f"El navegador anterior ya no responde ({e}); se abrirá uno nuevo.")
+            try:
+                self.transport.close()
+            except Exception:
+                pass
+            if self.profile_dir:
+                self.profile_pool.release(self.profile_dir)
+            self.transport = self.driver = self.profile_dir = None
+            self._warm = False
+            return False
+
+    def _prepare_campaign(self):
+        """Archivo de datos y log (compartidos entre sesiones). False si no hay nada que enviar."""
+        try:
+            self.campaign.prepare(self.log_message.emit)
+        except Exception as e:
+            self.log_message.emit(f"Error crítico al leer archivo: {e}")
+            self.log_detail.emit(traceback.format_exc())
+            return False
+
+        if self.campaign.report.valid == 0:
+            self.log_message.emit("No se encontraron destinatarios válidos.")
+            self.campaign.next_recipient() # Registra las filas inválidas en el log sin abrir el navegador
+            return False
+        if self.session_id == 0:
+            self.log_message.emit(f"Se enviarán {self.campaign.report.sendable} mensajes.")
+        return True
+
+    def _detect_login_or_ask(self):
+        """Busca la lista de chats: si ya está, envía sin QR; si no, pide login y lo vigila."""
+        try:
+            state = self.transport.wait_for_login_state(LOGIN_DETECT_TIMEOUT)
+        except TransportTimeout:
+            state = None
+        if state == LOGIN_STATE_LOGGED_IN:
+            self.log_message.emit("Sesión de WhatsApp ya iniciada en este perfil. Iniciando envío sin QR...")
+            self.login_detected.emit()
+            self.continue_sending_messages(); return
+
+        if state == LOGIN_STATE_QR and self.profile_dir:
+            self.profile_pool.mark_logged_out(self.profile_dir) # La sesión guardada ya no vale
+        self.log_message.emit("Navegador abierto. Escanea QR.")
+        self.ask_login.emit() # Indica a la GUI que pida confirmación
+        # Mientras tanto, vigilar el login para no depender del botón de confirmar
+        self._login_timer = QTimer(self)
+        self._login_timer.timeout.connect(self._poll_login)
+        self._login_timer.start(LOGIN_POLL_MS)
+
+    def _stop_login_timer(self):
+        if self._login_timer:
+            self._login_timer.stop()
+            self._login_timer = None
+
+    @Slot()
+    def _poll_login(self):
+        """Comprueba periódicamente si ya se escaneó el QR."""
+        if not self.transport or not self.is_running or self._sending_started:
+            self._stop_login_timer(); return
+        try:
+            logged_in = self.transport.is_logged_in()
+        except Exception:
+            return
+        if logged_in:
+            self._stop_login_timer()
+            self.log_message.emit("Login detectado automáticamente.")
+            self.login_detected.emit()
+            self.continue_sending_messages()
 
     @Slot()
     def continue_sending_messages(self):
-        """Continúa el envío después de que el usuario confirma en la GUI."""
-        if not self.driver:
-            self.log_message.emit("Error: Navegador no inicializado."); self.finished.emit(); return
+        """Continúa el envío después de que el usuario confirma en la GUI (o se detecta el login)."""
+        if self._sending_started:
+            return # Ya se está enviando (login detectado antes de la confirmación)
+        self._stop_login_timer()
+        if not self.transport:
+            self.log_message.emit("Error: Navegador no inicializado."); self.cleanup(); return
         if not self.is_running:
-             self.log_message.emit("Detenido antes de confirmar login."); self.finished.emit(); return
+             self.log_message.emit("Detenido antes de confirmar login."); self.cleanup(); return
 
+        self._sending_started = True
+        if self.profile_dir:
+            self.profile_pool.mark_logged_in(self.profile_dir)
         self.log_message.emit("Login confirmado. Iniciando envío...")
         try:
-            count_sent = 0
-            count_failed = 0
-            for i, recipient in enumerate(self.recipients):
-                if not self.is_running:
+            while True:
+                if not self.is_running or not self.campaign.is_running:
                     self.log_message.emit("Proceso cancelado durante envío."); break
-
-                # Preparar variables
-                current_vars = self.static_vars.copy()
-                numero_dest = str(recipient.get('numero', '')).strip()
-                nombre_dest = str(recipient.get('nombre', '')).strip() 
-                variable_display_name = numero_dest
-                missing_vars_msg = ""
-                
-                for col_name in self.dynamic_file_columns:
-                    value = recipient.get(col_name)
-                    value_str = str(value).strip() if value is not None else ""
-                    current_vars[col_name] = value_str
-                    if not value_str and value is None: missing_vars_msg += f"{col_name}, "
-                    if col_name.lower() == 'nombre' and value_str: 
-                        variable_display_name = f"{numero_dest} ({value_str})"
-                if missing_vars_msg: self.log_message.emit(f"Advertencia: Faltan datos para '{variable_display_name}' en {missing_vars_msg[:-2]}. Usando vacíos.")
-
-                # Formatear mensaje
-                message = self.template_message
+                next_item = self.campaign.next_recipient()
+                if next_item is None:
+                    break
+                i, recipient = next_item
+                timer = self.metrics.start_recipient(self.session_id, i)
+                target = self._describe_recipient(recipient)
+
+                # Formatear mensaje (solo los campos dinámicos; el resto ya está codificado)
                 try:
-                    message = message.format_map(current_vars); encoded_message = quote(message)
+                    with timer.stage(STAGE_RENDER):
+                        encoded_message = self.template.render_encoded(
+                            tuple(recipient.get(col_name, "") for col_name in self.template.dynamic_fields))
                 except Exception as e:
-                    self.log_message.emit(f"Error formateo msg para {variable_display_name}: {e}. Saltando...")
-                    self._log_failure(numero_dest, nombre_dest, "Error de formato de mensaje", e) # Log
-                    count_failed += 1; self.progress.emit(int(((i + 1) / self.total_messages) * 100)); continue
-
-                # Validar número
-                if not numero_dest or not numero_dest.isdigit():
-                    self.log_message.emit(f"Error: Número '{numero_dest}' inválido línea {i+1}. Saltando...")
-                    self._log_failure(numero_dest, nombre_dest, "Número inválido", f"Línea {i+1} del archivo") # Log
-                    count_failed += 1; self.progress.emit(int(((i + 1) / self.total_messages) * 100)); continue
-                
-                # Formatear y codificar el número de teléfono
-                encoded_phone = ""
-                if len(numero_dest) == 10:
-                    # Formato deseado: 56 4446 4018
-                    part1 = numero_dest[0:2]
-                    part2 = numero_dest[2:6]
-                    part3 = numero_dest[6:10]
-                    # String completa: +52 1 56 4446 4018
-                    full_phone_string = f"+52 1 {part1} {part2} {part3}"
-                    
-                    # Codificar para URL: +52%201%2056%204446%204018
-                    encoded_phone = quote(full_phone_string)
-                else:
-                    # Plan B: si no tiene 10 dígitos, usar el formato antiguo pero codificado
-                    self.log_message.emit(f"Advertencia: Número {numero_dest} no tiene 10 dígitos. Usando formato de URL anterior.")
-                    encoded_phone = quote(f"{numero_dest}")
+                    self._finish_recipient(i, target, timer, RESULT_RENDER_ERROR, e); continue
 
-                self.log_message.emit(f"[{i+1}/{self.total_messages}] Enviando a {variable_display_name}...")
+                # Esperar turno según el ritmo de la cuenta (sustituye las pausas fijas)
+                with timer.stage(STAGE_PACING):
+                    turn = self.pacer.wait_turn(lambda: self.is_running and self.campaign.is_running)
+                if not turn:
+                    self.log_message.emit("Proceso cancelado durante envío."); break
+
+                self.log_message.emit(f"[{i+1}/{self.total_messages}] Enviando a {target[2]}...")
 
                 # Envío Selenium
-                message_sent_successfully = False
+                result, error, trace = RESULT_SENT, None, None
                 try:
-                    url = f'https://web.whatsapp.com/send?phone={encoded_phone}'
-                    self.log_message.emit(f"La URL de envío es: {url}")
-                    url = f'{url}&text={encoded_message}'
-                    self.driver.get(url)
-                    chat_input_xpath = "//div[@contenteditable='true'][@data-tab='10'] | //div[@contenteditable='true'][@data-tab='1']"
+                    with timer.stage(STAGE_URL):
+                        url = self.transport.build_send_url(recipient[COL_PHONE])
+                        self.log_detail.emit(f"La URL de envío es: {url}")
+                        url = f'{url}&text={encoded_message}'
+                    with timer.stage(STAGE_PAGE_LOAD):
+                        self.transport.open_chat(url)
+                    # Cuadro de texto o popup, lo que aparezca primero (un número inválido no espera los 20s)
                     try:
-                        WebDriverWait(self.driver, 20).until(EC.presence_of_element_located((By.XPATH, chat_input_xpath)))
-                    except TimeoutException:
-                        try:
-                            invalid_number_xpath = "//div[contains(@data-testid, 'popup-controls-ok')]"
-                            WebDriverWait(self.driver, 5).until(EC.presence_of_element_located((By.XPATH, invalid_number_xpath)))
-                            self.log_message.emit(f"Error: Número {numero_dest} inválido/sin WA (popup).")
-                            self._log_failure(numero_dest, nombre_dest, "Número sin WA (Popup)", "El número no tiene WhatsApp o es inválido.") # Log
-                            try: self.driver.find_element(By.XPATH, invalid_number_xpath).click(); sleep(1)
+                        with timer.stage(STAGE_CHAT_READY):
+                            chat_state = self.transport.wait_for_chat_outcome(CHAT_LOAD_TIMEOUT)
+                    except TransportTimeout:
+                        chat_state = None
+                        result = RESULT_CHAT_TIMEOUT
+                    if chat_state == CHAT_STATE_INVALID:
+                        result = RESULT_INVALID
+                        with timer.stage(STAGE_POPUP):
+                            try: self.transport.dismiss_invalid_popup(); sleep(1)
                             except: pass
-                        except TimeoutException:
-                            self.log_message.emit(f"Error: No cargó chat para {numero_dest} en 20s.")
-                            self._log_failure(numero_dest, nombre_dest, "Timeout Carga Chat", "No se pudo cargar la ventana de chat en 20s.") # Log
-                        count_failed += 1; self.progress.emit(int(((i + 1) / self.total_messages) * 100)); continue
-
-                    try:
-                        xpath_send_button = "//button[@aria-label='Enviar'] | //span[@data-icon='send']/ancestor::button | //div[@role='button'][.//span[@data-icon='wds-ic-send-filled']]"
-                        click_btn = WebDriverWait(self.driver, 40).until(EC.element_to_be_clickable((By.XPATH, xpath_send_button)))
-                        sleep(random.uniform(1.5, 3.0)); click_btn.click(); sleep(random.uniform(4.0, 7.0))
-                        self.log_message.emit(f"✓ Mensaje enviado a: {variable_display_name}")
-                        count_sent += 1; message_sent_successfully = True
-                    except TimeoutException: 
-                        self.log_message.emit(f"Error: Botón enviar no encontrado/clicable para {variable_display_name}.")
-                        self._log_failure(numero_dest, nombre_dest, "Timeout Botón Enviar", "No se encontró el botón de enviar en 40s.") # Log
-                    except Exception as send_e: 
-                        self.log_message.emit(f"Error inesperado al enviar a {variable_display_name}: {send_e}")
-                        self._log_failure(numero_dest, nombre_dest, "Error Inesperado (Envío)", send_e) # Log
+                    elif chat_state is not None:
+                        try:
+                            with timer.stage(STAGE_SEND_BUTTON):
+                                click_btn = self.transport.wait_for_send_button(SEND_BUTTON_TIMEOUT)
+                            with timer.stage(STAGE_PRE_CLICK):
+                                self.pacer.pause_before_click()
+                            with timer.stage(STAGE_CLICK):
+                                previous = self.transport.count_outgoing()
+                                self.transport.click_send(click_btn)
+                            # Esperar la palomita del mensaje nuevo en lugar de una pausa fija
+                            try:
+                                with timer.stage(STAGE_SENT):
+                                    self.transport.wait_for_sent(SENT_TICK_TIMEOUT, previous)
+                            except TransportTimeout:
+                                result = RESULT_UNCONFIRMED
+                        except TransportTimeout:
+                            result = RESULT_BUTTON_TIMEOUT
+                        except Exception as send_e:
+                            result, error = RESULT_SEND_ERROR, send_e
 
                 except Exception as e:
-                    self.log_message.emit(f"Fallo grave procesando {variable_display_name}: {e}")
-                    self._log_failure(numero_dest, nombre_dest, "Fallo Grave (Procesando)", e) # Log
-                    self.log_message.emit(traceback.format_exc())
-
-                if not message_sent_successfully: count_failed += 1
-                self.progress.emit(int(((i + 1) / self.total_messages) * 100))
-                sleep_time = random.uniform(2.5, 5.5)
-                sleep(sleep_time)
-
-            # --- Mensaje final y EMISIÓN de señal ---
-            self.log_message.emit(f"Proceso finalizado. Enviados: {count_sent}, Fallidos/Saltados: {count_failed} de {self.total_messages}.")
-            if count_failed > 0:
-                self.log_message.emit(f"Se generó un log de errores en: {self.log_file_path}")
-                # Emitir la señal para el controlador
-                self.log_file_created.emit(self.log_file_path, count_failed)
-            else:
-                # Borrar el log si no hubo errores
-                try:
-                    if os.path.exists(self.log_file_path):
-                        os.remove(self.log_file_path)
-                    self.log_message.emit("Proceso finalizado sin errores. Log vacío eliminado.")
-                except Exception as e:
-                    self.log_message.emit(f"No se pudo borrar log vacío: {e}")
-            # --- Fin de Modificado ---
+                    result, error, trace = RESULT_FATAL, e, traceback.format_exc()
+
+                self._finish_recipient(i, target, timer, result, error)
+                if trace:
+                    self.log_detail.emit(trace)
 
         except Exception as e:
             self.log_message.emit(f"Error crítico en envío masivo: {e}")
-            self.log_message.emit(traceback.format_exc())
+            self.log_detail.emit(traceback.format_exc())
         finally:
             self.cleanup() # Llama a la limpieza
 
+    def _report_pacing_bound(self):
+        """Avisa si cada envío tarda más que el intervalo del ritmo (el límite no se alcanza)."""
+        interval = 60.0 / self.pacer.max_per_minute if self.pacer.max_per_minute > 0 else 0.0
+        active = self.metrics.mean_active_seconds()
+        if interval and active > interval:
+            self.log_message.emit(
+                f"El ritmo de {self.pacer.max_per_minute}/min por sesión no se alcanzó: cada envío tarda "
+                f"{active:.1f}s sin contar la espera de turno (intervalo {interval:.1f}s). "
+                "WhatsApp Web admite una sola pestaña activa por cuenta; para enviar más rápido usa más sesiones.")
+
+    def _describe_recipient(self, recipient):
+        """(número, nombre, nombre para el log) de un destinatario."""
+        numero_dest = recipient['numero']
+        display_name = numero_dest
+        if self._name_column and recipient.get(self._name_column):
+            display_name = f"{numero_dest} ({recipient[self._name_column]})"
+        return numero_dest, recipient.get('nombre', ''), display_name
+
+    def _finish_recipient(self, index, target, timer, result, error=None, pacer=None, log=None):
+        """
+        Registra el resultado (RESULT_*) de un destinatario: línea del log, fila del
+        log de fallos, pacer, métricas, bitácora y progreso. Lo usan los dos motores;
+        el asíncrono pasa el pacer y el log de su sesión.
+        """
+        outcome, paced, reason, message, detail = RECIPIENT_RESULTS[result]
+        numero_dest, nombre_dest, display_name = target
+        values = {'numero': numero_dest, 'nombre': display_name, 'error': error}
+        (log or self.log_message.emit)(message.format(**values))
+        if reason:
+            self._log_failure(numero_dest, nombre_dest, reason, detail.format(**values) if detail else error)
+        if paced:
+            (pacer or self.pacer).record(outcome)
+        self.metrics.finish_recipient(timer, outcome)
+        self.progress.emit(self.campaign.record_result(reason is None, index, numero_dest,
+                                                       unconfirmed=result == RESULT_UNCONFIRMED))
+
+    def _report_summary(self):
+        """Emite el resumen final de la campaña (lo hace la última sesión en terminar)."""
+        count_sent = self.campaign.count_sent
+        count_failed = self.campaign.count_failed
+        self.log_message.emit(f"Proceso finalizado. Enviados: {count_sent}, Fallidos/Saltados: {count_failed} de {self.total_messages}.")
+        if self.campaign.count_skipped:
+            self.log_message.emit(f"Omitidos por ya estar enviados (reanudación): {self.campaign.count_skipped}.")
+        stage_summary = self.metrics.summary()
+        if stage_summary:
+            self.log_message.emit(f"Tiempos por etapa (media): {stage_summary}.")
+        self._report_pacing_bound()
+        if self.campaign.count_deduplicated:
+            self.log_message.emit(f"Envíos duplicados fusionados (política {self.campaign.dedup_policy}): "
+                                  f"{self.campaign.count_deduplicated}.")
+        if self.campaign.count_known_bad:
+            action = "enviados al final" if self.campaign.reputation_policy == POLICY_DEFER else "omitidos"
+            self.log_message.emit(f"Números sin WhatsApp en campañas anteriores ({action}): {self.campaign.count_known_bad}.")
+        log_kept = count_failed > 0
+        if not log_kept:
+            # Borrar el log si no hubo errores
+            try:
+                if self.log_file_path and os.path.exists(self.log_file_path):
+                    os.remove(self.log_file_path)
+                self.log_message.emit("Proceso finalizado sin errores. Log vacío eliminado.")
+            except Exception as e:
+                self.log_message.emit(f"No se pudo borrar log vacío: {e}")
+        self._record_in_catalog(log_kept)
+        if log_kept:
+            self.log_message.emit(f"Se generó un log de errores en: {self.log_file_path}")
+            # Emitir la señal para el controlador (el catálogo ya incluye este log)
+            self.log_file_created.emit(self.log_file_path, count_failed)
+
+    def _record_in_catalog(self, log_kept):
+        """Registra la ejecución (contadores y fallos por razón) en el catálogo de logs."""
+        if self.catalog is None:
+            return
+        started_at = self.campaign.started_at or datetime.datetime.now()
+        try:
+            self.catalog.record_run(
+                self.log_file_path if log_kept else None, os.path.abspath(self.file_path),
+                started_at.isoformat(timespec='seconds'), datetime.datetime.now().isoformat(timespec='seconds'),
+                self.total_messages, self.campaign.count_sent, self.campaign.count_failed,
+                self.campaign.count_skipped, self.campaign.failure_reasons)
+        except Exception as e:
+            self.log_message.emit(f"ADVERTENCIA: No se pudo registrar la ejecución en el catálogo: {e}")
+
     @Slot()
     def stop_process(self):
         """Marca el worker para detenerse y cierra el navegador si existe."""
         self.is_running = False
+        self.campaign.stop()
         self.log_message.emit("Solicitando cancelación...")
         self.cleanup() # Intenta cerrar el navegador inmediatamente
 
     def cleanup(self):
-        """Cierra el navegador y emite la señal 'finished'."""
-        if self.driver:
+        """Cierra el navegador, emite el resumen si es la última sesión y emite 'finished'."""
+        self._stop_login_timer()
+        if self.transport:
+            navigation = self.transport.navigation_stats
+            if navigation[NAV_IN_PAGE] or navigation[NAV_RELOAD]:
+                self.log_message.emit(f"Chats abiertos sin recargar: {navigation[NAV_IN_PAGE]}, "
+                                      f"con recarga completa: {navigation[NAV_RELOAD]}.")
+        if self.transport and self.keep_browser and self.is_running:
+            # Modo lote: el navegador (y su perfil) pasan a la siguiente campaña
+            self.browser_kept.emit(WarmSession(self.transport, self.driver, self.profile_dir))
+            self.log_message.emit("Navegador abierto para la siguiente campaña.")
+            self.transport = self.driver = self.profile_dir = None
+        if self.transport:
             try:
-                self.driver.quit()
+                self.transport.close()
                 self.log_message.emit("Navegador cerrado.")
-                self.driver = None # Evita intentos repetidos de cierre
+                self.transport = None # Evita intentos repetidos de cierre
+                self.driver = None
             except Exception as e:
                 self.log_message.emit(f"Nota: No se pudo cerrar navegador (quizás ya cerrado): {e}")
+        if self.profile_dir:
+            self.profile_pool.release(self.profile_dir)
+            self.profile_dir = None
+        self.campaign.flush_failures() # Siempre volcar los fallos pendientes al terminar
+        if self.campaign.finish_session(self.session_id) and self.campaign.sending_started:
+            self._report_summary()
         self.finished.emit()
 
 
@@ -327,34 +557,87 @@ class SenderModel(QObject):
     Modelo: Mantiene el estado, maneja la lógica de negocio (worker) y emite señales.
     """
     # Señales para notificar al Controlador/Vista
-    status_update = Signal(str)
+    status_update = Signal(str) # Mensaje del modelo (estado); el log en vivo llega por log_batch
+    log_batch = Signal(list) # Líneas de log acumuladas (cada FLUSH_INTERVAL_MS)
     progress_update = Signal(int)
     ask_login_confirmation = Signal()
+    login_completed = Signal() # Ya no queda ninguna sesión esperando confirmación
     process_finished = Signal()
     file_loaded = Signal(str) # Emite el nombre base del archivo cargado
 
     # Señales del Visor de Logs
     log_available = Signal(str, int) 
-    log_data_ready = Signal(QStandardItemModel)
-    available_logs_list = Signal(list) # Emitirá lista de rutas de logs
+    log_data_ready = Signal(object) # FailureLogTableModel (log_table.py)
+    available_logs_list = Signal(list) # Emitirá lista de (ruta, etiqueta) de logs
+    log_history_summary = Signal(list) # [(Razon_Fallo, fallos)] de todo el historial
 
-    def __init__(self):
+    def __init__(self, logs_dir=None, profiles_dir=None):
         super().__init__()
         self._file_path = ""
-        self._worker = None
-        self._thread = None
-        self.logs_dir = os.path.join(os.getcwd(), "logs")
+        self._sessions = [] # Lista de (QThread, SenderWorker), una por sesión de navegador
+        self._campaign = None
+        self._logins_pending = set()
+        self._finished_sessions = set()
+        self._auto_logged = set()
+        self._login_confirmed = False
+        self._profile_pool = ProfilePool(profiles_dir)
+        self.logs_dir = logs_dir or os.path.join(os.getcwd(), "logs")
         os.makedirs(self.logs_dir, exist_ok=True)
 
+        # --- Log en vivo: los workers escriben en el canal y la vista recibe lotes ---
+        self.log_channel = LogChannel(parent=self)
+        self.log_channel.batch_ready.connect(self.log_batch)
+        self.log_channel.start()
+        self._startup_warnings = [] # Se repiten en el archivo de actividad de cada campaña
+
+        try:
+            self.catalog = LogCatalog.for_logs_dir(self.logs_dir)
+        except Exception as e:
+            self._startup_warning(f"ADVERTENCIA: No se pudo abrir el catálogo de logs: {e}")
+            self.catalog = None
+        self._catalog_import_pending = bool(self.catalog and self.catalog.is_new)
+        try:
+            self.reputation = NumberReputation.for_logs_dir(self.logs_dir)
+        except Exception as e:
+            self._startup_warning(f"ADVERTENCIA: No se pudo abrir el historial de números: {e}")
+            self.reputation = None
+
+        # --- Métricas por etapa de la campaña actual (o la última) ---
+        self.metrics = None
+        self._metrics_server = None
+        # --- Modo lote: navegadores abiertos entre campañas y la última campaña terminada ---
+        self._warm_sessions = []
+        self.last_campaign = None
+
+    def serve_metrics(self, port, host='127.0.0.1'):
+        """Expone las métricas en formato Prometheus en http://host:port/metrics. Devuelve la URL."""
+        if self._metrics_server is None:
+            self._metrics_server = MetricsServer(lambda: self.metrics, port, host).start()
+        return self._metrics_server.url
+
+    def _status(self, message):
+        """Mensaje del modelo: va al log en vivo (en orden con el de los workers) y al estado."""
+        self.log_channel.post(message)
+        self.status_update.emit(message)
+
+    def _startup_warning(self, message):
+        """Aviso al crear el modelo: sale en el log en vivo y en el archivo de actividad de cada campaña."""
+        self._startup_warnings.append(message)
+        self._status(message)
+
+    def _post_session_log(self, prefix, message, detail=False):
+        """Se ejecuta en el hilo del worker (conexión directa): solo encola la línea."""
+        self.log_channel.post(f"{prefix}{message}", detail)
+
     def set_file_path(self, path):
         if path and os.path.exists(path):
             self._file_path = path
             self.file_loaded.emit(os.path.basename(path))
-            self.status_update.emit(f"Archivo cargado: {path}")
+            self._status(f"Archivo cargado: {path}")
         else:
             self._file_path = ""
             self.file_loaded.emit("Archivo no cargado.")
-            self.status_update.emit("Error: Ruta de archivo inválida.")
+            self._status("Error: Ruta de archivo inválida.")
 
     def get_file_path(self):
         return self._file_path
@@ -363,110 +646,250 @@ class SenderModel(QObject):
         """Devuelve la ruta a la carpeta de logs."""
         return self.logs_dir
 
-    def start_process(self, static_vars, template_message, dynamic_columns):
-        if self._thread and self._thread.isRunning():
-            self.status_update.emit("Error: Proceso ya en ejecución.")
+    def is_running(self):
+        """True si alguna sesión sigue con su hilo activo."""
+        return any(thread.isRunning() for thread, _ in self._sessions)
+
+    def start_process(self, static_vars, template_message, dynamic_columns, num_sessions=1,
+                      max_per_minute=DEFAULT_MAX_PER_MINUTE, resume=False, browser_args=(),
+                      known_bad_policy=POLICY_SKIP, dedup_policy=DEDUP_FIRST, in_page_navigation=False,
+                      metrics_file=None, engine=ENGINE_SELENIUM, schedule=None, keep_browser=False,
+                      logs_dir=None):
+        if self.is_running():
+            self._status("Error: Proceso ya en ejecución.")
             return
         if not self._file_path:
-             self.status_update.emit("Error: No se ha cargado un archivo.")
+             self._status("Error: No se ha cargado un archivo.")
              return
 
-        self.status_update.emit("Iniciando worker...")
-        self._thread = QThread()
-        self._worker = SenderWorker(self._file_path, static_vars, template_message, dynamic_columns)
-        self._worker.moveToThread(self._thread)
+        num_sessions = max(1, int(num_sessions))
+        self._status("Iniciando worker..." if num_sessions == 1 else f"Iniciando {num_sessions} sesiones en paralelo...")
+        expected_columns = ['numero'] + dynamic_columns
+        if schedule is not None:
+            # Las columnas de programación que no usa la plantilla van al final del archivo
+            expected_columns += schedule.extra_columns(dynamic_columns)
+        # El motor asíncrono lleva todas las sesiones en un solo worker
+        workers = 1 if engine == ENGINE_ASYNC else num_sessions
+        # Carpeta de esta campaña (modo lote: una por trabajo); catálogo, historial y bitácoras siguen siendo comunes
+        logs_dir = logs_dir or self.logs_dir
+        self._campaign = SharedCampaign(self._file_path, expected_columns, workers, logs_dir, resume,
+                                        self.reputation, known_bad_policy, dedup_policy, schedule,
+                                        journal_dir=self.logs_dir)
+        self._sessions = []
+        self._logins_pending = set()
+        self._finished_sessions = set()
+        self._auto_logged = set()
+        self._login_confirmed = False
+        try:
+            timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+            os.makedirs(logs_dir, exist_ok=True)
+            self.log_channel.open_file(os.path.join(logs_dir, f"actividad_{timestamp}.log"))
+            for message in self._startup_warnings:
+                self.log_channel.post(message, detail=True) # Solo al archivo: en pantalla ya salió
+        except OSError as e:
+            self._status(f"ADVERTENCIA: No se pudo crear el archivo de actividad: {e}")
+        try:
+            self.metrics = SendMetrics(metrics_file)
+        except OSError as e:
+            self._status(f"ADVERTENCIA: No se pudo crear el archivo de métricas: {e}")
+            self.metrics = SendMetrics()
+
+        worker_class, extra = SenderWorker, {'keep_browser': keep_browser}
+        if engine == ENGINE_ASYNC:
+            from async_engine import AsyncSenderEngine
+            worker_class, extra = AsyncSenderEngine, {'sessions': num_sessions}
+        for session_id in range(workers):
+            # Navegador que dejó abierto la campaña anterior (solo el motor Selenium lo reutiliza)
+            warm = self._warm_sessions.pop(0) if engine != ENGINE_ASYNC and self._warm_sessions else None
+            thread = QThread()
+            worker = worker_class(self._file_path, static_vars, template_message, dynamic_columns,
+                                  campaign=self._campaign, session_id=session_id,
+                                  max_per_minute=max_per_minute, profile_pool=self._profile_pool,
+                                  browser_args=browser_args, catalog=self.catalog,
+                                  in_page_navigation=in_page_navigation, metrics=self.metrics,
+                                  warm_session=warm, **extra)
+            worker.moveToThread(thread)
+
+            # Conectar señales internas del worker a las señales del modelo
+            # Conexión directa: el worker deja la línea en el canal sin cruzar de hilo
+            # (el motor asíncrono antepone él mismo la sesión de cada línea)
+            prefix = "" if workers == 1 else f"[S{session_id + 1}] "
+            worker.log_message.connect(partial(self._post_session_log, prefix), Qt.DirectConnection)
+            worker.log_detail.connect(partial(self._post_session_log, prefix, detail=True), Qt.DirectConnection)
+            worker.progress.connect(self.progress_update)
+            worker.ask_login.connect(self._on_session_ask_login)
+            worker.login_detected.connect(self._on_session_login_detected)
+            worker.finished.connect(self._on_worker_finished)
+            worker.browser_kept.connect(self._on_browser_kept)
+            
+            # Conectar la nueva señal del log
+            worker.log_file_created.connect(self.log_available)
 
-        # Conectar señales internas del worker a las señales del modelo
-        self._worker.log_message.connect(self.status_update)
-        self._worker.progress.connect(self.progress_update)
-        self._worker.ask_login.connect(self.ask_login_confirmation)
-        self._worker.finished.connect(self._on_worker_finished)
-        
-        # Conectar la nueva señal del log
-        self._worker.log_file_created.connect(self.log_available)
+            # Conectar inicio del hilo a la inicialización del worker
+            thread.started.connect(worker.run_initialization)
+            self._sessions.append((thread, worker))
+
+        for thread, _ in self._sessions:
+            thread.start()
 
-        # Conectar inicio del hilo a la inicialización del worker
-        self._thread.started.connect(self._worker.run_initialization)
+    def _session_index(self, worker):
+        for index, (_, session_worker) in enumerate(self._sessions):
+            if session_worker is worker:
+                return index
+        return -1
 
-        self._thread.start()
+    @Slot()
+    def _on_session_ask_login(self):
+        """
+        Cada sesión pide confirmación de login por separado; se pide al usuario
+        una sola vez, cuando todas las sesiones vivas tienen su navegador abierto.
+        """
+        index = self._session_index(self.sender())
+        if index < 0:
+            return
+        self._logins_pending.add(index)
+        self._maybe_ask_login()
+
+    @Slot()
+    def _on_session_login_detected(self):
+        """Una sesión detectó su login sola: ya no necesita confirmación."""
+        index = self._session_index(self.sender())
+        if index < 0:
+            return
+        self._auto_logged.add(index)
+        had_pending = bool(self._waiting_sessions())
+        self._logins_pending.discard(index)
+        if had_pending and not self._waiting_sessions():
+            self.login_completed.emit()
+        else:
+            self._maybe_ask_login()
+
+    def _waiting_sessions(self):
+        """Sesiones que esperan la confirmación manual del login."""
+        return self._logins_pending - self._finished_sessions - self._auto_logged
+
+    def _maybe_ask_login(self):
+        if self._login_confirmed:
+            return
+        alive = set(range(len(self._sessions))) - self._finished_sessions
+        needing = alive - self._auto_logged
+        waiting = self._waiting_sessions()
+        if waiting and waiting == needing:
+            if len(self._sessions) > 1:
+                self._status(f"{len(waiting)} navegador(es) listos. Escanea el QR en cada uno.")
+            self.ask_login_confirmation.emit()
 
     def confirm_login_and_continue(self):
-        if self._worker and self._thread and self._thread.isRunning():
-            self.status_update.emit("Confirmación recibida, continuando envío...")
-            # Llamar a continue_sending_messages en el hilo del worker
-            QMetaObject.invokeMethod(self._worker, "continue_sending_messages", Qt.QueuedConnection)
+        if self.is_running() and self._waiting_sessions():
+            self._status("Confirmación recibida, continuando envío...")
+            self._login_confirmed = True
+            for index in sorted(self._waiting_sessions()):
+                # Llamar a continue_sending_messages en el hilo de cada worker
+                QMetaObject.invokeMethod(self._sessions[index][1], "continue_sending_messages", Qt.QueuedConnection)
         else:
-            self.status_update.emit("Error: No se puede continuar, el proceso no está activo.")
+            self._status("Error: No se puede continuar, el proceso no está activo.")
 
     def stop_process(self):
-        if self._worker and self._thread and self._thread.isRunning():
-            self.status_update.emit("Intentando detener el proceso...")
-            # Llamar a stop_process en el hilo del worker
-            QMetaObject.invokeMethod(self._worker, "stop_process", Qt.QueuedConnection)
+        if self.is_running():
+            self._status("Intentando detener el proceso...")
+            # La bandera compartida detiene el bucle de envío de todas las sesiones
+            # aunque sus hilos estén ocupados y no atiendan la llamada encolada.
+            if self._campaign:
+                self._campaign.stop()
+            for index, (thread, worker) in enumerate(self._sessions):
+                if index not in self._finished_sessions and thread.isRunning():
+                    # Llamar a stop_process en el hilo del worker
+                    QMetaObject.invokeMethod(worker, "stop_process", Qt.QueuedConnection)
         else:
-             self.status_update.emit("El proceso no está en ejecución.")
+             self._status("El proceso no está en ejecución.")
 
     @Slot()
     def _on_worker_finished(self):
-        """Slot interno para limpiar cuando el worker termina."""
-        self.status_update.emit("Worker ha terminado.")
-        if self._thread:
-            if self._thread.isRunning():
-                self._thread.quit()
-                if not self._thread.wait(3000): # Espera 3 segs
-                    self.status_update.emit("Advertencia: Hilo no terminó limpiamente.")
-                    self._thread.terminate() # Forzar si es necesario
-                    self._thread.wait()
-            self._thread = None
-        self._worker = None
+        """Slot interno para limpiar cuando una sesión termina; avisa cuando terminan todas."""
+        index = self._session_index(self.sender())
+        if index < 0 or index in self._finished_sessions:
+            return
+        self._finished_sessions.add(index)
+        if len(self._sessions) == 1:
+            self._status("Worker ha terminado.")
+        else:
+            self._status(f"Sesión {index + 1} ha terminado.")
+
+        thread = self._sessions[index][0]
+        if thread.isRunning():
+            thread.quit()
+            if not thread.wait(3000): # Espera 3 segs
+                self._status("Advertencia: Hilo no terminó limpiamente.")
+                thread.terminate() # Forzar si es necesario
+                thread.wait()
+
+        if len(self._finished_sessions) < len(self._sessions):
+            # Si la sesión cayó antes del login, puede que las demás ya estén esperando
+            self._maybe_ask_login()
+            return
+        self._sessions = []
+        self.last_campaign, self._campaign = self._campaign, None
+        if self.metrics is not None:
+            self.metrics.close() # Los histogramas siguen disponibles en /metrics
+        self.log_channel.close_file() # Entrega las últimas líneas antes de avisar
         self.process_finished.emit() # Notificar al controlador que todo terminó
 
+    @Slot(object)
+    def _on_browser_kept(self, warm):
+        """Guarda el navegador que deja una sesión para la siguiente campaña."""
+        self._warm_sessions.append(warm)
+
+    def close_browsers(self):
+        """Cierra los navegadores que quedaron abiertos entre campañas (modo lote)."""
+        while self._warm_sessions:
+            warm = self._warm_sessions.pop()
+            try:
+                warm.transport.close()
+            except Exception as e:
+                self._status(f"Nota: No se pudo cerrar navegador (quizás ya cerrado): {e}")
+            if warm.profile_dir:
+                self._profile_pool.release(warm.profile_dir)
+
     @Slot(str)
     def load_log_file(self, file_path):
-        """Lee el archivo CSV de log y lo convierte en un QStandardItemModel."""
-        self.status_update.emit(f"Cargando log de errores desde: {file_path}")
-        model = QStandardItemModel()
+        """Abre el CSV de log en una tabla virtual (índice y orden se calculan en segundo plano)."""
+        from log_table import FailureLogTableModel
+        self._status(f"Cargando log de errores desde: {file_path}")
         try:
             if not file_path or not os.path.exists(file_path):
+                if self.catalog is not None and file_path:
+                    self.catalog.forget_missing() # Se borró a mano: quitarlo de la lista
                 raise FileNotFoundError("El archivo de log no se encontró.")
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f, delimiter=';')
-                
-                # Leer cabecera
-                headers = next(reader)
-                model.setHorizontalHeaderLabels(headers)
-                
-                # Leer datos
-                for row in reader:
-                    # Asegurarse de que la fila no esté vacía
-                    if not any(field.strip() for field in row):
-                        continue 
-                        
-                    items = [QStandardItem(field) for field in row]
-                    model.appendRow(items)
-            
-            # Emitir el modelo listo
-            self.log_data_ready.emit(model)
-            
-        except StopIteration:
-            self.status_update.emit("Log de errores vacío (solo cabecera).")
-            # Emitir modelo vacío para limpiar la tabla
-            self.log_data_ready.emit(model) 
+            table = FailureLogTableModel(file_path)
+            # Emitir el modelo ya: las filas aparecen conforme se indexan
+            self.log_data_ready.emit(table)
         except Exception as e:
-            self.status_update.emit(f"Error crítico al leer el archivo de log: {e}")
-            self.log_message.emit(traceback.format_exc())
+            self._status(f"Error crítico al leer el archivo de log: {e}")
+            self.log_channel.post(traceback.format_exc(), detail=True)
 
     @Slot()
-    def fetch_available_logs(self):
-        """Busca en la carpeta /logs todos los archivos .csv y emite la lista."""
+    def fetch_available_logs(self, reason=None):
+        """
+        Emite la lista de logs (ruta, etiqueta) desde el catálogo, de más nuevo a más
+        viejo, opcionalmente solo los que tienen fallos de 'reason', y el resumen por razón.
+        Sin catálogo, busca en la carpeta /logs como antes.
+        """
         try:
-            log_pattern = os.path.join(self.logs_dir, "log_errores_*.csv")
-            # glob.glob encuentra todos los archivos que coinciden con el patrón
-            files = glob.glob(log_pattern)
-            # Ordenar por nombre (que incluye fecha) de más nuevo a más viejo
-            files_sorted = sorted(files, reverse=True) 
-            self.available_logs_list.emit(files_sorted)
+            if self.catalog is None:
+                files_sorted = sorted(glob.glob(os.path.join(self.logs_dir, "log_errores_*.csv")), reverse=True)
+                self.available_logs_list.emit([(path, os.path.basename(path)) for path in files_sorted])
+                return
+            if self._catalog_import_pending:
+                # Primera vez con catálogo: importar los logs que ya había en la carpeta
+                self._catalog_import_pending = False
+                imported = self.catalog.import_existing(self.logs_dir)
+                if imported:
+                    self._status(f"Catálogo de logs creado con {imported} logs existentes.")
+            runs = self.catalog.list_runs(reason or None)
+            self.available_logs_list.emit([
+                (run['log_path'], f"{os.path.basename(run['log_path'])} — {run['failed']} fallos") for run in runs
+            ])
+            self.log_history_summary.emit(self.catalog.reason_totals())
         except Exception as e:
-            self.status_update.emit(f"Error al buscar logs: {e}")
-            self.available_logs_list.emit([]) # Emitir lista vacía en caso de error
\ No newline at end of file
+            self._status(f"Error al buscar logs: {e}")
+            self.available_logs_list.emit([]) # Emitir lista vacía en caso de error
@@ -0,0 +1,130 @@
+# number_reputation.py
+"""
+Historial persistente (SQLite) de números que fallaron de forma definitiva,
+p. ej. "Número sin WA (Popup)". Cada número normalizado guarda un código de razón,
+cuántas veces falló y una fecha de caducidad (TTL por razón), así una lista
+reciclada no vuelve a abrir (y esperar) chats de números ya conocidos.
+Los fallos transitorios (timeouts, errores del navegador) no se guardan.
+"""
+import os
+import sqlite3
+import datetime
+from contextlib import contextmanager
+
+from preflight import normalize_number
+
+REPUTATION_FILE_NAME = "reputacion_numeros.sqlite"
+
+REASON_NO_WHATSAPP = "sin_wa"
+
+# Razon_Fallo del log -> código guardado. "Número inválido" no se guarda: son
+# textos que no son números y el pre-vuelo ya los descarta sin abrir el navegador.
+FAILURE_REASON_CODES = {
+    "Número sin WA (Popup)": REASON_NO_WHATSAPP,
+}
+
+# Días que se recuerda cada razón (un número puede activar WhatsApp más tarde)
+REASON_TTL_DAYS = {
+    REASON_NO_WHATSAPP: 30,
+}
+
+# Qué hacer con los números conocidos al enviar
+POLICY_SKIP = "omitir" # Se registran como fallidos sin abrir el chat
+POLICY_DEFER = "al_final" # Se envían después de todos los demás
+POLICY_OFF = "ignorar" # Se envían normalmente (el historial se sigue alimentando)
+POLICIES = (POLICY_SKIP, POLICY_DEFER, POLICY_OFF)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bad_numbers (
+    numero TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    failures INTEGER NOT NULL DEFAULT 1,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bad_numbers_expires ON bad_numbers(expires_at);
+"""
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+class NumberReputation:
+    """
+    Caché negativa de números. Abre y cierra una conexión por operación (se usa
+    desde varios hilos); los fallos de una campaña llegan por lotes (record_failures).
+    active_numbers() devuelve el conjunto vigente para consultarlo en memoria
+    durante la campaña.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_logs_dir(cls, logs_dir):
+        return cls(os.path.join(logs_dir, REPUTATION_FILE_NAME))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_failure(self, numero, failure_reason):
+        """
+        Anota un fallo a partir de su Razon_Fallo. Devuelve True si la razón se
+        guarda (las transitorias se ignoran).
+        """
+        return self.record_failures([(numero, failure_reason)]) == 1
+
+    def record_failures(self, failures):
+        """
+        Anota varios fallos (numero, Razon_Fallo) en una sola transacción.
+        Devuelve cuántos se guardaron.
+        """
+        now = datetime.datetime.now()
+        stamp = now.isoformat(timespec='seconds')
+        params = []
+        for numero, failure_reason in failures:
+            code = FAILURE_REASON_CODES.get(failure_reason)
+            key = normalize_number(numero)
+            if code is None or not key:
+                continue
+            expires_at = (now + datetime.timedelta(days=REASON_TTL_DAYS[code])).isoformat(timespec='seconds')
+            params.append((key, code, stamp, stamp, expires_at))
+        if not params:
+            return 0
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO bad_numbers (numero, reason, failures, first_seen, last_seen, expires_at) "
+                "VALUES (?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT(numero) DO UPDATE SET reason=excluded.reason, failures=failures + 1, "
+                "last_seen=excluded.last_seen, expires_at=excluded.expires_at",
+                params)
+        return len(params)
+
+    def clear(self, numero):
+        """Olvida un número (p. ej. porque ya recibió un mensaje)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM bad_numbers WHERE numero = ?", (normalize_number(numero),))
+
+    def active_numbers(self):
+        """Números vigentes -> código de razón. Borra de paso los caducados."""
+        now = _now()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM bad_numbers WHERE expires_at <= ?", (now,))
+            return dict(conn.execute("SELECT numero, reason FROM bad_numbers"))
+
+    def lookup(self, numero):
+        """(código de razón, fallos, última vez) de un número vigente, o None."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT reason, failures, last_seen FROM bad_numbers WHERE numero = ? AND expires_at > ?",
+                (normalize_number(numero), _now())).fetchone()
@@ -0,0 +1,138 @@
+# pacing.py
+"""
+Ritmo de envío por cuenta: un token bucket con techo de mensajes por minuto,
+jitter aleatorio y retroceso (backoff) automático cuando aumentan los
+timeouts o los popups de número inválido.
+"""
+import random
+import threading
+import time
+
+DEFAULT_MAX_PER_MINUTE = 10
+
+# Resultados que se le reportan al pacer
+OUTCOME_OK = 'ok'
+OUTCOME_POPUP = 'popup'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_ERROR = 'error'
+OUTCOME_UNCONFIRMED = 'sin_confirmacion' # Se pulsó enviar pero no apareció la palomita
+
+
+class TokenBucket:
+    """
+    Token bucket clásico. 'reserve' toma un token (aunque el saldo quede negativo)
+    y devuelve cuántos segundos hay que esperar para que ese token sea válido.
+    rate_per_minute <= 0 significa sin límite.
+    """
+
+    def __init__(self, rate_per_minute, burst=1, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.burst = max(1, burst)
+        self.rate_per_minute = rate_per_minute
+        self._tokens = float(self.burst)
+        self._updated = clock()
+
+    def _refill(self, now):
+        if self.rate_per_minute > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_minute / 60.0)
+        self._updated = now
+
+    def set_rate(self, rate_per_minute):
+        with self._lock:
+            self._refill(self._clock())
+            self.rate_per_minute = rate_per_minute
+
+    def reserve(self):
+        with self._lock:
+            if self.rate_per_minute <= 0:
+                return 0.0
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens * 60.0 / self.rate_per_minute
+
+
+class AdaptivePacer:
+    """
+    Controla cuándo puede salir el siguiente mensaje de una sesión.
+    - max_per_minute: techo configurable (0 = sin límite).
+    - jitter: variación relativa de cada espera (0.25 = ±25%).
+    - Cada fallo (timeout/popup/error) multiplica 'slowdown' por backoff_step
+      (hasta max_slowdown); cada éxito lo reduce gradualmente hacia 1.
+    La tasa efectiva es max_per_minute / slowdown.
+    El intervalo cuenta desde la reserva del turno anterior: la carga del chat, la
+    pausa antes del clic y la palomita ya corren dentro de él, así que solo alargan
+    el envío cuando superan el intervalo.
+    """
+
+    def __init__(self, max_per_minute=DEFAULT_MAX_PER_MINUTE, burst=1, jitter=0.25,
+                 pre_click_pause=(0.3, 1.2), backoff_step=1.5, recovery_step=0.9,
+                 max_slowdown=8.0, sleep=time.sleep, clock=time.monotonic):
+        self.max_per_minute = max_per_minute
+        self.jitter = jitter
+        self.pre_click_pause = pre_click_pause
+        self.backoff_step = backoff_step
+        self.recovery_step = recovery_step
+        self.max_slowdown = max_slowdown
+        self.slowdown = 1.0
+        self._sleep = sleep
+        self._clock = clock
+        self._bucket = TokenBucket(max_per_minute, burst, clock)
+
+    @property
+    def effective_per_minute(self):
+        if self.max_per_minute <= 0:
+            return 0
+        return self.max_per_minute / self.slowdown
+
+    def _interruptible_sleep(self, seconds, should_continue):
+        """Duerme en pasos cortos para poder cancelar. Devuelve False si se canceló."""
+        deadline = self._clock() + seconds
+        while True:
+            if not should_continue():
+                return False
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return True
+            self._sleep(min(remaining, 0.25))
+
+    def next_wait(self):
+        """Reserva el turno del siguiente mensaje y devuelve los segundos a esperar (con jitter)."""
+        wait = self._bucket.reserve()
+        if wait > 0 and self.jitter:
+            wait *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(0.0, wait)
+
+    def wait_turn(self, should_continue=lambda: True):
+        """Espera el turno del siguiente mensaje. Devuelve False si se canceló mientras esperaba."""
+        wait = self.next_wait()
+        if wait <= 0:
+            return should_continue()
+        return self._interruptible_sleep(wait, should_continue)
+
+    def pre_click_delay(self):
+        """Segundos de la pausa aleatoria antes de pulsar enviar (0 si está desactivada)."""
+        low, high = self.pre_click_pause
+        if high <= 0:
+            return 0.0
+        return random.uniform(low, high) * self.slowdown
+
+    def pause_before_click(self):
+        """Pausa breve y aleatoria antes de pulsar enviar (ya con el botón listo)."""
+        delay = self.pre_click_delay()
+        if delay > 0:
+            self._sleep(delay)
+
+    def record(self, outcome):
+        """Ajusta el ritmo según el resultado del último destinatario."""
+        if outcome == OUTCOME_OK:
+            self.slowdown = max(1.0, self.slowdown * self.recovery_step)
+        elif outcome in (OUTCOME_POPUP, OUTCOME_TIMEOUT, OUTCOME_ERROR, OUTCOME_UNCONFIRMED):
+            self.slowdown = min(self.max_slowdown, self.slowdown * self.backoff_step)
+        else:
+            return
+        if self.max_per_minute > 0:
+            self._bucket.set_rate(self.effective_per_minute)
@@ -0,0 +1,153 @@
+# preflight.py
+"""
+Validación y normalización previa (vectorizada con pandas) del archivo de
+destinatarios: limpia números y campos, marca filas inválidas o duplicadas y
+calcula el número de teléfono ya codificado para la URL. Se ejecuta antes de
+abrir el navegador para que el bucle de envío solo reciba filas enviables.
+"""
+
+# Columnas internas que se añaden a cada bloque normalizado
+COL_VALID = '_valido'
+COL_PHONE = '_telefono' # Teléfono ya codificado para la URL
+COL_TEN_DIGITS = '_diez_digitos'
+COL_INDEX = '_indice' # Posición de la fila en el archivo (tras quitar las vacías)
+COL_KEY = '_clave' # Número normalizado (mismo destino aunque se escriba distinto)
+
+
+def normalize_number(numero):
+    """
+    Clave del destino: solo dígitos; los de 10 dígitos y los '521' + 10 se llevan
+    a '52' + 10 (la misma línea de México escrita de distintas formas).
+    """
+    digits = ''.join(ch for ch in str(numero) if ch.isdigit())
+    if len(digits) == 10:
+        return '52' + digits
+    if len(digits) == 13 and digits.startswith('521'):
+        return '52' + digits[3:]
+    return digits
+
+
+def normalize_chunk(df, dynamic_columns, start_index=0):
+    """
+    Normaliza un bloque ya limpio (sin NaN). Equivale a las comprobaciones que
+    hacía el bucle fila a fila:
+    - 'numero' sin espacios; válido solo si son dígitos (str.isdigit).
+    - 10 dígitos -> '+52 1 xx xxxx xxxx' codificado; otros -> el número tal cual (Plan B).
+    """
+    df = df.copy()
+    numero = df['numero'].astype(str).str.strip()
+    df['numero'] = numero
+    for col_name in dynamic_columns:
+        if col_name in df.columns:
+            df[col_name] = df[col_name].astype(str).str.strip()
+
+    ten_digits = numero.str.len().eq(10)
+    # quote("+52 1 56 4446 4018") == "%2B52%201%2056%204446%204018"
+    formatted = "%2B52%201%20" + numero.str[0:2] + "%20" + numero.str[2:6] + "%20" + numero.str[6:10]
+
+    df[COL_VALID] = numero.str.isdigit().fillna(False).astype(bool)
+    df[COL_TEN_DIGITS] = ten_digits & df[COL_VALID]
+    df[COL_PHONE] = formatted.where(ten_digits, numero) # Los dígitos no cambian con quote()
+    # Equivale a normalize_number() para números válidos (solo dígitos)
+    mexican_mobile = numero.str.len().eq(13) & numero.str.startswith('521')
+    df[COL_KEY] = numero.where(~ten_digits, '52' + numero).where(~mexican_mobile, '52' + numero.str[3:])
+    df[COL_INDEX] = range(start_index, start_index + len(df))
+    return df
+
+
+class PreflightReport:
+    """
+    Resumen del pre-vuelo: filas, válidas, inválidas, formato y duplicados. Los
+    duplicados (por número normalizado) los calcula un DuplicateIndex, que además
+    decide qué envíos se fusionan según la política.
+    """
+
+    def __init__(self, dynamic_columns, dedup_policy=None):
+        from dedup import DuplicateIndex, DEDUP_FIRST # dedup importa las columnas de este módulo
+        self.dynamic_columns = list(dynamic_columns)
+        self.rows = 0
+        self.valid = 0
+        self.invalid = 0
+        self.empty_numbers = 0
+        self.ten_digits = 0
+        self.plan_b = 0
+        self.duplicates = 0
+        self.removed = 0 # Envíos que se quitan por la política de duplicados
+        self.empty_fields = {col_name: 0 for col_name in self.dynamic_columns}
+        self.dedup = DuplicateIndex(dedup_policy or DEDUP_FIRST, self.dynamic_columns)
+
+    def add_chunk(self, df):
+        """Acumula las estadísticas de un bloque ya normalizado."""
+        valid = df[COL_VALID]
+        self.rows += len(df)
+        self.valid += int(valid.sum())
+        self.invalid += int((~valid).sum())
+        self.empty_numbers += int(df['numero'].eq('').sum())
+        self.ten_digits += int(df[COL_TEN_DIGITS].sum())
+        self.plan_b += int(valid.sum() - df[COL_TEN_DIGITS].sum())
+
+        self.dedup.add_chunk(df[valid])
+
+        for col_name in self.dynamic_columns:
+            if col_name in df.columns:
+                self.empty_fields[col_name] += int(df.loc[valid, col_name].eq('').sum())
+
+    def finish(self):
+        """Cierra el recuento de duplicados (tras el último bloque)."""
+        self.dedup.finish()
+        self.duplicates = self.dedup.duplicates
+        self.removed = self.dedup.removed
+
+    def confirm_chunk(self, df):
+        """Segunda pasada (solo si hay duplicados por hash): confirma con los valores reales."""
+        self.dedup.confirm_chunk(df[df[COL_VALID]])
+
+    def confirm_finish(self):
+        self.dedup.confirm_finish()
+        self.duplicates = self.dedup.duplicates
+        self.removed = self.dedup.removed
+
+    @property
+    def sendable(self):
+        """Filas que llegarán al bucle de envío."""
+        return self.valid - self.removed
+
+    def lines(self):
+        """Líneas de texto para mostrar en el log."""
+        lines = [
+            f"Pre-vuelo: {self.rows} filas, {self.valid} enviables, {self.invalid} con número inválido.",
+        ]
+        if self.plan_b:
+            lines.append(f"Pre-vuelo: {self.plan_b} números no tienen 10 dígitos (se usará el formato de URL anterior).")
+        if self.duplicates:
+            lines.append(f"Pre-vuelo: {self.duplicates} filas repiten un número ya listado.")
+        if self.removed:
+            lines.append(f"Pre-vuelo: Se fusionarán {self.removed} envíos duplicados "
+                         f"(política: {self.dedup.policy}); se enviarán {self.sendable} mensajes.")
+        empty = [f"{col_name} ({count})" for col_name, count in self.empty_fields.items() if count]
+        if empty:
+            lines.append(f"Pre-vuelo: Campos vacíos (se usarán vacíos): {', '.join(empty)}.")
+        return lines
+
+
+def run_preflight(chunks, dynamic_columns, dedup_policy=None, reopen=None):
+    """
+    Recorre los bloques (DataFrames limpios) y devuelve el PreflightReport.
+    'reopen()' devuelve los mismos bloques otra vez; si se indica y hay filas con el
+    mismo hash, se usa para confirmar los duplicados con los valores reales.
+    """
+    report = PreflightReport(dynamic_columns, dedup_policy)
+    start = 0
+    for df in chunks:
+        normalized = normalize_chunk(df, dynamic_columns, start)
+        start += len(normalized)
+        report.add_chunk(normalized)
+    report.finish()
+    if reopen is not None and report.dedup.needs_confirmation:
+        start = 0
+        for df in reopen():
+            normalized = normalize_chunk(df, dynamic_columns, start)
+            start += len(normalized)
+            report.confirm_chunk(normalized)
+        report.confirm_finish()
+    return report
@@ -0,0 +1,69 @@
+# profiles.py
+import os
+import glob
+import datetime
+import threading
+
+
+class ProfilePool:
+    """
+    Pool de perfiles persistentes de Edge (carpetas --user-data-dir) bajo 'perfiles/'.
+    Cada sesión toma un perfil libre; se prefieren los que ya tienen una sesión de
+    WhatsApp iniciada (marcados con LOGIN_MARKER) para evitar escanear el QR otra vez.
+    Seguro entre hilos dentro del mismo proceso.
+    """
+    LOGIN_MARKER = ".aurasend_login"
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(os.getcwd(), "perfiles")
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._in_use = set()
+
+    def _existing_profiles(self):
+        paths = [p for p in glob.glob(os.path.join(self.root, "sesion_*")) if os.path.isdir(p)]
+        def number(path):
+            suffix = os.path.basename(path).rsplit('_', 1)[-1]
+            return int(suffix) if suffix.isdigit() else 0
+        return sorted(paths, key=number)
+
+    def is_logged_in(self, profile_dir):
+        return os.path.exists(os.path.join(profile_dir, self.LOGIN_MARKER))
+
+    def acquire(self):
+        """Reserva y devuelve la ruta de un perfil libre (lo crea si hace falta)."""
+        with self._lock:
+            existing = self._existing_profiles()
+            free = [p for p in existing if p not in self._in_use]
+            # Primero los perfiles con sesión iniciada, luego los demás (orden estable)
+            free.sort(key=lambda p: not self.is_logged_in(p))
+            if free:
+                profile_dir = free[0]
+            else:
+                n = len(existing) + 1
+                profile_dir = os.path.join(self.root, f"sesion_{n}")
+                while os.path.exists(profile_dir):
+                    n += 1
+                    profile_dir = os.path.join(self.root, f"sesion_{n}")
+                os.makedirs(profile_dir)
+            self._in_use.add(profile_dir)
+            return profile_dir
+
+    def release(self, profile_dir):
+        with self._lock:
+            self._in_use.discard(profile_dir)
+
+    def mark_logged_in(self, profile_dir):
+        """Recuerda que este perfil tiene una sesión de WhatsApp iniciada."""
+        try:
+            with open(os.path.join(profile_dir, self.LOGIN_MARKER), 'w', encoding='utf-8') as f:
+                f.write(datetime.datetime.now().isoformat())
+        except OSError:
+            pass
+
+    def mark_logged_out(self, profile_dir):
+        """Olvida la sesión del perfil (WhatsApp volvió a pedir el QR): deja de preferirse."""
+        try:
+            os.remove(os.path.join(profile_dir, self.LOGIN_MARKER))
+        except OSError:
+            pass
@@ -0,0 +1,134 @@
+# recipients.py
+"""
+Destinatarios en columnas en lugar de un dict por fila. RecipientBlock guarda un
+bloque del archivo por columnas: el texto de cada columna en un solo buffer UTF-8
+con sus desplazamientos (array de enteros) y las columnas enteras (índice) en arrays;
+no hay objetos por fila. RecipientRow es una vista de dos referencias que lee los
+valores al pedirlos (recipient['numero'], recipient.get('nombre', '')), con la
+misma interfaz de solo lectura que el dict de DataFrame.to_dict('records').
+"""
+from array import array
+from itertools import accumulate
+from collections.abc import Mapping
+
+# Desplazamientos de 4 bytes mientras el buffer de la columna quepa (siempre, en bloques normales)
+_SMALL_OFFSETS_LIMIT = 2 ** 32 - 1
+
+
+def _offsets(values):
+    values = list(values)
+    return array('I' if values[-1] <= _SMALL_OFFSETS_LIMIT else 'q', values)
+
+
+class _TextColumn:
+    """Cadenas de una columna en un buffer UTF-8; cada valor se decodifica al leerlo."""
+    __slots__ = ('_buffer', '_offsets')
+
+    def __init__(self, buffer, offsets):
+        self._buffer = buffer
+        self._offsets = offsets
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [value.encode('utf-8') for value in values]
+        return cls(b"".join(encoded), _offsets(accumulate(map(len, encoded), initial=0)))
+
+    @classmethod
+    def concat(cls, columns):
+        offsets = [0]
+        for column in columns:
+            shift = offsets[-1]
+            offsets.extend(offset + shift for offset in column._offsets[1:])
+        return cls(b"".join(column._buffer for column in columns), _offsets(offsets))
+
+    def __getitem__(self, position):
+        return self._buffer[self._offsets[position]:self._offsets[position + 1]].decode('utf-8')
+
+
+def _column_from_series(series):
+    """Columna compacta según el tipo: enteros en array, texto en buffer; el resto como lista."""
+    if series.dtype.kind in 'iu':
+        return array('q', series.tolist())
+    values = series.tolist()
+    if all(type(value) is str for value in values):
+        return _TextColumn.from_values(values)
+    return values
+
+
+def _concat_columns(columns):
+    first = columns[0]
+    if isinstance(first, _TextColumn) and all(isinstance(column, _TextColumn) for column in columns):
+        return _TextColumn.concat(columns)
+    if isinstance(first, array) and all(isinstance(column, array) for column in columns):
+        merged = array(first.typecode)
+        for column in columns:
+            merged.extend(column)
+        return merged
+    return [column[position] for column in columns for position in range(_column_length(column))]
+
+
+def _column_length(column):
+    return len(column._offsets) - 1 if isinstance(column, _TextColumn) else len(column)
+
+
+class RecipientBlock:
+    """Bloque de destinatarios por columnas (solo lectura)."""
+    __slots__ = ('columns', '_positions', '_data', '_length')
+
+    def __init__(self, columns, data, length):
+        self.columns = tuple(columns)
+        self._positions = {name: position for position, name in enumerate(self.columns)}
+        self._data = list(data)
+        self._length = length
+
+    @classmethod
+    def from_frame(cls, df):
+        """Copia un DataFrame (ya normalizado) a columnas compactas."""
+        return cls(df.columns, [_column_from_series(df[name]) for name in df.columns], len(df))
+
+    @classmethod
+    def concat(cls, blocks):
+        """Une bloques con las mismas columnas (p. ej. los apartados para el final)."""
+        blocks = [block for block in blocks if len(block)]
+        if not blocks:
+            return cls((), [], 0)
+        columns = blocks[0].columns
+        data = [_concat_columns([block._data[position] for block in blocks]) for position in range(len(columns))]
+        return cls(columns, data, sum(len(block) for block in blocks))
+
+    def __len__(self):
+        return self._length
+
+    def row(self, position):
+        return RecipientRow(self, position)
+
+
+class RecipientRow(Mapping):
+    """Vista de una fila de un RecipientBlock; los valores se leen al pedirlos."""
+    __slots__ = ('_block', '_position')
+
+    def __init__(self, block, position):
+        self._block = block
+        self._position = position
+
+    def __getitem__(self, key):
+        block = self._block
+        return block._data[block._positions[key]][self._position]
+
+    def get(self, key, default=None):
+        # Sin pasar por la excepción de Mapping.get: se llama una vez por columna y destinatario
+        block = self._block
+        position = block._positions.get(key)
+        return default if position is None else block._data[position][self._position]
+
+    def __contains__(self, key):
+        return key in self._block._positions
+
+    def __iter__(self):
+        return iter(self._block.columns)
+
+    def __len__(self):
+        return len(self._block.columns)
+
+    def __repr__(self):
+        return f"RecipientRow({dict(self)!r})"
@@ -0,0 +1,321 @@
+# scheduling.py
+"""
+Programación de envíos: prioridad por columna, fecha "no antes de" por
+destinatario y ventanas de envío (p. ej. "lun-vie 09:00-18:00") evaluadas en la
+zona horaria de cada destinatario. RecipientScheduler guarda dos montículos
+(heapq): los que aún esperan su hora, ordenados por el instante en que se
+liberan, y los listos, ordenados por prioridad. Tomar el siguiente cuesta
+O(log n) aunque la campaña tenga millones de filas.
+"""
+import re
+import time
+import heapq
+import datetime
+import unicodedata
+
+PRIORITY_ASC = "asc" # 1 antes que 2 (vacío o no numérico al final)
+PRIORITY_DESC = "desc" # 2 antes que 1
+PRIORITY_ORDERS = (PRIORITY_ASC, PRIORITY_DESC)
+
+# Días en el orden de datetime.weekday()
+DAY_NAMES = ('lun', 'mar', 'mie', 'jue', 'vie', 'sab', 'dom')
+
+# Formatos aceptados en la columna "no antes de" (hora local del destinatario)
+NOT_BEFORE_FORMATS = ('%d/%m/%Y %H:%M', '%d/%m/%Y')
+
+# Tramo de la campaña: los números con historial (política 'al final') van después de todos
+TIER_NORMAL = 0
+TIER_DEFERRED = 1
+
+COL_SCHEDULE_ERROR = '_motivo_programacion' # Motivo de las filas que add_chunk descarta
+
+_WINDOW_RE = re.compile(r"^(?:([a-z]+)(?:\s*-\s*([a-z]+))?\s+)?(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})$")
+_OFFSET_RE = re.compile(r"^(?:utc|gmt)?\s*([+-])(\d{1,2})(?::?(\d{2}))?$")
+
+
+def _plain(text):
+    """Minúsculas sin acentos ('Mié' -> 'mie')."""
+    text = unicodedata.normalize('NFKD', str(text).strip().lower())
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def resolve_timezone(name):
+    """
+    Zona horaria a partir de un nombre IANA ('America/Mexico_City') o un desfase
+    fijo ('UTC-6', '-06:00'). Vacío devuelve None (hora local del equipo).
+    Lanza ValueError si no se reconoce.
+    """
+    name = str(name or '').strip()
+    if not name:
+        return None
+    match = _OFFSET_RE.match(name.lower())
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = datetime.timedelta(hours=int(hours), minutes=int(minutes or 0))
+        return datetime.timezone(-offset if sign == '-' else offset)
+    from zoneinfo import ZoneInfo # Solo hace falta con zonas por nombre
+    try:
+        return ZoneInfo(name)
+    except (KeyError, ValueError, OSError): # ZoneInfoNotFoundError es un KeyError
+        raise ValueError(f"Zona horaria desconocida: '{name}' (en Windows instala el paquete tzdata).")
+
+
+class SendWindows:
+    """
+    Ventanas de envío en hora local, p. ej. ["lun-vie 09:00-18:00", "sab 10:00-14:00"].
+    Sin días se aplica a toda la semana; si el fin es anterior al inicio la ventana
+    cruza la medianoche. Sin ventanas, siempre está abierto.
+    """
+
+    def __init__(self, specs=()):
+        if isinstance(specs, str):
+            specs = [specs]
+        self.specs = [str(spec).strip() for spec in specs if str(spec).strip()]
+        self._windows = [self._parse(spec) for spec in self.specs]
+
+    @staticmethod
+    def _parse(spec):
+        match = _WINDOW_RE.match(_plain(spec))
+        if not match:
+            raise ValueError(f"Ventana de envío mal escrita: '{spec}' (ejemplo: 'lun-vie 09:00-18:00').")
+        first, last, start_h, start_m, end_h, end_m = match.groups()
+        start = int(start_h) * 60 + int(start_m)
+        end = int(end_h) * 60 + int(end_m)
+        if start >= 24 * 60 or end > 24 * 60 or int(start_m) > 59 or int(end_m) > 59:
+            raise ValueError(f"Hora fuera de rango en la ventana '{spec}'.")
+        if first is None:
+            days = set(range(7))
+        else:
+            try:
+                begin = DAY_NAMES.index(first[:3])
+                finish = DAY_NAMES.index((last or first)[:3])
+            except ValueError:
+                raise ValueError(f"Día desconocido en la ventana '{spec}' (usa {', '.join(DAY_NAMES)}).")
+            days = {(begin + offset) % 7 for offset in range((finish - begin) % 7 + 1)}
+        return frozenset(days), start, end
+
+    def __bool__(self):
+        return bool(self._windows)
+
+    def is_open(self, local):
+        """True si la fecha/hora local cae dentro de alguna ventana."""
+        if not self._windows:
+            return True
+        minute = local.hour * 60 + local.minute
+        day = local.weekday()
+        for days, start, end in self._windows:
+            if start < end:
+                if day in days and start <= minute < end:
+                    return True
+            elif (day in days and minute >= start) or ((day - 1) % 7 in days and minute < end):
+                return True
+        return False
+
+    def next_open(self, local):
+        """Primer inicio de ventana a partir de 'local' (con su misma zona horaria)."""
+        candidates = []
+        for offset in range(8):
+            date = local.date() + datetime.timedelta(days=offset)
+            for days, start, _ in self._windows:
+                if date.weekday() in days:
+                    opening = datetime.datetime.combine(date, datetime.time(start // 60, start % 60),
+                                                        tzinfo=local.tzinfo)
+                    if opening > local:
+                        candidates.append(opening)
+            if candidates:
+                return min(candidates)
+        return local + datetime.timedelta(days=7) # No ocurre con ventanas válidas
+
+
+class ScheduleConfig:
+    """
+    Qué columnas del archivo programan el envío y en qué horario se permite enviar.
+    Las columnas que no están ya en la plantilla se añaden al final del archivo,
+    en el orden prioridad, no antes de, zona horaria.
+    """
+
+    def __init__(self, priority_column=None, priority_order=PRIORITY_ASC, not_before_column=None,
+                 timezone_column=None, timezone=None, windows=()):
+        if priority_order not in PRIORITY_ORDERS:
+            raise ValueError(f"Orden de prioridad desconocido: {priority_order}")
+        self.priority_column = priority_column or None
+        self.priority_order = priority_order
+        self.not_before_column = not_before_column or None
+        self.timezone_column = timezone_column or None
+        self.timezone = timezone or None
+        self.default_tz = resolve_timezone(self.timezone) # Valida el nombre ya al configurar
+        self.windows = SendWindows(windows)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Desde la sección "schedule" de la configuración de headless.py."""
+        data = dict(data or {})
+        return cls(data.get('priority_column'), data.get('priority_order') or PRIORITY_ASC,
+                   data.get('not_before_column'), data.get('timezone_column'), data.get('timezone'),
+                   data.get('windows') or ())
+
+    @property
+    def columns(self):
+        return [col_name for col_name in (self.priority_column, self.not_before_column, self.timezone_column)
+                if col_name]
+
+    @property
+    def active(self):
+        return bool(self.columns or self.windows)
+
+    def extra_columns(self, dynamic_columns):
+        """Columnas de programación que el archivo trae además de las de la plantilla."""
+        return [col_name for col_name in self.columns if col_name not in dynamic_columns]
+
+    def describe(self):
+        parts = []
+        if self.priority_column:
+            order = "ascendente" if self.priority_order == PRIORITY_ASC else "descendente"
+            parts.append(f"prioridad por '{self.priority_column}' ({order})")
+        if self.not_before_column:
+            parts.append(f"no antes de '{self.not_before_column}'")
+        if self.windows:
+            zone = f"zona en '{self.timezone_column}'" if self.timezone_column else (self.timezone or "hora local")
+            parts.append(f"ventanas {', '.join(self.windows.specs)} ({zone})")
+        return "; ".join(parts)
+
+
+def _parse_not_before(texts):
+    """Fechas (naive) de los textos únicos; NaT si no se entienden."""
+    import pandas
+    parsed = pandas.to_datetime(texts, errors='coerce', format='ISO8601')
+    for fmt in NOT_BEFORE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed = parsed.where(~missing, pandas.to_datetime(texts, errors='coerce', format=fmt))
+    return parsed
+
+
+class RecipientScheduler:
+    """
+    Cola de envío programada. add_chunk() recibe bloques ya filtrados (DataFrame)
+    y devuelve las filas con programación inválida; tras finish(), pop() entrega el
+    destinatario de mayor prioridad que ya puede salir (en empate, el orden del
+    archivo) y wait_seconds() cuánto falta para el siguiente cuando no hay ninguno.
+    No es seguro entre hilos: SharedCampaign lo usa con su lock.
+    """
+
+    def __init__(self, config, clock=time.time):
+        self.config = config
+        self._clock = clock
+        self._waiting = [] # (instante, índice, prioridad, zona, destinatario)
+        self._ready = [] # (prioridad, índice, zona, destinatario)
+        self._zones = {}
+
+    def __len__(self):
+        return len(self._waiting) + len(self._ready)
+
+    def _zone(self, name):
+        """Zona de un destinatario (en caché). Lanza ValueError si no se reconoce."""
+        if not name:
+            return self.config.default_tz
+        if name not in self._zones:
+            self._zones[name] = resolve_timezone(name)
+        return self._zones[name]
+
+    def add_chunk(self, df, tier=TIER_NORMAL):
+        """
+        Encola las filas de un bloque (columnas internas incluidas). Devuelve un
+        DataFrame con las filas descartadas y una columna con el motivo.
+        """
+        import pandas
+        from preflight import COL_INDEX
+        from recipients import RecipientBlock
+        config = self.config
+        rejected = pandas.Series("", index=df.index)
+
+        if config.priority_column:
+            priorities = pandas.to_numeric(df[config.priority_column], errors='coerce')
+            if config.priority_order == PRIORITY_DESC:
+                priorities = -priorities
+            priorities = priorities.fillna(float('inf')).tolist()
+        else:
+            priorities = [0.0] * len(df)
+
+        zone_names = df[config.timezone_column].tolist() if config.timezone_column else [""] * len(df)
+        zones = {}
+        for name in set(zone_names):
+            try:
+                zones[name] = self._zone(name)
+            except ValueError:
+                zones[name] = ValueError
+        bad_zone = pandas.Series([zones[name] is ValueError for name in zone_names], index=df.index)
+        rejected = rejected.mask(bad_zone, "Zona horaria desconocida")
+
+        ready_at = [0.0] * len(df)
+        if config.not_before_column:
+            texts = df[config.not_before_column]
+            unique_texts = pandas.Index(texts[texts.ne("")].unique())
+            parsed = dict(zip(unique_texts, _parse_not_before(unique_texts)))
+            bad_date = texts.ne("") & texts.map(lambda text: pandas.isna(parsed.get(text)))
+            rejected = rejected.mask(bad_date & rejected.eq(""), "Fecha 'no antes de' inválida")
+            instants = {}
+            for position, (text, name) in enumerate(zip(texts.tolist(), zone_names)):
+                if not text or zones[name] is ValueError or pandas.isna(parsed[text]):
+                    continue
+                key = (text, name)
+                if key not in instants:
+                    # Hora local del destinatario; sin zona, la del equipo
+                    instants[key] = parsed[text].to_pydatetime().replace(tzinfo=zones[name]).timestamp()
+                ready_at[position] = instants[key]
+
+        # Las filas aceptadas quedan en columnas; el montículo solo guarda vistas (RecipientRow)
+        accepted = rejected.eq("")
+        block = RecipientBlock.from_frame(df[accepted])
+        rows = iter(range(len(block)))
+        for position, (index, ok) in enumerate(zip(df[COL_INDEX].tolist(), accepted.tolist())):
+            if ok:
+                self._waiting.append((ready_at[position], index, (tier, priorities[position]),
+                                      zones[zone_names[position]], block.row(next(rows))))
+        return df[rejected.ne("")].assign(**{COL_SCHEDULE_ERROR: rejected[rejected.ne("")]})
+
+    def finish(self):
+        """Ordena los montículos tras el último bloque (O(n))."""
+        now = self._clock()
+        pending = []
+        for ready_at, index, priority, zone, record in self._waiting:
+            if ready_at <= now:
+                self._ready.append((priority, index, zone, record))
+            else:
+                pending.append((ready_at, index, priority, zone, record))
+        self._waiting = pending
+        heapq.heapify(self._waiting)
+        heapq.heapify(self._ready)
+
+    def pop(self):
+        """Siguiente destinatario que puede enviarse ahora, o None (ver wait_seconds)."""
+        now = self._clock()
+        while self._waiting and self._waiting[0][0] <= now:
+            _, index, priority, zone, record = heapq.heappop(self._waiting)
+            heapq.heappush(self._ready, (priority, index, zone, record))
+        windows = self.config.windows
+        while self._ready:
+            priority, index, zone, record = heapq.heappop(self._ready)
+            if not windows:
+                return record
+            local = datetime.datetime.fromtimestamp(now, zone)
+            if windows.is_open(local):
+                return record
+            # Fuera de su horario: vuelve a esperar hasta que abra su próxima ventana
+            heapq.heappush(self._waiting, (windows.next_open(local).timestamp(), index, priority, zone, record))
+        return None
+
+    def wait_seconds(self):
+        """Segundos hasta que se libere el siguiente destinatario; None si la cola está vacía."""
+        if self._ready:
+            return 0.0
+        if not self._waiting:
+            return None
+        return max(0.0, self._waiting[0][0] - self._clock())
+
+    def next_release(self):
+        """Fecha y hora local en que se libera el siguiente destinatario en espera (o None)."""
+        if not self._waiting:
+            return None
+        return datetime.datetime.fromtimestamp(self._waiting[0][0])
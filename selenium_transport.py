@@ -0,0 +1,117 @@
+# selenium_transport.py
+"""
+Transporte sobre Selenium. Está separado de transport.py para que importar el
+modelo (o usar HttpTransport) no cargue Selenium: solo se importa al abrir Edge.
+"""
+from selenium.common import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.by import By
+
+from transport import (
+    BaseTransport, TransportTimeout, WHATSAPP_WEB_URL, CHAT_INPUT_XPATH, INVALID_NUMBER_XPATH,
+    SEND_BUTTON_XPATH, CHAT_LIST_XPATH, QR_CODE_XPATH, OUTGOING_MESSAGE_XPATH, SENT_TICK_XPATH, LOGIN_STATE_LOGGED_IN, LOGIN_STATE_QR,
+    CHAT_STATE_READY, CHAT_STATE_INVALID, NAV_RELOAD, STALE_ATTRIBUTE, in_page_link,
+)
+
+# Cada cuánto se revisa la página mientras carga un chat
+CHAT_POLL_SECONDS = 0.2
+# Tiempo para que un chat abierto en la página muestre algo antes de recargar la URL
+IN_PAGE_CONFIRM_SECONDS = 5
+
+# Una sola llamada por sondeo revisa ambos XPath en el navegador (ignora lo marcado)
+_CHAT_OUTCOME_SCRIPT = """
+var stale = arguments[4];
+function present(xpath) {
+  var nodes = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  for (var i = 0; i < nodes.snapshotLength; i++) {
+    if (!nodes.snapshotItem(i).hasAttribute(stale)) { return true; }
+  }
+  return false;
+}
+if (present(arguments[0])) { return arguments[2]; }
+if (present(arguments[1])) { return arguments[3]; }
+return null;
+"""
+
+# Marca el chat actual y pulsa un enlace 'whatsapp://send?...' dentro de la aplicación
+_OPEN_IN_PAGE_SCRIPT = """
+var nodes = document.evaluate(arguments[1], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (var i = 0; i < nodes.snapshotLength; i++) { nodes.snapshotItem(i).setAttribute(arguments[2], '1'); }
+var link = document.createElement('a');
+link.href = arguments[0];
+link.style.display = 'none';
+document.body.appendChild(link);
+link.click();
+link.remove();
+"""
+
+
+class SeleniumTransport(BaseTransport):
+    """Transporte sobre un WebDriver de Selenium ya creado."""
+
+    def __init__(self, driver, base_url=WHATSAPP_WEB_URL, in_page_navigation=False):
+        super().__init__(base_url, in_page_navigation)
+        self.driver = driver
+
+    def _wait(self, condition, xpath, timeout):
+        try:
+            return WebDriverWait(self.driver, timeout).until(condition((By.XPATH, xpath)))
+        except TimeoutException as e:
+            raise TransportTimeout(str(e)) from e
+
+    def open_home(self):
+        self.driver.get(self.base_url)
+
+    def open_chat(self, url):
+        if self._use_in_page():
+            try:
+                self.driver.execute_script(_OPEN_IN_PAGE_SCRIPT, in_page_link(url),
+                                           f"{CHAT_INPUT_XPATH} | {INVALID_NUMBER_XPATH}", STALE_ATTRIBUTE)
+                self.wait_for_chat_outcome(IN_PAGE_CONFIRM_SECONDS)
+                self._in_page_result(True)
+                return
+            except (TransportTimeout, WebDriverException):
+                self._in_page_result(False)
+        self.driver.get(url)
+        self.navigation_stats[NAV_RELOAD] += 1
+
+    def wait_for_login_state(self, timeout):
+        try:
+            WebDriverWait(self.driver, timeout).until(EC.any_of(
+                EC.presence_of_element_located((By.XPATH, CHAT_LIST_XPATH)),
+                EC.presence_of_element_located((By.XPATH, QR_CODE_XPATH)),
+            ))
+        except TimeoutException as e:
+            raise TransportTimeout(str(e)) from e
+        return LOGIN_STATE_LOGGED_IN if self.is_logged_in() else LOGIN_STATE_QR
+
+    def is_logged_in(self):
+        return bool(self.driver.find_elements(By.XPATH, CHAT_LIST_XPATH))
+
+    def wait_for_chat_outcome(self, timeout):
+        def outcome(driver):
+            return driver.execute_script(_CHAT_OUTCOME_SCRIPT, CHAT_INPUT_XPATH, INVALID_NUMBER_XPATH,
+                                         CHAT_STATE_READY, CHAT_STATE_INVALID, STALE_ATTRIBUTE)
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=CHAT_POLL_SECONDS).until(outcome)
+        except TimeoutException as e:
+            raise TransportTimeout(str(e)) from e
+
+    def dismiss_invalid_popup(self):
+        self.driver.find_element(By.XPATH, INVALID_NUMBER_XPATH).click()
+
+    def wait_for_send_button(self, timeout):
+        return self._wait(EC.element_to_be_clickable, SEND_BUTTON_XPATH, timeout)
+
+    def count_outgoing(self):
+        return len(self.driver.find_elements(By.XPATH, OUTGOING_MESSAGE_XPATH))
+
+    def click_send(self, handle):
+        handle.click()
+
+    def wait_for_sent(self, timeout, previous=0):
+        return self._wait(EC.presence_of_element_located, SENT_TICK_XPATH.format(count=previous), timeout)
+
+    def close(self):
+        self.driver.quit()
@@ -0,0 +1,229 @@
+# send_metrics.py
+"""
+Métricas de tiempo por destinatario. El bucle de envío mide cada etapa (pausa
+de ritmo, plantilla, URL, carga del chat, espera del chat, botón, clic, palomita)
+con un RecipientTimer; SendMetrics las acumula en histogramas y contadores por
+resultado. Se pueden exportar como texto de Prometheus (MetricsServer, /metrics)
+y/o como un archivo JSONL con una línea por destinatario.
+"""
+import json
+import time
+import bisect
+import datetime
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# --- Etapas medidas (en orden dentro del envío) ---
+STAGE_PACING = 'ritmo' # Espera de turno del AdaptivePacer
+STAGE_RENDER = 'plantilla'
+STAGE_URL = 'url'
+STAGE_PAGE_LOAD = 'carga_chat' # open_chat (navegación o recarga)
+STAGE_CHAT_READY = 'espera_chat' # Cuadro de texto o popup
+STAGE_POPUP = 'popup' # Cerrar el popup de número inválido
+STAGE_SEND_BUTTON = 'boton_enviar'
+STAGE_PRE_CLICK = 'pausa_clic'
+STAGE_CLICK = 'clic'
+STAGE_SENT = 'palomita' # Confirmación del envío
+STAGES = (STAGE_PACING, STAGE_RENDER, STAGE_URL, STAGE_PAGE_LOAD, STAGE_CHAT_READY, STAGE_POPUP,
+          STAGE_SEND_BUTTON, STAGE_PRE_CLICK, STAGE_CLICK, STAGE_SENT)
+
+# Límites superiores (segundos) de los buckets de los histogramas
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+
+METRIC_PREFIX = 'aurasend'
+
+
+class Histogram:
+    """Histograma acumulativo al estilo Prometheus (no es seguro entre hilos por sí solo)."""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # El último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Cota superior del bucket donde cae el cuantil q (aproximado)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float('inf')
+
+    def cumulative(self):
+        """(límite, acumulado) de cada bucket, terminando en +Inf."""
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            yield bound, running
+
+
+class RecipientTimer:
+    """Tiempos de las etapas de un destinatario (usar 'with timer.stage(...)')."""
+
+    def __init__(self, session_id=0, index=None):
+        self.session_id = session_id
+        self.index = index
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class SendMetrics:
+    """
+    Acumulador compartido entre sesiones (seguro entre hilos). Con 'jsonl_path'
+    escribe una línea JSON por destinatario terminado.
+    """
+
+    def __init__(self, jsonl_path=None):
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self.stage_histograms = {stage: Histogram() for stage in STAGES}
+        self.total_histogram = Histogram()
+        self.outcomes = {}
+        self._jsonl = open(jsonl_path, 'a', encoding='utf-8') if jsonl_path else None
+
+    def start_recipient(self, session_id=0, index=None):
+        return RecipientTimer(session_id, index)
+
+    def finish_recipient(self, timer, outcome):
+        """Acumula los tiempos de un destinatario con su resultado (OUTCOME_* del pacer)."""
+        total = timer.elapsed()
+        with self._lock:
+            for stage, seconds in timer.stages.items():
+                histogram = self.stage_histograms.get(stage)
+                if histogram is None:
+                    histogram = self.stage_histograms[stage] = Histogram()
+                histogram.observe(seconds)
+            self.total_histogram.observe(total)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            if self._jsonl is not None:
+                record = {
+                    'ts': datetime.datetime.now().isoformat(timespec='milliseconds'),
+                    'session': timer.session_id, 'index': timer.index, 'outcome': outcome,
+                    'total': round(total, 6),
+                    'stages': {stage: round(seconds, 6) for stage, seconds in timer.stages.items()},
+                }
+                try:
+                    self._jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    self._jsonl.flush()
+                except OSError:
+                    pass # Las métricas no deben detener el envío
+
+    def mean_active_seconds(self):
+        """Media por destinatario sin contar la espera de turno (lo que el ritmo no puede ocultar)."""
+        with self._lock:
+            return max(0.0, self.total_histogram.mean() - self.stage_histograms[STAGE_PACING].mean())
+
+    def summary(self):
+        """Texto corto con la media y el p95 (aprox.) de las etapas medidas."""
+        with self._lock:
+            parts = [f"{stage} {histogram.mean():.2f}s (p95 ≤{histogram.quantile(0.95):g}s)"
+                     for stage, histogram in self.stage_histograms.items() if histogram.count]
+            total = self.total_histogram
+            if total.count:
+                parts.append(f"total {total.mean():.2f}s")
+        return ", ".join(parts)
+
+    def prometheus_text(self):
+        """Exposición en formato de texto de Prometheus (0.0.4)."""
+        lines = []
+        with self._lock:
+            name = f"{METRIC_PREFIX}_stage_seconds"
+            lines.append(f"# HELP {name} Duración de cada etapa del envío por destinatario.")
+            lines.append(f"# TYPE {name} histogram")
+            for stage, histogram in self.stage_histograms.items():
+                lines.extend(_histogram_lines(name, histogram, f'stage="{stage}"'))
+            name = f"{METRIC_PREFIX}_recipient_seconds"
+            lines.append(f"# HELP {name} Duración total por destinatario.")
+            lines.append(f"# TYPE {name} histogram")
+            lines.extend(_histogram_lines(name, self.total_histogram, ""))
+            name = f"{METRIC_PREFIX}_recipients_total"
+            lines.append(f"# HELP {name} Destinatarios procesados por resultado.")
+            lines.append(f"# TYPE {name} counter")
+            for outcome, count in sorted(self.outcomes.items()):
+                lines.append(f'{name}{{outcome="{outcome}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+
+def _histogram_lines(name, histogram, labels):
+    separator = "," if labels else ""
+    for bound, running in histogram.cumulative():
+        le = "+Inf" if bound == float('inf') else f"{bound:g}"
+        yield f'{name}_bucket{{{labels}{separator}le="{le}"}} {running}'
+    suffix = f"{{{labels}}}" if labels else ""
+    yield f"{name}_sum{suffix} {histogram.sum:.6f}"
+    yield f"{name}_count{suffix} {histogram.count}"
+
+
+class MetricsServer:
+    """
+    Endpoint HTTP opcional (/metrics) en un hilo de fondo. 'source' es una función
+    que devuelve el SendMetrics actual (o None), así sobrevive entre campañas.
+    """
+
+    def __init__(self, source, port, host='127.0.0.1'):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                metrics = server.source()
+                data = (metrics.prometheus_text() if metrics is not None else "").encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.source = source
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="MetricsServer", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,106 @@
+# template_engine.py
+"""
+Plantillas de mensaje compiladas: la plantilla se analiza una sola vez en
+segmentos; el texto fijo y las variables estáticas quedan ya formateados y
+codificados para URL, y por destinatario solo se formatean y codifican los
+campos dinámicos. Los resultados se guardan en una caché LRU por valores.
+"""
+import re
+from functools import lru_cache
+from string import Formatter
+from urllib.parse import quote
+
+PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)\}')
+RENDER_CACHE_SIZE = 4096
+
+_formatter = Formatter()
+
+
+@lru_cache(maxsize=256)
+def extract_placeholders(template):
+    """Nombres de variables '{nombre}' de la plantilla, en orden de aparición (con repetidos)."""
+    return tuple(PLACEHOLDER_PATTERN.findall(template))
+
+
+def dynamic_columns_for(template, static_var_names):
+    """Columnas que debe traer el archivo: variables que no son 'numero' ni estáticas (ordenadas)."""
+    static_var_names = set(static_var_names)
+    return sorted(set(
+        var for var in extract_placeholders(template) if var != 'numero' and var not in static_var_names
+    ))
+
+
+class CompiledTemplate:
+    """
+    Plantilla compilada. render_encoded(values) recibe los valores de
+    'dynamic_fields' (en ese orden) y devuelve el mensaje ya codificado con quote().
+    Equivale a quote(template.format_map({**static_vars, **dinámicas})): quote
+    codifica carácter a carácter, así que codificar por partes da el mismo resultado.
+    Los errores de formato (llaves mal cerradas, variable desconocida...) se lanzan
+    al renderizar, igual que hacía format_map en el bucle.
+    """
+
+    def __init__(self, template, static_vars, dynamic_columns, cache_size=RENDER_CACHE_SIZE):
+        self.template = template
+        self.static_vars = dict(static_vars)
+        self.dynamic_columns = list(dynamic_columns)
+        self.dynamic_fields = ()
+        self._segments = [] # str (ya codificado) o (posición en values, campo, conversión, formato)
+        self._error = None
+        try:
+            self._compile()
+        except Exception as e:
+            self._error = e
+        self._render_cached = lru_cache(maxsize=cache_size)(self._render)
+
+    def _compile(self):
+        dynamic = set(self.dynamic_columns)
+        fields = []
+        pending_text = []
+        for literal, field_name, format_spec, conversion in _formatter.parse(self.template):
+            if literal:
+                pending_text.append(literal)
+            if field_name is None:
+                continue
+            root = re.split(r'[.\[]', field_name, maxsplit=1)[0]
+            if '{' in (format_spec or '') or root not in dynamic:
+                # Variable estática (o especificación anidada): se resuelve ya
+                obj, _ = _formatter.get_field(field_name, (), self.static_vars)
+                obj = _formatter.convert_field(obj, conversion)
+                spec = _formatter.vformat(format_spec, (), self.static_vars) if format_spec else ''
+                pending_text.append(format(obj, spec))
+                continue
+            if pending_text:
+                self._segments.append(quote(''.join(pending_text)))
+                pending_text = []
+            if root not in fields:
+                fields.append(root)
+            self._segments.append((fields.index(root), field_name, conversion, format_spec or ''))
+        if pending_text:
+            self._segments.append(quote(''.join(pending_text)))
+        self.dynamic_fields = tuple(fields)
+
+    def render_encoded(self, values):
+        """Mensaje codificado para URL a partir de los valores dinámicos (tupla)."""
+        if self._error is not None:
+            raise self._error
+        return self._render_cached(tuple(values))
+
+    def _render(self, values):
+        parts = []
+        for segment in self._segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+            position, field_name, conversion, format_spec = segment
+            obj = values[position]
+            if field_name != self.dynamic_fields[position]:
+                # Acceso a atributo/índice, p. ej. {nombre[0]}
+                obj, _ = _formatter.get_field(field_name, (), {self.dynamic_fields[position]: obj})
+            if conversion:
+                obj = _formatter.convert_field(obj, conversion)
+            parts.append(quote(format(obj, format_spec)))
+        return ''.join(parts)
+
+    def cache_info(self):
+        return self._render_cached.cache_info()
@@ -0,0 +1,216 @@
+# transport.py
+"""
+Capa de transporte del envío: abrir chat, esperar el cuadro de texto,
+pulsar enviar y detectar el popup de número inválido.
+
+- SeleniumTransport (selenium_transport.py): WhatsApp Web real (o la página falsa)
+  a través de un WebDriver. Vive aparte para no importar Selenium hasta abrir Edge.
+- HttpTransport: habla directamente por HTTP con fake_whatsapp.py, sin navegador,
+  para medir y perfilar el pipeline en máquinas sin red ni Edge.
+
+Navegación: por defecto cada chat se abre cargando su URL de envío. Con
+in_page_navigation (experimental, desactivada por defecto) se pulsa un enlace
+'whatsapp://send?...' dentro de la aplicación ya cargada y solo se recarga si
+falla. Solo fake_whatsapp.py enruta ese enlace sin recargar: en WhatsApp Web real
+el navegador lo trata como protocolo externo (pregunta o abre la aplicación de
+escritorio), así que cada uno de los primeros IN_PAGE_MAX_FAILURES chats paga la
+espera de confirmación más la recarga antes de que se desactive sola.
+"""
+import urllib.request
+from collections import Counter
+from urllib.parse import urlencode, urlsplit, parse_qs
+
+WHATSAPP_WEB_URL = 'https://web.whatsapp.com'
+
+# --- Selectores de WhatsApp Web (los mismos que sirve fake_whatsapp.py) ---
+CHAT_INPUT_XPATH = "//div[@contenteditable='true'][@data-tab='10'] | //div[@contenteditable='true'][@data-tab='1']"
+INVALID_NUMBER_XPATH = "//div[contains(@data-testid, 'popup-controls-ok')]"
+SEND_BUTTON_XPATH = "//button[@aria-label='Enviar'] | //span[@data-icon='send']/ancestor::button | //div[@role='button'][.//span[@data-icon='wds-ic-send-filled']]"
+# Lista de chats (sesión iniciada) y código QR (falta escanear)
+CHAT_LIST_XPATH = "//div[@id='pane-side'] | //div[@aria-label='Lista de chats' or @aria-label='Chat list']"
+QR_CODE_XPATH = "//div[@data-ref]//canvas | //canvas[@aria-label]"
+# Burbujas de mensajes salientes del chat abierto
+OUTGOING_MESSAGE_XPATH = "//div[contains(@class, 'message-out')]"
+# Palomita de un mensaje saliente posterior a los {count} que ya había antes del clic
+# (el reloj 'msg-time' indica que aún no sale; los mensajes anteriores no cuentan)
+SENT_TICK_XPATH = ("(" + OUTGOING_MESSAGE_XPATH + ")[position() > {count}]"
+                   "//span[@data-icon='msg-check' or @data-icon='msg-dblcheck' or @data-icon='msg-dblcheck-ack']")
+
+
+LOGIN_STATE_LOGGED_IN = 'logged_in'
+LOGIN_STATE_QR = 'qr'
+
+# Resultado de abrir un chat (lo que aparezca primero)
+CHAT_STATE_READY = 'ready' # Cuadro de texto listo
+CHAT_STATE_INVALID = 'invalid' # Popup de número inválido / sin WhatsApp
+
+# Cómo se abrió cada chat (navigation_stats)
+NAV_IN_PAGE = 'en_pagina'
+NAV_RELOAD = 'recarga'
+# Fallos seguidos de la navegación en la página antes de usar solo recargas completas
+IN_PAGE_MAX_FAILURES = 3
+# Atributo con el que se marcan el cuadro de texto y el popup del chat anterior
+# antes de navegar en la página (si no, el chat anterior parecería ya listo)
+STALE_ATTRIBUTE = 'data-aurasend-previo'
+
+
+def in_page_link(url):
+    """Enlace 'whatsapp://send?' + la consulta de la URL de envío (solo lo enruta fake_whatsapp.py)."""
+    return 'whatsapp://send?' + urlsplit(url).query
+
+
+class TransportTimeout(Exception):
+    """El elemento esperado no apareció dentro del tiempo indicado."""
+
+
+class BaseTransport:
+    """
+    Interfaz común de los transportes. Las esperas devuelven un 'handle'
+    del elemento encontrado o lanzan TransportTimeout.
+    """
+
+    def __init__(self, base_url=WHATSAPP_WEB_URL, in_page_navigation=False):
+        self.base_url = base_url.rstrip('/')
+        self.in_page_navigation = in_page_navigation
+        self.navigation_stats = Counter() # NAV_IN_PAGE / NAV_RELOAD
+        self._in_page_failures = 0
+
+    def _use_in_page(self):
+        return self.in_page_navigation and self._in_page_failures < IN_PAGE_MAX_FAILURES
+
+    def _in_page_result(self, ok):
+        """Anota el resultado de un intento en la página; tras varios fallos seguidos se desactiva."""
+        if ok:
+            self._in_page_failures = 0
+            self.navigation_stats[NAV_IN_PAGE] += 1
+        else:
+            self._in_page_failures += 1
+
+    def build_send_url(self, encoded_phone):
+        """URL de envío sin el texto (el texto se añade con '&text=')."""
+        return f'{self.base_url}/send?phone={encoded_phone}'
+
+    def open_home(self):
+        raise NotImplementedError
+
+    def open_chat(self, url):
+        """Abre el chat de la URL de envío (en la página si se puede; si no, recargando)."""
+        raise NotImplementedError
+
+    def wait_for_login_state(self, timeout):
+        """Espera a que la página muestre la lista de chats o el QR; devuelve LOGIN_STATE_*."""
+        raise NotImplementedError
+
+    def is_logged_in(self):
+        """Comprobación inmediata (sin esperar) de si ya se ve la lista de chats."""
+        raise NotImplementedError
+
+    def wait_for_chat_outcome(self, timeout):
+        """
+        Espera a la vez el cuadro de texto y el popup de número inválido y devuelve
+        CHAT_STATE_* de lo que aparezca primero (TransportTimeout si no aparece ninguno).
+        """
+        raise NotImplementedError
+
+    def dismiss_invalid_popup(self):
+        raise NotImplementedError
+
+    def wait_for_send_button(self, timeout):
+        raise NotImplementedError
+
+    def count_outgoing(self):
+        """Mensajes salientes que ya muestra el chat (se llama justo antes del clic)."""
+        raise NotImplementedError
+
+    def click_send(self, handle):
+        raise NotImplementedError
+
+    def wait_for_sent(self, timeout, previous=0):
+        """
+        Espera la palomita de un mensaje saliente nuevo: uno después de los 'previous'
+        que contó count_outgoing() antes del clic. TransportTimeout si no aparece.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class HttpTransport(BaseTransport):
+    """
+    Transporte sin navegador para fake_whatsapp.py: descarga la página del chat
+    y busca en el HTML las mismas marcas que usan los XPath de Selenium.
+    Como la página no cambia después de cargarse, las esperas no sondean: si la
+    marca no está, se lanza TransportTimeout de inmediato. La navegación en la
+    página equivale a pedir solo el fragmento /chat-state, como hace el SPA falso.
+    """
+
+    def __init__(self, base_url, request_timeout=30, in_page_navigation=False):
+        super().__init__(base_url, in_page_navigation)
+        self.request_timeout = request_timeout
+        self._html = ""
+        self._phone = ""
+        self._text = ""
+
+    def _get(self, url):
+        with urllib.request.urlopen(url, timeout=self.request_timeout) as response:
+            return response.read().decode('utf-8')
+
+    def open_home(self):
+        self._html = self._get(self.base_url + '/')
+
+    @staticmethod
+    def _query_values(url):
+        """(phone, text) de una URL de envío."""
+        query = parse_qs(urlsplit(url).query)
+        return query.get('phone', [''])[0], query.get('text', [''])[0]
+
+    def open_chat(self, url):
+        self._phone, self._text = self._query_values(url)
+        if self._use_in_page():
+            try:
+                self._html = self._get(f"{self.base_url}/chat-state?{urlsplit(url).query}")
+                self._in_page_result(True)
+                return
+            except OSError: # HTTPError/URLError incluidos
+                self._in_page_result(False)
+        self._html = self._get(url)
+        self.navigation_stats[NAV_RELOAD] += 1
+
+    def wait_for_login_state(self, timeout):
+        return LOGIN_STATE_LOGGED_IN if self.is_logged_in() else LOGIN_STATE_QR
+
+    def is_logged_in(self):
+        return "pane-side" in self._html
+
+    def _require(self, marker, what):
+        if marker not in self._html:
+            raise TransportTimeout(f"{what} no encontrado en la página.")
+        return marker
+
+    def wait_for_chat_outcome(self, timeout):
+        if "contenteditable=\"true\" data-tab=\"10\"" in self._html:
+            return CHAT_STATE_READY
+        if "popup-controls-ok" in self._html:
+            return CHAT_STATE_INVALID
+        raise TransportTimeout("Ni el cuadro de texto ni el popup de número inválido aparecen en la página.")
+
+    def dismiss_invalid_popup(self):
+        self._html = ""
+
+    def wait_for_send_button(self, timeout):
+        return self._require("data-icon=\"send\"", "Botón enviar")
+
+    def count_outgoing(self):
+        return 0 # Cada chat de fake_whatsapp.py empieza sin mensajes
+
+    def click_send(self, handle):
+        self._get(f"{self.base_url}/click?" + urlencode({'phone': self._phone, 'text': self._text}))
+        self._html = ""
+
+    def wait_for_sent(self, timeout, previous=0):
+        # El clic es una petición síncrona: si respondió, el servidor ya registró el envío
+        return True
+
+    def close(self):
+        self._html = ""
@@ -5,13 +5,16 @@ import platform
 import subprocess
 from PySide6.QtWidgets import (
     QMainWindow, QPushButton, QWidget, QVBoxLayout,
-    QLabel, QLineEdit, QTextEdit, QMessageBox, QProgressBar,
+    QLabel, QLineEdit, QTextEdit, QPlainTextEdit, QMessageBox, QProgressBar,
     QHBoxLayout, QFileDialog, QApplication, QScrollArea,
     # --- Añadidos para Pestañas y Visor ---
-    QTabWidget, QTableView, QComboBox, QHeaderView
+    QTabWidget, QTableView, QComboBox, QHeaderView,
+    QSpinBox, QCheckBox
 )
 from PySide6.QtCore import Qt, Signal, Slot
-from PySide6.QtGui import QStandardItemModel # Importar para el slot
+
+# Líneas que conserva el log en vivo (las más viejas se descartan; el archivo de actividad tiene todo)
+LIVE_LOG_MAX_LINES = 2000
 
 class MainView(QMainWindow):
     """
@@ -27,6 +30,7 @@ class MainView(QMainWindow):
     # --- Nuevas Señales para el Visor de Logs ---
     refresh_logs_list_clicked = Signal()
     log_file_selected = Signal(str) # Emite la RUTA COMPLETA del archivo
+    log_reason_filter_changed = Signal(str) # Razon_Fallo elegida ('' = todas)
     # --- Fin de Nuevas Señales ---
 
     def __init__(self):
@@ -82,6 +86,40 @@ class MainView(QMainWindow):
         self.lbl_expected_format.setStyleSheet("font-style: italic; color: grey;")
         self.main_layout.addWidget(self.lbl_expected_format)
 
+        # --- Sección 3b: Sesiones en paralelo ---
+        sessions_layout = QHBoxLayout()
+        sessions_layout.addWidget(QLabel("Sesiones en paralelo (una cuenta/navegador por sesión):"))
+        self.spin_sessions = QSpinBox()
+        self.spin_sessions.setRange(1, 16)
+        self.spin_sessions.setValue(1)
+        sessions_layout.addWidget(self.spin_sessions)
+        sessions_layout.addWidget(QLabel("Máx. mensajes/min por sesión (0 = sin límite):"))
+        self.spin_max_per_minute = QSpinBox()
+        self.spin_max_per_minute.setRange(0, 120)
+        self.spin_max_per_minute.setValue(10)
+        sessions_layout.addWidget(self.spin_max_per_minute)
+        sessions_layout.addStretch(1)
+        self.main_layout.addLayout(sessions_layout)
+
+        self.chk_resume = QCheckBox("Reanudar campaña anterior de este archivo (omitir los ya enviados)")
+        self.main_layout.addWidget(self.chk_resume)
+
+        known_bad_layout = QHBoxLayout()
+        known_bad_layout.addWidget(QLabel("Números sin WhatsApp en campañas anteriores:"))
+        self.combo_known_bad = QComboBox()
+        self.combo_known_bad.addItem("Omitir", userData="omitir")
+        self.combo_known_bad.addItem("Enviar al final", userData="al_final")
+        self.combo_known_bad.addItem("Enviar normalmente", userData="ignorar")
+        known_bad_layout.addWidget(self.combo_known_bad)
+        known_bad_layout.addWidget(QLabel("Números repetidos:"))
+        self.combo_duplicates = QComboBox()
+        self.combo_duplicates.addItem("Enviar la primera fila", userData="primero")
+        self.combo_duplicates.addItem("Enviar la última fila", userData="ultimo")
+        self.combo_duplicates.addItem("Enviar cada variante distinta", userData="todas")
+        known_bad_layout.addWidget(self.combo_duplicates)
+        known_bad_layout.addStretch(1)
+        self.main_layout.addLayout(known_bad_layout)
+
         # --- Sección 4: Controles ---
         self.lbl_login_status = QLabel("Listo para iniciar.")
         self.lbl_login_status.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -109,9 +147,10 @@ class MainView(QMainWindow):
 
         # --- Sección 5: Log (en vivo) ---
         self.main_layout.addWidget(QLabel("Log (En vivo):"))
-        self.log_area = QTextEdit()
+        self.log_area = QPlainTextEdit()
         self.log_area.setReadOnly(True)
         self.log_area.setMinimumHeight(150)
+        self.log_area.setMaximumBlockCount(LIVE_LOG_MAX_LINES) # Historial acotado (anillo)
         scroll = QScrollArea(); scroll.setWidget(self.log_area); scroll.setWidgetResizable(True)
         self.main_layout.addWidget(scroll)
 
@@ -136,6 +175,20 @@ class MainView(QMainWindow):
         
         self.logs_layout.addLayout(logs_controls_layout)
 
+        # --- Filtro por razón y resumen del historial (desde el catálogo de logs) ---
+        logs_filter_layout = QHBoxLayout()
+        logs_filter_layout.addWidget(QLabel("Filtrar por razón:"))
+        self.logs_reason_filter = QComboBox()
+        self.logs_reason_filter.addItem("Todas las razones", userData="")
+        self.logs_reason_filter.activated.connect(self._on_reason_filter_selected)
+        logs_filter_layout.addWidget(self.logs_reason_filter, 1)
+        self.logs_layout.addLayout(logs_filter_layout)
+
+        self.lbl_logs_summary = QLabel("")
+        self.lbl_logs_summary.setTextFormat(Qt.TextFormat.PlainText)
+        self.lbl_logs_summary.setStyleSheet("font-family: monospace;")
+        self.logs_layout.addWidget(self.lbl_logs_summary)
+
         # --- Tabla del visor ---
         self.log_table_view = QTableView()
         self.log_table_view.setSortingEnabled(True)
@@ -151,6 +204,21 @@ class MainView(QMainWindow):
     def get_static_vars(self):
         return {name: input_widget.text().strip() for name, input_widget in self.static_vars_inputs.items()}
 
+    def get_session_count(self):
+        return self.spin_sessions.value()
+
+    def get_max_per_minute(self):
+        return self.spin_max_per_minute.value()
+
+    def get_resume(self):
+        return self.chk_resume.isChecked()
+
+    def get_known_bad_policy(self):
+        return self.combo_known_bad.currentData()
+
+    def get_dedup_policy(self):
+        return self.combo_duplicates.currentData()
+
     # --- Slots para actualizar la GUI (llamados por el Controlador) ---
     @Slot(str)
     def set_file_label(self, text):
@@ -163,7 +231,14 @@ class MainView(QMainWindow):
     @Slot(str)
     def update_log(self, message):
         """Actualiza el LOG DE VIVO en la pestaña 1."""
-        self.log_area.append(message)
+        self.append_log_lines([message])
+
+    @Slot(list)
+    def append_log_lines(self, lines):
+        """Añade un lote de líneas al LOG DE VIVO con una sola actualización y un solo scroll."""
+        if not lines:
+            return
+        self.log_area.appendPlainText('\n'.join(lines[-LIVE_LOG_MAX_LINES:]))
         scrollbar = self.log_area.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
 
@@ -201,9 +276,37 @@ class MainView(QMainWindow):
         if full_path:
             self.log_file_selected.emit(full_path) # Emitimos la ruta
 
+    @Slot()
+    def _on_reason_filter_selected(self):
+        self.log_reason_filter_changed.emit(self.get_log_reason_filter())
+
+    def get_log_reason_filter(self):
+        return self.logs_reason_filter.currentData() or ""
+
+    @Slot(list)
+    def update_log_history_summary(self, totals: list):
+        """Rellena el filtro de razones y dibuja un resumen en barras (fallos por razón en el historial)."""
+        current = self.get_log_reason_filter()
+        self.logs_reason_filter.blockSignals(True)
+        self.logs_reason_filter.clear()
+        self.logs_reason_filter.addItem("Todas las razones", userData="")
+        for reason, count in totals:
+            self.logs_reason_filter.addItem(f"{reason} ({count})", userData=reason)
+        index = self.logs_reason_filter.findData(current)
+        self.logs_reason_filter.setCurrentIndex(max(index, 0))
+        self.logs_reason_filter.blockSignals(False)
+
+        if not totals:
+            self.lbl_logs_summary.setText("")
+            return
+        top = max(count for _, count in totals) or 1
+        width = max(len(reason) for reason, _ in totals)
+        lines = [f"{reason.ljust(width)} {'█' * max(1, round(20 * count / top))} {count}" for reason, count in totals]
+        self.lbl_logs_summary.setText("Historial de fallos por razón:\n" + "\n".join(lines))
+
     @Slot(list)
     def update_log_files_list(self, files_list: list):
-        """Actualiza el QComboBox con la lista de archivos de log encontrados."""
+        """Actualiza el QComboBox con la lista de logs: rutas o tuplas (ruta, etiqueta)."""
         self.logs_combo_box.blockSignals(True) # Evitar emitir señales mientras limpiamos
         current_data = self.logs_combo_box.currentData()
         
@@ -216,20 +319,23 @@ class MainView(QMainWindow):
             return
 
         new_index_to_select = 0
-        for i, full_path in enumerate(files_list):
-            # Añadimos el nombre base, pero guardamos la ruta completa
-            basename = os.path.basename(full_path)
-            self.logs_combo_box.addItem(basename, userData=full_path)
+        for i, entry in enumerate(files_list):
+            # Añadimos la etiqueta (o el nombre base), pero guardamos la ruta completa
+            full_path, label = entry if isinstance(entry, (tuple, list)) else (entry, os.path.basename(entry))
+            self.logs_combo_box.addItem(label, userData=full_path)
             if full_path == current_data:
                 new_index_to_select = i
                 
         self.logs_combo_box.setCurrentIndex(new_index_to_select)
         self.logs_combo_box.blockSignals(False)
 
-    @Slot(QStandardItemModel)
+    @Slot(object)
     def set_log_table_model(self, model):
-        """Recibe el modelo de datos y lo asigna a la tabla en la Pestaña 2."""
+        """Recibe el modelo de datos y lo asigna a la tabla en la Pestaña 2 (liberando el anterior)."""
+        previous = self.log_table_view.model()
         self.log_table_view.setModel(model)
+        if previous is not None and previous is not model and hasattr(previous, 'close'):
+            previous.close()
         self.log_table_view.resizeColumnsToContents()
         self.log_table_view.horizontalHeader().setStretchLastSection(True)
 